@@ -0,0 +1,115 @@
+"""JSON API только для чтения: ленты, записи с комментариями,
+группы и профили.
+
+Ответы строятся из ``values()`` сериализаторов posts.serializers
+без шаблонов. Списки листаются курсором, как HTML-ленты, а ETag
+и Last-Modified берутся из версий областей кеша страниц, поэтому
+повторный запрос без изменений получает 304 без обращения к БД.
+"""
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+
+from . import serializers
+from .caching import FEED, GROUP, POST, USER, conditional_page
+from .models import Comment, Group, Post
+from .paginators import CursorPaginator
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+def json_response(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def get_row(queryset, fields, **lookup):
+    row = queryset.filter(**lookup).values(*fields).first()
+    if row is None:
+        raise Http404
+    return row
+
+
+def cursor_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paginated(request, rows, serialize, per_page, keys):
+    """Страница выдачи со ссылками на соседние страницы."""
+    paginator = CursorPaginator(rows, per_page, keys=keys)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [serialize(row) for row in page],
+        'next': cursor_url(request, page.next_cursor),
+        'previous': cursor_url(request, page.previous_cursor),
+    }
+
+
+def posts_page(request, posts):
+    rows = posts.values(*serializers.POST_FIELDS)
+    return paginated(request, rows, serializers.serialize_post,
+                     POSTS_PER_PAGE, ('pub_date', 'id'))
+
+
+def comments_page(request, comments):
+    rows = comments.values(*serializers.COMMENT_FIELDS)
+    return paginated(request, rows, serializers.serialize_comment,
+                     COMMENTS_PER_PAGE, ('created', 'id'))
+
+
+@conditional_page(FEED)
+def post_list(request):
+    return json_response(posts_page(request, Post.objects.all()))
+
+
+@conditional_page(POST)
+def post_detail(request, post_id):
+    data = serializers.serialize_post(
+        get_row(Post.objects, serializers.POST_FIELDS, id=post_id)
+    )
+    data['comments'] = comments_page(
+        request, Comment.objects.filter(post_id=post_id)
+    )
+    return json_response(data)
+
+
+@conditional_page(POST)
+def post_comments(request, post_id):
+    if not Post.objects.filter(id=post_id).exists():
+        raise Http404
+    return json_response(
+        comments_page(request, Comment.objects.filter(post_id=post_id))
+    )
+
+
+@conditional_page(GROUP)
+def group_detail(request, slug):
+    return json_response(serializers.serialize_group(
+        get_row(Group.objects, serializers.GROUP_FIELDS, slug=slug)
+    ))
+
+
+@conditional_page(GROUP)
+def group_posts(request, slug):
+    group = get_row(Group.objects, ('id',), slug=slug)
+    return json_response(
+        posts_page(request, Post.objects.filter(group_id=group['id']))
+    )
+
+
+@conditional_page(USER)
+def profile_detail(request, username):
+    return json_response(serializers.serialize_profile(
+        get_row(User.objects, serializers.PROFILE_FIELDS, username=username)
+    ))
+
+
+@conditional_page(USER)
+def profile_posts(request, username):
+    author = get_row(User.objects, ('id',), username=username)
+    return json_response(
+        posts_page(request, Post.objects.filter(author_id=author['id']))
+    )
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Записи'
+
+    def ready(self):
+        from yatube import sqlite  # noqa: F401
+
+        from . import signals  # noqa: F401
@@ -0,0 +1,121 @@
+"""Асинхронные версии страниц, которые читают больше всего.
+
+Используются при запуске через ASGI (YATUBE_ASYNC_VIEWS=1, его
+выставляет yatube/asgi.py); под WSGI работают синхронные view из
+posts.views с тем же контекстом и шаблонами. Независимые запросы
+страницы выполняются одновременно, каждый в своем потоке со своим
+соединением с БД, а медленный клиент занимает только корутину.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection
+from django.shortcuts import get_object_or_404, render
+
+from .caching import FEED, GROUP, POST, USER, cached_page, conditional_page
+from .forms import CommentForm
+from .models import Comment, Follow, Group, Post
+from .views import comments_paginator, posts_paginator
+
+User = get_user_model()
+
+
+def _in_own_thread(func):
+    def run():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def run_concurrently(*funcs):
+    """Выполняет синхронные функции одновременно и возвращает
+    их результаты в том же порядке. Внутри открытой транзакции
+    (ATOMIC_REQUESTS, тесты) другие соединения не видят ее изменений,
+    поэтому функции выполняются по очереди в потоке запроса."""
+    if await sync_to_async(_in_transaction)():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(_in_own_thread(func)() for func in funcs))
+
+
+# Шаблоны обращаются к request.user и связанным объектам, поэтому
+# отрисовка идет в синхронном потоке запроса.
+render_async = sync_to_async(render)
+
+
+@conditional_page(FEED, per_user=True)
+@cached_page(FEED)
+async def index(request):
+    posts = Post.objects.select_related('author', 'group')
+    page = await sync_to_async(posts_paginator)(request, posts)
+    return await render_async(request, 'posts/index.html', {'page': page})
+
+
+@conditional_page(GROUP, per_user=True)
+@cached_page(GROUP)
+async def group_posts(request, slug):
+    posts = Post.objects.filter(group__slug=slug).select_related(
+        'author', 'group'
+    )
+    group, page = await run_concurrently(
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda: posts_paginator(request, posts),
+    )
+    return await render_async(
+        request,
+        'posts/group.html',
+        {'group': group, 'page': page}
+    )
+
+
+@conditional_page(USER, per_user=True)
+@cached_page(USER)
+async def profile(request, username):
+    # Ленивый request.user загружается до запуска потоков.
+    is_authenticated = await sync_to_async(
+        lambda: request.user.is_authenticated
+    )()
+    posts = Post.objects.filter(author__username=username).select_related(
+        'author', 'group'
+    )
+    author, page, following = await run_concurrently(
+        lambda: get_object_or_404(
+            User.objects.select_related('stats'), username=username
+        ),
+        lambda: posts_paginator(request, posts),
+        lambda: is_authenticated and Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists(),
+    )
+    return await render_async(
+        request,
+        'posts/profile.html',
+        {'author': author, 'page': page,
+         'following': following}
+    )
+
+
+@conditional_page(POST, USER, per_user=True)
+@cached_page(POST, USER)
+async def post_view(request, username, post_id):
+    comments = Comment.objects.filter(post_id=post_id)
+    post, comments_page = await run_concurrently(
+        lambda: get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            author__username=username, id=post_id
+        ),
+        lambda: comments_paginator(request, comments),
+    )
+    return await render_async(
+        request,
+        'posts/post.html',
+        {'author': post.author, 'post': post,
+         'comments': post.comments.all(),
+         'comments_page': comments_page, 'form': CommentForm()},
+    )
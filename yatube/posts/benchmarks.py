@@ -0,0 +1,112 @@
+"""Замеры страниц на синтетических данных (команда bench_views).
+
+Для каждого масштаба данные создаются заново posts.synthetic
+с одним seed, после чего каждая страница запрашивается тестовым
+клиентом repeat раз от имени читателя с наибольшим числом
+подписок. Кеш страниц очищается перед каждым запросом:
+замеряется путь без кеша, который и растет вместе с данными.
+"""
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import synthetic
+from .models import Group, Post, UserStats
+
+
+def percentile(values, fraction):
+    """Значение, не больше которого fraction отсортированных values."""
+    if not values:
+        return None
+    index = min(len(values) - 1, round(fraction * (len(values) - 1)))
+    return values[index]
+
+
+def scale_options(posts):
+    """Размеры данных для масштаба в posts записей."""
+    return {
+        'users': max(10, posts // 10),
+        'groups': max(3, posts // 1000),
+        'posts': posts,
+        'comments': posts * 2,
+        'follows': 20,
+    }
+
+
+def targets():
+    """Самые нагруженные объекты: популярный автор, крупная группа,
+    запись с наибольшим числом комментариев и читатель
+    с наибольшим числом подписок."""
+    author = UserStats.objects.order_by('-posts_count').first().user
+    reader = UserStats.objects.order_by('-following_count').first().user
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    post = Post.objects.select_related('author').order_by(
+        '-comments_count'
+    ).first()
+    return author, reader, group, post
+
+
+def pages(author, group, post):
+    return {
+        'index': reverse('index'),
+        'follow_index': reverse('follow_index'),
+        'group_posts': reverse('group_posts', args=(group.slug,)),
+        'profile': reverse('profile', args=(author.username,)),
+        'post_view': reverse('post', args=(post.author.username, post.pk)),
+        'search': reverse('search') + '?q=' + synthetic.WORDS[0],
+        'api_posts': reverse('api_posts'),
+    }
+
+
+def measure(client, url, repeat):
+    """Задержки в миллисекундах и число запросов ко всем базам,
+    включая реплику."""
+    latencies = []
+    queries = None
+    for _ in range(repeat):
+        cache.clear()
+        with ExitStack() as stack:
+            captured = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} ответил {response.status_code}')
+        queries = sum(map(len, captured))
+    latencies.sort()
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'queries': queries,
+    }
+
+
+def run(scales, repeat, seed=0):
+    """Результаты замеров всех страниц на каждом масштабе."""
+    results = []
+    for scale in sorted(scales):
+        call_command('flush', interactive=False, verbosity=0)
+        synthetic.load(seed=seed, **scale_options(scale))
+        author, reader, group, post = targets()
+        client = Client()
+        client.force_login(reader)
+        for view, url in pages(author, group, post).items():
+            # Первый запрос прогревает шаблоны и соединение.
+            client.get(url)
+            results.append({
+                'scale': scale, 'view': view, 'url': url,
+                **measure(client, url, repeat),
+            })
+    return results
@@ -0,0 +1,287 @@
+"""Кеширование страниц с инвалидацией по событиям.
+
+Ключ закешированной страницы содержит версии ее областей
+(вся лента, группа, профиль, запись). Версии увеличиваются
+сигналами моделей при каждом изменении данных и еще раз после
+фиксации транзакции, поэтому страница устаревает ровно тогда, когда
+меняется то, что на ней показано.
+
+Страницы, собранные по данным реплики (yatube/replicas.py) в течение
+REPLICA_LAG_SECONDS после изменения их областей, не кешируются
+и не получают ETag: реплика могла еще не получить изменение.
+"""
+import asyncio
+import hashlib
+import time
+from calendar import timegm
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Group
+from yatube import metrics, replicas
+from yatube.settings import POSTS_CACHE_TIMEOUT
+
+VERSION_PREFIX = 'posts:version:'
+MODIFIED_PREFIX = 'posts:modified:'
+PAGE_PREFIX = 'posts:page:'
+
+FEED = 'feed'
+GROUP = 'group:{slug}'
+USER = 'user:{username}'
+POST = 'post:{post_id}'
+TRENDING = 'trending'
+GROUPS = 'groups'
+
+
+def _initial_version():
+    """Начальная версия берется от времени, чтобы после вытеснения
+    ключа версии из кеша старые страницы не ожили снова."""
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    keys = [VERSION_PREFIX + scope for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_last_modified(scopes):
+    """Время последнего изменения областей. Для области, о которой
+    кеш ничего не знает, изменением считается текущий момент."""
+    keys = [MODIFIED_PREFIX + scope for scope in scopes]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, time.time(), None)
+            stamps[key] = cache.get(key)
+    return datetime.fromtimestamp(max(stamps.values()), timezone.utc)
+
+
+def bump(*scopes):
+    """Увеличивает версии областей. Внутри транзакции — еще раз после
+    ее фиксации: параллельный запрос мог прочитать первую новую версию
+    до фиксации и закешировать под ней старые данные, повторное
+    увеличение делает такую страницу недостижимой. Первое увеличение
+    нужно чтениям в той же транзакции, они уже видят изменение."""
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = VERSION_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_PREFIX + scope: now for scope in scopes}, None
+    )
+
+
+def bump_post_pages(post):
+    """Сбрасывает закешированные страницы, на которых видна запись."""
+    scopes = [
+        FEED,
+        USER.format(username=post.author.username),
+        POST.format(post_id=post.pk),
+    ]
+    if post.group_id is not None:
+        scopes.append(GROUP.format(slug=post.group.slug))
+    initial_group_id = getattr(post, '_initial_group_id', None)
+    if initial_group_id not in (None, post.group_id):
+        slug = Group.objects.filter(
+            pk=initial_group_id
+        ).values_list('slug', flat=True).first()
+        if slug is not None:
+            scopes.append(GROUP.format(slug=slug))
+    bump(*scopes)
+
+
+def _page_key(request, versions):
+    parts = [request.get_full_path(), *map(str, versions)]
+    if request.user.is_authenticated:
+        parts.append(str(request.user.pk))
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return PAGE_PREFIX + digest
+
+
+def _is_cacheable(request, response):
+    """Не кешируются ответы с cookie и страницы, где CSRF-токен
+    выписан под cookie, которой у клиента еще нет."""
+    if response.status_code != 200 or response.cookies:
+        return False
+    new_csrf_cookie = (
+        request.META.get('CSRF_COOKIE_USED')
+        and settings.CSRF_COOKIE_NAME not in request.COOKIES
+    )
+    return not new_csrf_cookie
+
+
+def _replica_may_lag(scopes, kwargs):
+    """Страница читается с реплики, а ее области изменились так
+    недавно, что реплика может их еще не знать."""
+    if not replicas.reads_from_replica():
+        return False
+    page_scopes = [scope.format(**kwargs) for scope in scopes]
+    modified = get_last_modified(page_scopes).timestamp()
+    return time.time() - modified < settings.REPLICA_LAG_SECONDS
+
+
+def _cached_response(request, scopes, kwargs):
+    page_scopes = [scope.format(**kwargs) for scope in scopes]
+    key = _page_key(request, get_versions(page_scopes))
+    response = cache.get(key)
+    metrics.record_cache(response is not None)
+    return key, response
+
+
+def _cache_sync_view(view, scopes):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+        key, response = _cached_response(request, scopes, kwargs)
+        if response is not None:
+            return response
+        response = view(request, *args, **kwargs)
+        if (
+            _is_cacheable(request, response)
+            and not _replica_may_lag(scopes, kwargs)
+        ):
+            cache.set(key, response, POSTS_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
+
+def _cache_async_view(view, scopes):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await view(request, *args, **kwargs)
+        key, response = await sync_to_async(_cached_response)(
+            request, scopes, kwargs
+        )
+        if response is not None:
+            return response
+        response = await view(request, *args, **kwargs)
+        if (
+            _is_cacheable(request, response)
+            and not await sync_to_async(_replica_may_lag)(scopes, kwargs)
+        ):
+            await sync_to_async(cache.set)(
+                key, response, POSTS_CACHE_TIMEOUT
+            )
+        return response
+    return wrapper
+
+
+def cached_page(*scopes):
+    """Кеширует ответ view на GET-запрос. Области задаются
+    шаблонами, которые заполняются именованными аргументами view.
+    Подходит и для асинхронных view: обращения к кешу тогда
+    выполняются через sync_to_async."""
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _cache_async_view(view, scopes)
+        return _cache_sync_view(view, scopes)
+    return decorator
+
+
+def _viewer(request):
+    """Пользователь и CSRF-cookie, от которых зависит HTML-страница.
+    id пользователя читается из сессии, без запроса к таблице
+    пользователей."""
+    user_id = ''
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        user_id = request.session.get(SESSION_KEY, '')
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'{user_id}|{csrf}'
+
+
+def _validators(request, scopes, kwargs, per_user):
+    """ETag и время изменения (timestamp) страницы; None, None,
+    если страницу нельзя проверять по версиям."""
+    if _replica_may_lag(scopes, kwargs):
+        return None, None
+    page_scopes = [scope.format(**kwargs) for scope in scopes]
+    parts = list(map(str, get_versions(page_scopes)))
+    if per_user:
+        parts.append(_viewer(request))
+    etag = quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+    if per_user and settings.SESSION_COOKIE_NAME in request.COOKIES:
+        # Дата изменения не учитывает смену пользователя, поэтому
+        # страницы вошедших пользователей проверяются только по ETag.
+        return etag, None
+    return etag, timegm(get_last_modified(page_scopes).utctimetuple())
+
+
+def _set_validators(request, response, etag, last_modified, per_user):
+    # Заголовки выставляются так же, как в condition() Django.
+    if etag is not None and request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+        response.setdefault('ETag', etag)
+    if per_user:
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _conditional_sync_view(view, scopes, per_user):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        etag, last_modified = _validators(request, scopes, kwargs, per_user)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        return _set_validators(
+            request, response, etag, last_modified, per_user
+        )
+    return wrapper
+
+
+def _conditional_async_view(view, scopes, per_user):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        etag, last_modified = await sync_to_async(_validators)(
+            request, scopes, kwargs, per_user
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await view(request, *args, **kwargs)
+        return _set_validators(
+            request, response, etag, last_modified, per_user
+        )
+    return wrapper
+
+
+def conditional_page(*scopes, per_user=False):
+    """Выставляет ETag и Last-Modified по версиям областей и отвечает
+    304 Not Modified без вызова view, если клиент видел ту же версию.
+    Области задаются так же, как в cached_page(). Для страниц,
+    которые зависят от пользователя, per_user добавляет в ETag
+    пользователя и CSRF-cookie, а ответ получает Vary: Cookie."""
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _conditional_async_view(view, scopes, per_user)
+        return _conditional_sync_view(view, scopes, per_user)
+    return decorator
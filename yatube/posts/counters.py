@@ -0,0 +1,57 @@
+"""Денормализованные счетчики записей, комментариев и подписок.
+
+Счетчики меняются атомарно выражениями F() из сигналов моделей,
+а recount() пересчитывает их целиком по исходным таблицам
+(команда recount_counters).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def change_user_stats(user_id, field, delta):
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def recount_follows(user_ids):
+    """Пересчитывает счетчики подписок пользователей после
+    массовых изменений подписок в обход сигналов."""
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def _count(model, field):
+    """Подзапрос количества строк model, ссылающихся на внешний pk."""
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def recount():
+    """Пересчитывает счетчики по исходным таблицам."""
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+    users = User.objects.values_list('pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in users.iterator()],
+        ignore_conflicts=True
+    )
+    UserStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
@@ -0,0 +1,102 @@
+"""Оповещение о новых записях для потоков Server-Sent Events.
+
+Брокер живет в памяти процесса. Подписчики — соединения ASGI-приложения
+posts.sse, каждое со своей очередью в цикле событий. Публикация
+вызывается сигналом после фиксации транзакции из любого потока
+и передает событие в цикл подписчика через call_soon_threadsafe.
+В развертывании из нескольких процессов подписчик получает записи,
+созданные его процессом.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.urls import reverse
+
+FEED = 'feed'
+GROUP = 'group:{slug}'
+AUTHOR = 'author:{author_id}'
+
+# Столько событий ждут медленного подписчика, более старые теряются.
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Очередь событий одного соединения."""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+
+    def subscribe(self, channels):
+        """Подписывает текущий цикл событий на каналы."""
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channels, event):
+        """Отправляет событие подписчикам каналов. Подписчик
+        нескольких каналов получает его один раз."""
+        with self._lock:
+            subscriptions = set().union(
+                *(self._channels.get(channel, ()) for channel in channels)
+            )
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт.
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def post_channels(post):
+    channels = [FEED, AUTHOR.format(author_id=post.author_id)]
+    if post.group_id is not None:
+        channels.append(GROUP.format(slug=post.group.slug))
+    return channels
+
+
+def publish_post(post):
+    """Сообщает подписчикам лент о новой записи."""
+    broker.publish(post_channels(post), {
+        'id': post.pk,
+        'url': reverse('post', args=(post.author.username, post.pk)),
+    })
@@ -0,0 +1,159 @@
+"""Подписки списком: массовая подписка и отписка, рекомендации.
+
+follow_many() меняет подписки одним bulk_create(ignore_conflicts=True)
+в обход сигнала follow_created, unfollow_many() удаляет их delete(),
+на время которого сигнал follow_deleted пропускает подписки
+пользователя из unfollowing. Поэтому то, что сигналы делают для
+каждой подписки, здесь делается пакетно: счетчики пересчитываются
+по таблице подписок (так они верны и при гонке с обычной подпиской),
+ленты и оценки популярного меняются сразу для всех авторов.
+
+suggestions() предлагает авторов, на которых подписаны те, на кого
+подписан пользователь. Чтобы стоимость не зависела от числа его
+подписок и их подписок, учитываются только SUGGESTIONS_SAMPLE
+последних из первых и не больше SUGGESTIONS_SCAN из вторых;
+если таких авторов мало, список дополняется самыми популярными.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from . import caching, counters, timeline, trending
+from .models import Follow, UserStats
+
+User = get_user_model()
+
+SUGGESTIONS_PREFIX = 'posts:suggestions:'
+
+# pk пользователей, подписки которых сейчас снимает unfollow_many():
+# сигнал follow_deleted для них ничего не делает.
+unfollowing = set()
+
+
+def _bump_users(user_ids):
+    usernames = User.objects.filter(
+        pk__in=user_ids
+    ).values_list('username', flat=True)
+    caching.bump(*(
+        caching.USER.format(username=username) for username in usernames
+    ))
+
+
+def follow_many(user, authors):
+    """Подписывает пользователя на авторов из queryset authors, кроме
+    уже отслеживаемых, не больше BULK_FOLLOW_LIMIT за раз. Возвращает
+    число авторов, на которых пользователь подписан заново."""
+    followed = Follow.objects.filter(user=user).values('author')
+    author_ids = list(
+        authors.exclude(pk=user.pk).exclude(pk__in=followed)
+        .values_list('pk', flat=True)[:settings.BULK_FOLLOW_LIMIT]
+    )
+    if not author_ids:
+        return 0
+    with transaction.atomic():
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=pk) for pk in author_ids],
+            ignore_conflicts=True
+        )
+        counters.recount_follows([user.pk, *author_ids])
+        timeline.followers_changed(author_ids, 1)
+        timeline.backfill_many(user, author_ids)
+        trending.record_follows(author_ids)
+    _bump_users([user.pk, *author_ids])
+    return len(author_ids)
+
+
+def unfollow_many(user, authors):
+    """Отписывает пользователя от авторов из queryset authors
+    и возвращает число снятых подписок."""
+    author_ids = list(
+        Follow.objects.filter(user=user, author__in=authors)
+        .values_list('author', flat=True)
+    )
+    if not author_ids:
+        return 0
+    with transaction.atomic():
+        unfollowing.add(user.pk)
+        try:
+            Follow.objects.filter(
+                user=user, author_id__in=author_ids
+            ).delete()
+        finally:
+            unfollowing.discard(user.pk)
+        counters.recount_follows([user.pk, *author_ids])
+        timeline.trim_many(user, author_ids)
+        timeline.followers_changed(author_ids, -1)
+        trending.record_follows(author_ids, -1)
+    _bump_users([user.pk, *author_ids])
+    return len(author_ids)
+
+
+def _second_degree(user, limit):
+    """id авторов, на которых подписаны последние SUGGESTIONS_SAMPLE
+    отслеживаемых пользователем, и число таких общих подписок.
+    Просматривается не больше SUGGESTIONS_SCAN их подписок."""
+    sample = list(
+        Follow.objects.filter(user=user).order_by('-pk')
+        .values_list('author', flat=True)[:settings.SUGGESTIONS_SAMPLE]
+    )
+    if not sample:
+        return []
+    # Без сортировки, чтобы LIMIT останавливал чтение индекса:
+    # какие именно подписки попадут в выборку, не важно.
+    scanned = Follow.objects.filter(
+        user__in=sample
+    ).order_by().values('pk')[:settings.SUGGESTIONS_SCAN]
+    followed = Follow.objects.filter(user=user).values('author')
+    return list(
+        Follow.objects.filter(pk__in=scanned)
+        .exclude(author=user).exclude(author__in=followed)
+        .values('author')
+        .annotate(mutual=Count('pk'))
+        .order_by('-mutual', 'author')
+        .values_list('author', 'mutual')[:limit]
+    )
+
+
+def _popular(user, exclude, limit):
+    followed = Follow.objects.filter(user=user).values('author')
+    return list(
+        UserStats.objects.filter(followers_count__gt=0)
+        .exclude(user=user).exclude(user__in=followed)
+        .exclude(user__in=exclude)
+        .order_by('-followers_count', 'user')
+        .values_list('user', flat=True)[:limit]
+    )
+
+
+def _compute_suggestions(user, limit):
+    mutual = dict(_second_degree(user, limit))
+    ids = list(mutual)
+    if len(ids) < limit:
+        ids += _popular(user, ids, limit - len(ids))
+    authors = User.objects.select_related('stats').in_bulk(ids)
+    suggested = []
+    for pk in ids:
+        author = authors.get(pk)
+        if author is None:
+            continue
+        author.mutual_count = mutual.get(pk, 0)
+        suggested.append(author)
+    return suggested
+
+
+def suggestions(user, limit=None):
+    """Кого читать: список пользователей с атрибутом mutual_count.
+    Список кешируется до изменения подписок пользователя
+    (версия его области USER) или на SUGGESTIONS_CACHE_TIMEOUT."""
+    limit = limit or settings.SUGGESTIONS_SIZE
+    version, = caching.get_versions(
+        [caching.USER.format(username=user.username)]
+    )
+    key = f'{SUGGESTIONS_PREFIX}{user.pk}:{limit}:{version}'
+    suggested = cache.get(key)
+    if suggested is None:
+        suggested = _compute_suggestions(user, limit)
+        cache.set(key, suggested, settings.SUGGESTIONS_CACHE_TIMEOUT)
+    return suggested
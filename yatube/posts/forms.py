@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Comment, Post
+from .models import Comment, Group, Post
+from .uploads import OversizedUploadedFile, sanitize_image
 
 
 class PostForm(forms.ModelForm):
@@ -14,9 +16,38 @@ class PostForm(forms.ModelForm):
             'image': 'Загрузите Ваше изображение'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файл, прием которого прерван из-за размера, не передается
+        # в ImageField: ошибку о размере выдает clean_image().
+        self.oversized_image = self.files.get('image')
+        if isinstance(self.oversized_image, OversizedUploadedFile):
+            self.files = self.files.copy()
+            del self.files['image']
+        else:
+            self.oversized_image = None
+
+    def clean_image(self):
+        image = self.oversized_image or self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return sanitize_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
 
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        empty_label='Все группы'
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
@@ -0,0 +1,133 @@
+"""Статистика групп для каталога /groups/.
+
+GroupStats хранит число записей группы, время последней записи
+и GROUP_TOP_AUTHORS самых активных авторов, поэтому страница каталога
+строится одним запросом без COUNT и MAX по записям каждой группы.
+GroupAuthorStats хранит число записей каждого автора в группе: по нему
+список лучших авторов обновляется запросом по индексу
+(group, -posts_count).
+
+Сигналы меняют строки при создании и удалении записи и при переносе
+ее в другую группу (post_edit); rebuild() (команда
+rebuild_group_stats) пересчитывает все по таблице записей.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, When
+
+from . import caching
+from .models import Group, GroupAuthorStats, GroupStats, Post
+
+
+def _top_authors(group_id):
+    rows = GroupAuthorStats.objects.filter(
+        group_id=group_id
+    ).order_by('-posts_count', 'author_id').values_list(
+        'author__username', 'posts_count'
+    )[:settings.GROUP_TOP_AUTHORS]
+    return [
+        {'username': username, 'posts_count': posts_count}
+        for username, posts_count in rows
+    ]
+
+
+def _refresh_top_authors(group_id):
+    GroupStats.objects.filter(pk=group_id).update(
+        top_authors=_top_authors(group_id)
+    )
+
+
+def _add(group_id, author_id, pub_date):
+    GroupStats.objects.filter(pk=group_id).update(
+        posts_count=F('posts_count') + 1,
+        last_post_date=Case(
+            When(last_post_date__gte=pub_date, then=F('last_post_date')),
+            default=pub_date
+        )
+    )
+    rows = GroupAuthorStats.objects.filter(
+        group_id=group_id, author_id=author_id
+    )
+    if not rows.update(posts_count=F('posts_count') + 1):
+        GroupAuthorStats.objects.bulk_create(
+            [GroupAuthorStats(group_id=group_id, author_id=author_id,
+                              posts_count=1)],
+            ignore_conflicts=True
+        )
+    _refresh_top_authors(group_id)
+
+
+def _remove(group_id, author_id):
+    """Запись уже удалена или перенесена, поэтому время последней
+    записи берется заново по индексу (group, -pub_date)."""
+    last_post = Post.objects.filter(
+        group_id=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    GroupStats.objects.filter(pk=group_id).update(
+        posts_count=F('posts_count') - 1,
+        last_post_date=Subquery(last_post)
+    )
+    rows = GroupAuthorStats.objects.filter(
+        group_id=group_id, author_id=author_id
+    )
+    if not rows.filter(posts_count__gt=1).update(
+        posts_count=F('posts_count') - 1
+    ):
+        rows.delete()
+    _refresh_top_authors(group_id)
+
+
+def create_stats(group):
+    GroupStats.objects.get_or_create(group=group)
+
+
+def record_post(post, created):
+    """Учитывает новую запись или ее перенос из группы
+    post._initial_group_id в post.group_id."""
+    previous_group_id = None if created else post._initial_group_id
+    if previous_group_id == post.group_id:
+        return
+    if previous_group_id is not None:
+        _remove(previous_group_id, post.author_id)
+    if post.group_id is not None:
+        _add(post.group_id, post.author_id, post.pub_date)
+    caching.bump(caching.GROUPS)
+
+
+def record_post_deleted(post):
+    if post.group_id is not None:
+        _remove(post.group_id, post.author_id)
+        caching.bump(caching.GROUPS)
+
+
+def rebuild(batch_size=500):
+    """Пересчитывает статистику всех групп и возвращает их число."""
+    with transaction.atomic():
+        GroupAuthorStats.objects.all().delete()
+        GroupStats.objects.all().delete()
+        pairs = Post.objects.filter(
+            group__isnull=False
+        ).order_by().values_list('group', 'author').annotate(
+            total=Count('pk')
+        )
+        GroupAuthorStats.objects.bulk_create(
+            (
+                GroupAuthorStats(
+                    group_id=group_id, author_id=author_id, posts_count=total
+                )
+                for group_id, author_id, total in pairs.iterator()
+            ),
+            batch_size=batch_size
+        )
+        groups = Group.objects.order_by().annotate(
+            total=Count('posts'), last=Max('posts__pub_date')
+        ).values_list('pk', 'total', 'last')
+        stats = [
+            GroupStats(
+                group_id=group_id, posts_count=total, last_post_date=last,
+                top_authors=_top_authors(group_id)
+            )
+            for group_id, total, last in groups
+        ]
+        GroupStats.objects.bulk_create(stats, batch_size=batch_size)
+    return len(stats)
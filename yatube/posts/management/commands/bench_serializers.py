@@ -0,0 +1,69 @@
+import json
+import time
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core import serializers as django_serializers
+from django.core.management.base import BaseCommand
+
+from posts import serializers
+from posts.api import json_response
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+def rows_per_second(func, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(rows / best)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет скорость сериализации записей для JSON API '
+        'в сравнении с django.core.serializers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        pub_date = datetime(2021, 5, 1, tzinfo=timezone.utc)
+        value_rows = [
+            {
+                'id': i, 'text': f'Текст записи {i} ' * 10,
+                'pub_date': pub_date, 'author__username': 'author',
+                'group__slug': 'group', 'image': 'posts/image.jpg',
+                'card_thumbnail': '', 'comments_count': i % 50,
+            }
+            for i in range(rows)
+        ]
+        author = User(id=1, username='author')
+        group = Group(id=1, slug='group', title='Группа')
+        posts = [
+            Post(id=row['id'], text=row['text'], pub_date=pub_date,
+                 author=author, group=group, image=row['image'])
+            for row in value_rows
+        ]
+
+        def compact():
+            json_response({'results': [
+                serializers.serialize_post(row) for row in value_rows
+            ]})
+
+        def generic():
+            django_serializers.serialize('json', posts)
+
+        results = {
+            'rows': rows,
+            'compact_rows_per_second': rows_per_second(compact, rows, repeat),
+            'django_rows_per_second': rows_per_second(generic, rows, repeat),
+        }
+        self.stdout.write(json.dumps(results))
@@ -0,0 +1,83 @@
+import copy
+import json
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from posts.models import Group, Post
+from yatube.settings import POSTS_PER_PAGE
+
+User = get_user_model()
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def backend(cached):
+    """Шаблонизатор с настройками проекта и заданными загрузчиками."""
+    params = copy.deepcopy(settings.TEMPLATES[0])
+    params.pop('BACKEND')
+    params['NAME'] = 'cached' if cached else 'uncached'
+    params['APP_DIRS'] = False
+    params['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', LOADERS)] if cached
+        else LOADERS
+    )
+    return DjangoTemplates(params)
+
+
+def render_seconds(engine, posts, repeat):
+    """Лучшее время отрисовки главной страницы с записями posts."""
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    page = Paginator(posts, POSTS_PER_PAGE).get_page(1)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        engine.get_template('posts/index.html').render(
+            {'page': page}, request
+        )
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет стоимость отрисовки карточки записи на главной '
+        'странице с кешированным загрузчиком шаблонов и без него'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        pub_date = datetime(2021, 5, 1, tzinfo=timezone.utc)
+        authors = [User(id=i, username=f'author{i}') for i in range(1, 4)]
+        group = Group(id=1, slug='group', title='Группа')
+        posts = [
+            Post(id=i, text=f'Текст записи {i}\nВторая строка ' * 5,
+                 pub_date=pub_date, author=authors[i % len(authors)],
+                 group=group if i % 2 else None, comments_count=i)
+            for i in range(POSTS_PER_PAGE)
+        ]
+        results = {'cards': len(posts)}
+        for cached in (False, True):
+            engine = backend(cached)
+            full = render_seconds(engine, posts, options['repeat'])
+            empty = render_seconds(engine, [], options['repeat'])
+            name = 'cached' if cached else 'uncached'
+            results[f'{name}_page_us'] = round(full * 1e6)
+            results[f'{name}_card_us'] = round(
+                (full - empty) / len(posts) * 1e6
+            )
+        self.stdout.write(json.dumps(results))
@@ -0,0 +1,82 @@
+import json
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import benchmarks
+from yatube.replicas import primary_only
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def add_baseline(results, path):
+    """Дополняет результаты замерами того же масштаба и страницы
+    из файла прошлого запуска."""
+    with open(path, encoding='utf-8') as stream:
+        baseline = {
+            (result['scale'], result['view']): result
+            for result in json.load(stream)['results']
+        }
+    for result in results:
+        previous = baseline.get((result['scale'], result['view']))
+        if previous is not None:
+            result['baseline'] = {
+                key: previous[key] for key in ('p50_ms', 'p99_ms', 'queries')
+            }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p99 и число запросов страниц на синтетических данных '
+        'нескольких масштабов в отдельной тестовой базе и выводит JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', type=int, nargs='+', default=[1000, 10000],
+            help='Число записей на каждом масштабе'
+        )
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для результатов')
+        parser.add_argument(
+            '--baseline', help='Результаты прошлого запуска для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with primary_only():
+                results = benchmarks.run(
+                    options['scales'], options['repeat'],
+                    seed=options['seed']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        if options['baseline']:
+            add_baseline(results, options['baseline'])
+        report = json.dumps({
+            'commit': current_commit(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'results': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(report)
+        else:
+            self.stdout.write(report)
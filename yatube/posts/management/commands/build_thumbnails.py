@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для записей, у которых их еще нет'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).filter(card_thumbnail='').values_list('pk', flat=True)
+        total = 0
+        for post_id in posts.iterator():
+            generate_thumbnails(post_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано записей: {total}'))
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, записи, комментарии и подписки '
+        'в NDJSON-файл или каталог CSV-файлов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл NDJSON (- для вывода в stdout) или каталог CSV'
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default='ndjson'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        rows = transfer.export_rows(options['batch_size'])
+        if options['format'] == 'csv':
+            count = transfer.write_csv(rows, path)
+        elif path == '-':
+            transfer.write_ndjson(rows, sys.stdout)
+            return
+        else:
+            with open(path, 'w', encoding='utf-8') as stream:
+                count = transfer.write_ndjson(rows, stream)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено строк: {count}'))
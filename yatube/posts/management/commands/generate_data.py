@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетических пользователей, группы, записи, '
+        'комментарии и подписки; при одном seed данные одинаковы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Префикс имен пользователей и адресов групп'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        counts = synthetic.load(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'], seed=options['seed'],
+            prefix=options['prefix'], batch_size=options['batch_size'],
+        )
+        summary = ', '.join(
+            f'{model}: {count}' for model, count in counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Создано ({summary})'))
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, reset_queries
+
+from posts import transfer
+
+
+def read_checkpoint(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)['done']
+
+
+def write_checkpoint(path, done):
+    """Заменяет файл целиком, чтобы сбой не оставил его обрезанным."""
+    with open(path + '.tmp', 'w', encoding='utf-8') as stream:
+        json.dump({'done': done}, stream)
+    os.replace(path + '.tmp', path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_yatube пакетами. Число загруженных '
+        'строк сохраняется в файл прогресса, и после сбоя загрузку '
+        'можно продолжить с --resume'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON или каталог CSV')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='По умолчанию csv для каталога, иначе ndjson'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл прогресса, по умолчанию <path>.progress'
+        )
+        parser.add_argument('--resume', action='store_true')
+
+    def handle(self, *args, **options):
+        path = options['path'].rstrip('/')
+        checkpoint = options['checkpoint'] or path + '.progress'
+        done = 0
+        if os.path.exists(checkpoint):
+            if not options['resume']:
+                raise CommandError(
+                    f'Найден прогресс прерванной загрузки {checkpoint}: '
+                    'запустите команду с --resume или удалите его'
+                )
+            done = read_checkpoint(checkpoint)
+        fmt = options['format'] or ('csv' if os.path.isdir(path) else 'ndjson')
+        read = transfer.read_csv if fmt == 'csv' else transfer.read_ndjson
+        rows = islice(read(path), done, None)
+        importer = transfer.Importer()
+        started = time.perf_counter()
+        try:
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                importer.import_batch(batch)
+                # При DEBUG журнал запросов копит SQL пакетных вставок.
+                reset_queries()
+                done += len(batch)
+                write_checkpoint(checkpoint, done)
+            importer.finish()
+        except (transfer.TransferError, IntegrityError) as error:
+            raise CommandError(
+                f'Загрузка остановлена после строки {done}: {error}'
+            )
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        counts = ', '.join(
+            f'{model}: {count}' for model, count in importer.counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено за {time.perf_counter() - started:.1f} с ({counts})'
+        ))
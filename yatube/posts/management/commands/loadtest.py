@@ -0,0 +1,129 @@
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks import percentile
+
+DEFAULT_PATHS = ('/', '/group/{group}/', '/{author}/', '/{author}/{post}/')
+
+
+class Worker:
+    """Поток нагрузки с одним keep-alive соединением."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, path):
+        """Время ответа в секундах или None при ошибке."""
+        started = time.perf_counter()
+        try:
+            self.connection.request('GET', self.prefix + path)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return None
+        if response.status >= 400:
+            return None
+        return time.perf_counter() - started
+
+
+def run(url, path, concurrency, requests):
+    local = threading.local()
+    workers = []
+    lock = threading.Lock()
+
+    def call(_):
+        if not hasattr(local, 'worker'):
+            local.worker = Worker(url)
+            with lock:
+                workers.append(local.worker)
+        return local.worker.request(path)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        timings = list(executor.map(call, range(requests)))
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.connection.close()
+    latencies = sorted(timing for timing in timings if timing is not None)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        'path': path,
+        'requests': requests,
+        'errors': requests - len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер GET-запросами к страницам '
+        'и выводит req/s и перцентили задержки в JSON. Чтобы сравнить '
+        'WSGI- и ASGI-развертывание, запустите его против каждого '
+        'с разными --label'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес страницы; можно указать несколько раз. '
+                 'Подстановки: {author}, {group}, {post}'
+        )
+        parser.add_argument('--author', default='')
+        parser.add_argument('--group', default='')
+        parser.add_argument('--post', default='')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--label', default='')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError(
+                '--concurrency и --requests должны быть положительными'
+            )
+        paths = options['paths'] or [
+            path for path in DEFAULT_PATHS
+            if all(
+                options[name] or '{%s}' % name not in path
+                for name in ('author', 'group', 'post')
+            )
+        ]
+        url = options['url']
+        results = []
+        for path in paths:
+            path = path.format(
+                author=options['author'], group=options['group'],
+                post=options['post']
+            )
+            if options['warmup']:
+                run(url, path, options['concurrency'], options['warmup'])
+            results.append(run(
+                url, path, options['concurrency'], options['requests']
+            ))
+        self.stdout.write(json.dumps({
+            'label': options['label'],
+            'url': url,
+            'concurrency': options['concurrency'],
+            'results': results,
+        }))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает оценки популярности записей и групп; '
+        'запускается периодически, например, из cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at',
+            help='Момент расчета в ISO 8601 вместо текущего, например, '
+                 'для синтетических данных из прошлого'
+        )
+
+    def handle(self, *args, **options):
+        now = None
+        if options['at']:
+            moment = parse_datetime(options['at'])
+            if moment is None or moment.tzinfo is None:
+                raise CommandError('--at: нужна дата с часовым поясом')
+            now = moment.timestamp()
+        started = time.perf_counter()
+        posts, groups = trending.rebuild(now)
+        self.stdout.write(self.style.SUCCESS(
+            f'Оценено записей: {posts}, групп: {groups} '
+            f'за {time.perf_counter() - started:.2f} с'
+        ))
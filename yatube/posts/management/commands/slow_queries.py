@@ -0,0 +1,78 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube import querylog
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total_ms'],
+    'count': lambda entry: entry['count'],
+    'max': lambda entry: entry['max_ms'],
+    'p99': lambda entry: querylog.percentile(entry, 0.99),
+}
+
+
+def summary(key, entry):
+    views = entry['views'].most_common(3)
+    return {
+        'fingerprint': key,
+        'count': entry['count'],
+        'total_ms': round(entry['total_ms'], 1),
+        'mean_ms': round(entry['total_ms'] / entry['count'], 2),
+        'p50_ms': querylog.percentile(entry, 0.50),
+        'p99_ms': querylog.percentile(entry, 0.99),
+        'max_ms': round(entry['max_ms'], 1),
+        'views': dict(views),
+        'sql': entry['sql'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит отпечатки SQL-запросов с наибольшим суммарным временем '
+        'по гистограммам всех процессов из QUERYLOG_DIR'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.QUERYLOG_DIR)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=tuple(SORT_KEYS), default='total'
+        )
+        parser.add_argument(
+            '--max-age', type=int, default=2 * settings.QUERYLOG_WINDOW,
+            help='Не учитывать процессы, молчавшие дольше, с'
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if not options['dir']:
+            raise CommandError(
+                'Каталог гистограмм не задан: укажите --dir '
+                'или YATUBE_QUERYLOG_DIR'
+            )
+        entries = querylog.load_snapshots(options['dir'], options['max_age'])
+        top = sorted(
+            entries.items(),
+            key=lambda item: SORT_KEYS[options['sort']](item[1]),
+            reverse=True
+        )[:options['limit']]
+        rows = [summary(key, entry) for key, entry in top]
+        if options['json']:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False))
+            return
+        if not rows:
+            self.stdout.write('Нет данных о запросах')
+            return
+        for row in rows:
+            views = ', '.join(
+                f'{view} ({count})' for view, count in row['views'].items()
+            )
+            self.stdout.write(
+                f"{row['fingerprint']}  всего {row['total_ms']} мс, "
+                f"{row['count']} раз, p50 {row['p50_ms']} мс, "
+                f"p99 {row['p99_ms']} мс, max {row['max_ms']} мс"
+            )
+            self.stdout.write(f'    view: {views}')
+            self.stdout.write(f"    {row['sql']}")
@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import stress
+
+
+class Command(BaseCommand):
+    help = (
+        'Пишет комментарии из нескольких потоков в отдельную тестовую '
+        'базу SQLite в файле и выводит JSON с пропускной способностью '
+        'и числом ошибок блокировки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--writes', type=int, default=50,
+            help='Комментариев на поток'
+        )
+        parser.add_argument(
+            '--read-seconds', type=float, default=0,
+            help='Сколько секунд держать открытой транзакцию чтения, '
+                 'как долгий отчет, пока идет запись'
+        )
+        parser.add_argument(
+            '--timeout', type=float,
+            help='Ожидание блокировки драйвером sqlite3, с; в профиле '
+                 'для продакшена его задает busy_timeout'
+        )
+        parser.add_argument(
+            '--stock', action='store_true',
+            help='Без профиля SQLite для продакшена, для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда проверяет только SQLite')
+        directory = tempfile.mkdtemp()
+        try:
+            # Без DEBUG, как в продакшене: иначе время запросов съедает
+            # панель инструментов.
+            with override_settings(
+                DEBUG=False, SQLITE_PRODUCTION=not options['stock']
+            ), stress.file_database(
+                os.path.join(directory, 'stress.sqlite3'),
+                options['timeout']
+            ) as database:
+                with database.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+                result = stress.run(
+                    options['threads'], options['writes'],
+                    options['read_seconds']
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(json.dumps({
+            'profile': 'stock' if options['stock'] else 'production',
+            'journal_mode': journal_mode,
+            **result,
+        }, indent=2))
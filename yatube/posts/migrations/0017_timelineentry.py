@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TIMELINE_LENGTH = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    for follow in Follow.objects.all().iterator():
+        posts = Post.objects.filter(
+            author_id=follow.author_id
+        ).order_by('-pub_date').values_list('id', 'pub_date')
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=follow.user_id, post_id=post_id, pub_date=pub_date
+                )
+                for post_id, pub_date in posts[:TIMELINE_LENGTH]
+            ],
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Запись')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='posts_timeline_feed_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together={('user', 'post')},
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
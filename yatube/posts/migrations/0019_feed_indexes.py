@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    duplicates = (
+        Follow.objects.values('user', 'author')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    removed = 0
+    for row in duplicates.iterator():
+        removed += Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(id=row['first_id']).delete()[0]
+    if removed:
+        apps.get_model('posts', 'UserStats').objects.update(
+            followers_count=_count(Follow, 'author'),
+            following_count=_count(Follow, 'user'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='posts_comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date'], name='posts_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='posts_post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='posts_post_group_date_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='posts_follow_unique'),
+        ),
+    ]
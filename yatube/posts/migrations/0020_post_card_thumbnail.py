@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='card_thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Миниатюра для карточки'),
+        ),
+    ]
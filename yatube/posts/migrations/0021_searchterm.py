@@ -0,0 +1,63 @@
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+WORD_RE = re.compile(r'\w+')
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_TERM_COUNT = 10
+BATCH_SIZE = 500
+
+
+def tokenize(text):
+    words = (word.lower().replace('ё', 'е') for word in WORD_RE.findall(text))
+    return [
+        word[:MAX_TERM_LENGTH] for word in words
+        if len(word) >= MIN_TERM_LENGTH
+    ]
+
+
+def fill_search_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    posts = Post.objects.only('pk', 'text').order_by('pk')
+    batch = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        for term, count in Counter(tokenize(post.text)).items():
+            batch.append(SearchTerm(
+                post_id=post.pk, term=term, count=min(count, MAX_TERM_COUNT)
+            ))
+        if len(batch) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_card_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('count', models.PositiveSmallIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='posts_searchterm_unique'),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
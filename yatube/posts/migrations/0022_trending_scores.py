@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_searchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupScore',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='posts.group', verbose_name='Группа')),
+                ('score', models.FloatField(default=0, verbose_name='Оценка')),
+                ('scored_at', models.FloatField(verbose_name='Время оценки (unix)')),
+            ],
+            options={
+                'verbose_name': 'Оценка группы',
+                'verbose_name_plural': 'Оценки групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='posts.post', verbose_name='Запись')),
+                ('score', models.FloatField(default=0, verbose_name='Оценка')),
+                ('scored_at', models.FloatField(verbose_name='Время оценки (unix)')),
+            ],
+            options={
+                'verbose_name': 'Оценка записи',
+                'verbose_name_plural': 'Оценки записей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postscore',
+            index=models.Index(fields=['-score'], name='posts_postscore_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupscore',
+            index=models.Index(fields=['-score'], name='posts_groupscore_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+GROUP_TOP_AUTHORS = 3
+BATCH_SIZE = 500
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthorStats = apps.get_model('posts', 'GroupAuthorStats')
+    pairs = Post.objects.filter(
+        group__isnull=False
+    ).order_by().values_list('group', 'author').annotate(total=Count('pk'))
+    GroupAuthorStats.objects.bulk_create(
+        (
+            GroupAuthorStats(
+                group_id=group_id, author_id=author_id, posts_count=total
+            )
+            for group_id, author_id, total in pairs.iterator()
+        ),
+        batch_size=BATCH_SIZE
+    )
+    groups = Group.objects.order_by().annotate(
+        total=Count('posts'), last=Max('posts__pub_date')
+    ).values_list('pk', 'total', 'last')
+    stats = []
+    for group_id, total, last in groups:
+        top = GroupAuthorStats.objects.filter(
+            group_id=group_id
+        ).order_by('-posts_count', 'author_id').values_list(
+            'author__username', 'posts_count'
+        )[:GROUP_TOP_AUTHORS]
+        stats.append(GroupStats(
+            group_id=group_id, posts_count=total, last_post_date=last,
+            top_authors=[
+                {'username': username, 'posts_count': posts_count}
+                for username, posts_count in top
+            ]
+        ))
+    GroupStats.objects.bulk_create(stats, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0022_trending_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+                ('top_authors', models.JSONField(default=list, help_text='Имена и число записей, по убыванию числа записей', verbose_name='Самые активные авторы')),
+            ],
+            options={
+                'verbose_name': 'Статистика группы',
+                'verbose_name_plural': 'Статистика групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupAuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_stats', to='posts.group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Записи автора в группе',
+                'verbose_name_plural': 'Записи авторов в группах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupauthorstats',
+            index=models.Index(fields=['group', '-posts_count'], name='posts_groupauthorstats_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthorstats',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='posts_groupauthorstats_unique'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_group_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-followers_count'], name='posts_userstats_followers_idx'),
+        ),
+    ]
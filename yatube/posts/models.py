@@ -41,9 +41,31 @@ class Post(models.Model):
         blank=True, null=True,
         verbose_name='Изображение'
     )
+    card_thumbnail = models.CharField(
+        'Миниатюра для карточки',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date',), name='posts_post_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='posts_post_author_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date'),
+                name='posts_post_group_date_idx'
+            ),
+        )
         verbose_name = 'Запись'
         verbose_name_plural = 'Все записи'
 
@@ -75,6 +97,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('post', '-created'),
+                name='posts_comment_post_created_idx'
+            ),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Все комментарии'
 
@@ -95,3 +123,209 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор'
     )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='posts_follow_unique'
+            ),
+        )
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, поддерживаемые при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписан', default=0)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('-followers_count',),
+                name='posts_userstats_followers_idx'
+            ),
+        )
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Запись в предрассчитанной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Запись'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='posts_timeline_feed_idx'
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'{self.user} <- {self.post}'
+
+
+class SearchTerm(models.Model):
+    """Слово записи в инвертированном индексе поиска."""
+    term = models.CharField('Слово', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Запись'
+    )
+    count = models.PositiveSmallIntegerField('Число вхождений')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('term', 'post'),
+                name='posts_searchterm_unique'
+            ),
+        )
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+
+    def __str__(self):
+        return f'{self.term} -> {self.post_id}'
+
+
+class PostScore(models.Model):
+    """Затухающая оценка активности записи, см. posts/trending.py."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Запись'
+    )
+    score = models.FloatField('Оценка', default=0)
+    scored_at = models.FloatField('Время оценки (unix)')
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-score',), name='posts_postscore_idx'),
+        )
+        verbose_name = 'Оценка записи'
+        verbose_name_plural = 'Оценки записей'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class GroupScore(models.Model):
+    """Затухающая оценка активности группы, см. posts/trending.py."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Группа'
+    )
+    score = models.FloatField('Оценка', default=0)
+    scored_at = models.FloatField('Время оценки (unix)')
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-score',), name='posts_groupscore_idx'),
+        )
+        verbose_name = 'Оценка группы'
+        verbose_name_plural = 'Оценки групп'
+
+    def __str__(self):
+        return f'{self.group_id}: {self.score:.2f}'
+
+
+class GroupStats(models.Model):
+    """Статистика группы для каталога, см. posts/group_stats.py."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    last_post_date = models.DateTimeField(
+        'Последняя запись', null=True, blank=True
+    )
+    top_authors = models.JSONField(
+        'Самые активные авторы',
+        default=list,
+        help_text='Имена и число записей, по убыванию числа записей'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self):
+        return str(self.group)
+
+
+class GroupAuthorStats(models.Model):
+    """Число записей автора в группе, см. posts/group_stats.py."""
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='author_stats',
+        verbose_name='Группа'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('group', 'author'),
+                name='posts_groupauthorstats_unique'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('group', '-posts_count'),
+                name='posts_groupauthorstats_idx'
+            ),
+        )
+        verbose_name = 'Записи автора в группе'
+        verbose_name_plural = 'Записи авторов в группах'
+
+    def __str__(self):
+        return f'{self.group_id} <- {self.author_id}: {self.posts_count}'
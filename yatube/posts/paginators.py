@@ -0,0 +1,135 @@
+import base64
+import binascii
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, key, pk, state=''):
+    """Кодирует позицию записи (ключ, id) в непрозрачный токен.
+    Ключ — дата публикации или целое число, например ранг. state —
+    строка, которую выдача замораживает на время листания."""
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat()
+    raw = f'{direction}|{key}|{pk}'
+    if state:
+        raw += f'|{state}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _split_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    parts = raw.split('|')
+    if len(parts) == 3:
+        parts.append('')
+    return parts if len(parts) == 4 else None
+
+
+def decode_cursor(token, parse_key=parse_datetime):
+    """Раскодирует токен курсора. Для испорченного токена
+    возвращает None, и выдача начинается с первой страницы."""
+    parts = _split_cursor(token)
+    if parts is None:
+        return None
+    direction, key, pk, _ = parts
+    try:
+        key = parse_key(key)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (NEXT, PREVIOUS) or key is None:
+        return None
+    return direction, key, pk
+
+
+def cursor_state(token):
+    """Строка state из токена курсора или '' без нее."""
+    parts = _split_cursor(token)
+    return parts[3] if parts else ''
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Каждая страница выбирается одним запросом вида
+    ``WHERE (pub_date, id) < (...) ORDER BY pub_date DESC, id DESC LIMIT n``,
+    поэтому стоимость не зависит от глубины листания. Общее число
+    записей (``count``) считается только по явному обращению.
+    Поля ключа можно заменить через ``keys``, например на аннотации,
+    совпадающие с индексом другой таблицы, или на одно уникальное
+    поле, например ``keys=('pk',)``. Для ключа не из дат
+    ``parse_key`` восстанавливает его значение из токена. Строками
+    выдачи могут быть и словари из ``values()``. ``state`` попадает
+    во все выданные курсоры (см. ``cursor_state``): так выдача,
+    порядок которой зависит от меняющихся данных, сохраняет его
+    на время листания.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk'),
+                 parse_key=parse_datetime, state='', **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.state = state
+        # Ключ из одного поля: id_key совпадает с sort_key.
+        self.sort_key, self.id_key = keys[0], keys[-1]
+        self.parse_key = parse_key
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return row[self.sort_key], row[self.id_key]
+        return getattr(row, self.sort_key), getattr(row, self.id_key)
+
+    def _after(self, key, pk, lookup):
+        sort_key, id_key = self.sort_key, self.id_key
+        if sort_key == id_key:
+            return Q(**{f'{id_key}__{lookup}': pk})
+        return Q(**{f'{sort_key}__{lookup}': key}) | Q(**{
+            sort_key: key, f'{id_key}__{lookup}': pk
+        })
+
+    def get_page(self, token):
+        cursor = decode_cursor(token, self.parse_key)
+        descending = (f'-{self.sort_key}', f'-{self.id_key}')
+        ascending = (self.sort_key, self.id_key)
+        posts = self.object_list
+        if cursor is None:
+            direction = NEXT
+            rows = posts.order_by(*descending)
+        else:
+            direction, key, pk = cursor
+            if direction == NEXT:
+                rows = posts.filter(
+                    self._after(key, pk, 'lt')
+                ).order_by(*descending)
+            else:
+                rows = posts.filter(
+                    self._after(key, pk, 'gt')
+                ).order_by(*ascending)
+        rows = list(rows[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            has_next, has_previous = has_more, cursor is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        page = self._get_page(rows, None, self)
+        page.next_cursor = (
+            encode_cursor(NEXT, *self._position(rows[-1]), self.state)
+            if has_next and rows else None
+        )
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, *self._position(rows[0]), self.state)
+            if has_previous and rows else None
+        )
+        return page
@@ -0,0 +1,147 @@
+"""Полнотекстовый поиск по записям.
+
+Инвертированный индекс хранится в таблице SearchTerm: для каждого
+слова записи — число его вхождений. Индекс обновляется сигналами
+при сохранении записи, поэтому поиск читает только строки слов
+запроса по индексу (term, post) и не просматривает таблицу записей.
+Результаты ранжируются по tf-idf: сумма вхождений слов запроса,
+взвешенных по редкости слова.
+
+Веса слов меняются с каждой новой записью, а с ними и ранги. Чтобы
+курсор, выданный до записи, не пропускал и не повторял результаты,
+веса первой страницы замораживаются в курсоре (freeze_weights())
+и следующие страницы ранжируются по ним же.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db.models import (Case, Count, F, IntegerField, Max, Sum, Value,
+                              When)
+
+from .models import Post, SearchTerm
+
+WORD_RE = re.compile(r'\w+')
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+# Больше слов в запросе не учитывается.
+MAX_QUERY_TERMS = 8
+# Повторы слова сверх этого числа не повышают ранг записи.
+MAX_TERM_COUNT = 10
+# Ранг хранится целым, чтобы курсор сравнивал его точно.
+RANK_SCALE = 1000
+# Ключ листания результатов поиска.
+SEARCH_KEYS = ('rank', 'pk')
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, ё приводится к е."""
+    words = (word.lower().replace('ё', 'е') for word in WORD_RE.findall(text))
+    return [
+        word[:MAX_TERM_LENGTH] for word in words
+        if len(word) >= MIN_TERM_LENGTH
+    ]
+
+
+def index_terms(post):
+    """Строки индекса для записи."""
+    counts = Counter(tokenize(post.text))
+    return [
+        SearchTerm(post_id=post.pk, term=term,
+                   count=min(count, MAX_TERM_COUNT))
+        for term, count in counts.items()
+    ]
+
+
+def index_post(post):
+    """Заново индексирует текст записи."""
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(index_terms(post))
+
+
+def rebuild(batch_size=500):
+    """Полностью перестраивает индекс."""
+    SearchTerm.objects.all().delete()
+    posts = Post.objects.only('pk', 'text').order_by('pk')
+    batch = []
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.extend(index_terms(post))
+        if len(batch) >= batch_size:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(batch)
+
+
+def no_results():
+    return Post.objects.annotate(
+        rank=Value(0, output_field=IntegerField())
+    ).none()
+
+
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def term_weights(terms):
+    """Целые веса слов по их редкости или None, если какого-то
+    слова нет в индексе."""
+    if not terms:
+        return None
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=terms)
+        .values('term')
+        .annotate(posts=Count('id'))
+        .values_list('term', 'posts')
+    )
+    if len(frequencies) < len(terms):
+        return None
+    # Число записей оценивается наибольшим id, он читается из индекса
+    # за один шаг. После удалений записей оценка больше их числа:
+    # веса всех слов немного растут, на их соотношение это почти
+    # не влияет.
+    total = Post.objects.aggregate(total=Max('pk'))['total'] or 1
+    return [
+        round(RANK_SCALE * math.log(1 + total / frequencies[term]))
+        for term in terms
+    ]
+
+
+def freeze_weights(weights):
+    """Веса слов строкой для state курсора."""
+    return ','.join(map(str, weights))
+
+
+def thaw_weights(state, terms):
+    """Веса из state курсора или None, если они не подходят
+    к словам запроса."""
+    try:
+        weights = [int(weight) for weight in state.split(',')]
+    except ValueError:
+        return None
+    if len(weights) != len(terms) or min(weights) < 0:
+        return None
+    return weights
+
+
+def search_posts(query, weights=None):
+    """Queryset записей, содержащих все слова запроса, с аннотацией
+    ранга rank для листания по SEARCH_KEYS. weights — веса слов
+    запроса из term_weights(); без них считаются заново."""
+    terms = query_terms(query)
+    if not terms:
+        return no_results()
+    if weights is None:
+        weights = term_weights(terms)
+        if weights is None:
+            return no_results()
+    cases = [
+        When(search_terms__term=term, then=weight)
+        for term, weight in zip(terms, weights)
+    ]
+    return Post.objects.filter(search_terms__term__in=terms).annotate(
+        rank=Sum(
+            Case(*cases, output_field=IntegerField())
+            * F('search_terms__count')
+        ),
+        matched=Count('search_terms'),
+    ).filter(matched=len(terms)).order_by('-rank', '-pk')
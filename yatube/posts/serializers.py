@@ -0,0 +1,62 @@
+"""Компактные сериализаторы для JSON API.
+
+Каждый сериализатор описан списком столбцов для ``values()``:
+queryset выбирает только их, с нужными JOIN, без создания моделей.
+Функции serialize_* превращают строку выборки в словарь ответа.
+"""
+from django.conf import settings
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+    'card_thumbnail', 'comments_count',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+GROUP_FIELDS = ('slug', 'title', 'description')
+PROFILE_FIELDS = (
+    'username', 'first_name', 'last_name', 'stats__posts_count',
+    'stats__followers_count', 'stats__following_count',
+)
+
+
+def media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+def serialize_post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': media_url(row['image']),
+        'thumbnail': row['card_thumbnail'] or None,
+        'comments_count': row['comments_count'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def serialize_group(row):
+    return {
+        'slug': row['slug'],
+        'title': row['title'],
+        'description': row['description'],
+    }
+
+
+def serialize_profile(row):
+    return {
+        'username': row['username'],
+        'full_name': f"{row['first_name']} {row['last_name']}".strip(),
+        'posts_count': row['stats__posts_count'] or 0,
+        'followers_count': row['stats__followers_count'] or 0,
+        'following_count': row['stats__following_count'] or 0,
+    }
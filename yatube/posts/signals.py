@@ -0,0 +1,160 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import (caching, counters, events, follows, group_stats, search,
+               thumbnails, timeline, trending)
+from .models import Comment, Follow, Group, GroupAuthorStats, Post, UserStats
+
+User = get_user_model()
+
+# pk записей, удаляемых сейчас: их комментарии удаляются каскадом,
+# и работа по каждому из них (счетчик, оценка, сброс кеша) не нужна —
+# запись учитывается один раз в post_deleting/post_deleted.
+_deleting_posts = set()
+
+
+def image_name(post):
+    """Имя файла изображения без загрузки отложенного поля."""
+    image = post.__dict__.get('image')
+    return getattr(image, 'name', image) or ''
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    instance._initial_group_id = instance.__dict__.get('group_id')
+    instance._initial_image = image_name(instance)
+    instance._initial_text = instance.__dict__.get('text')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._image_changed = image_name(instance) != instance._initial_image
+    if instance._image_changed:
+        instance.card_thumbnail = ''
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_stats(instance.author_id, 'posts_count', 1)
+        timeline.fan_out_post(instance)
+        trending.record_post(instance)
+        transaction.on_commit(lambda: events.publish_post(instance))
+    group_stats.record_post(instance, created)
+    caching.bump_post_pages(instance)
+    if instance._image_changed and instance.image:
+        thumbnails.schedule_thumbnails(instance)
+    text = instance.__dict__.get('text')
+    if created or text != instance._initial_text:
+        search.index_post(instance)
+    instance._initial_group_id = instance.group_id
+    instance._initial_image = image_name(instance)
+    instance._initial_text = text
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts.add(instance.pk)
+    trending.record_post_deleted(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts.discard(instance.pk)
+    counters.change_user_stats(instance.author_id, 'posts_count', -1)
+    group_stats.record_post_deleted(instance)
+    caching.bump_post_pages(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+        trending.record_comment(instance)
+    caching.bump_post_pages(instance.post)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts:
+        return
+    counters.change_comments_count(instance.post_id, -1)
+    trending.record_comment(instance, -1)
+    caching.bump_post_pages(instance.post)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_stats(instance.author_id, 'followers_count', 1)
+        counters.change_user_stats(instance.user_id, 'following_count', 1)
+        timeline.followers_changed([instance.author_id], 1)
+        timeline.backfill(instance.user, instance.author)
+        trending.record_follow(instance.author_id)
+    caching.bump(
+        caching.USER.format(username=instance.author.username),
+        caching.USER.format(username=instance.user.username),
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if instance.user_id in follows.unfollowing:
+        return
+    counters.change_user_stats(instance.author_id, 'followers_count', -1)
+    counters.change_user_stats(instance.user_id, 'following_count', -1)
+    timeline.trim(instance.user, instance.author)
+    timeline.followers_changed([instance.author_id], -1)
+    trending.record_follow(instance.author_id, -1)
+    caching.bump(
+        caching.USER.format(username=instance.author.username),
+        caching.USER.format(username=instance.user.username),
+    )
+
+
+def group_scopes(group):
+    """Области кеша, на которых видна группа: ленты, каталог,
+    страницы группы под текущим и прежним адресом и профили ее
+    авторов."""
+    slugs = {group.slug, group._initial_slug} - {None}
+    authors = GroupAuthorStats.objects.filter(
+        group_id=group.pk
+    ).values_list('author__username', flat=True)
+    return [
+        caching.FEED, caching.GROUPS,
+        *(caching.GROUP.format(slug=slug) for slug in slugs),
+        *(caching.USER.format(username=username) for username in authors),
+    ]
+
+
+@receiver(post_init, sender=Group)
+def group_loaded(sender, instance, **kwargs):
+    instance._initial_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        group_stats.create_stats(instance)
+    caching.bump(*group_scopes(instance))
+    instance._initial_slug = instance.slug
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Статистика авторов удаляется каскадом, области собираются до нее.
+    instance._cache_scopes = group_scopes(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    caching.bump(*instance._cache_scopes)
@@ -0,0 +1,148 @@
+"""ASGI-приложение потоков Server-Sent Events о новых записях.
+
+Django 3.2 отдает потоковые ответы синхронным итератором, который
+под ASGI занимает поток на все время соединения. Поэтому потоки
+обслуживаются этим приложением напрямую: соединение — одна корутина,
+ждущая событий брокера posts.events, и тысячи простаивающих
+подписчиков почти ничего не стоят. yatube/asgi.py направляет сюда
+запросы с префиксом EVENTS_URL.
+
+Адреса: EVENTS_URL — общая лента, group/<slug>/ — группа,
+follow/ — лента подписок вошедшего пользователя.
+"""
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.utils.module_loading import import_string
+
+from .events import AUTHOR, FEED, GROUP, broker
+from .models import Follow, Group
+
+GROUP_RE = re.compile(r'^group/(?P<slug>[-a-zA-Z0-9_]+)/$')
+
+
+def session_user_id(scope):
+    """id пользователя из сессии по cookie запроса. Сессия проверяется
+    django.contrib.auth.get_user так же, как в middleware: сессия,
+    хеш которой не совпадает с хешем пароля пользователя (например,
+    после смены пароля), сбрасывается и пользователя не дает."""
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', ()):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_string(settings.SESSION_ENGINE + '.SessionStore')
+    user = get_user(SimpleNamespace(session=engine(morsel.value)))
+    return user.pk if user.is_authenticated else None
+
+
+@sync_to_async
+def resolve_channels(scope, path):
+    """Каналы брокера для адреса потока. Лента подписок собирается
+    из каналов авторов на момент подключения."""
+    if path == '':
+        return [FEED]
+    match = GROUP_RE.match(path)
+    if match:
+        slug = match.group('slug')
+        if not Group.objects.filter(slug=slug).exists():
+            raise Http404
+        return [GROUP.format(slug=slug)]
+    if path == 'follow/':
+        user_id = session_user_id(scope)
+        if user_id is None:
+            raise PermissionDenied
+        authors = Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+        return [AUTHOR.format(author_id=author_id) for author_id in authors]
+    raise Http404
+
+
+async def send_text(send, status, text):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def stream(subscription, receive, send):
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': f'retry: {settings.EVENTS_RETRY_MS}\n\n'.encode(),
+        'more_body': True,
+    })
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        while True:
+            event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {event, disconnect},
+                timeout=settings.EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect in done:
+                event.cancel()
+                return
+            if event in done:
+                data = json.dumps(event.result())
+                body = f'event: post\ndata: {data}\n\n'
+            else:
+                # Комментарий не дает прокси закрыть тихое соединение.
+                event.cancel()
+                body = ': ping\n\n'
+            await send({
+                'type': 'http.response.body',
+                'body': body.encode(),
+                'more_body': True,
+            })
+    finally:
+        disconnect.cancel()
+
+
+async def application(scope, receive, send):
+    path = scope['path'][len(settings.EVENTS_URL):]
+    if scope['method'] != 'GET':
+        await send_text(send, 405, 'Method Not Allowed')
+        return
+    try:
+        channels = await resolve_channels(scope, path)
+    except Http404:
+        await send_text(send, 404, 'Not Found')
+        return
+    except PermissionDenied:
+        await send_text(send, 403, 'Forbidden')
+        return
+    subscription = broker.subscribe(channels)
+    try:
+        await stream(subscription, receive, send)
+    finally:
+        subscription.close()
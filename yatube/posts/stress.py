@@ -0,0 +1,150 @@
+"""Конкурентная запись комментариев (команда stress_sqlite).
+
+Несколько потоков, каждый со своим тестовым клиентом, заранее
+вошедшим на сайт, и своим соединением с базой, одновременно
+отправляют комментарии через add_comment: запись проходит весь путь
+запроса вместе с сессией, счетчиками и сбросом кеша. Ошибки базы,
+в том числе database is locked, считаются, а не прерывают замер.
+
+Пока пишут потоки, еще один может держать открытой транзакцию
+чтения, как долгий отчет или выгрузка. В журнале отката она не дает
+писателям зафиксировать запись дольше ожидания блокировки, в WAL
+писателям не мешает.
+
+Замер идет на отдельной базе в файле, которую подставляет
+file_database: тестовая база SQLite по умолчанию в памяти, а WAL
+и блокировки проверяются на файле.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import (
+    DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+)
+from django.test import Client
+from django.urls import reverse
+
+from yatube.replicas import primary_only
+
+from .benchmarks import percentile
+from .models import Comment, Post
+
+User = get_user_model()
+
+
+@contextmanager
+def file_database(path, timeout=None):
+    """Подменяет базу default во всех потоках на новую базу в файле
+    path со схемой проекта и отдает ее соединение. timeout — ожидание
+    блокировки драйвером sqlite3, с; прагма busy_timeout профиля для
+    продакшена его переопределяет. Прежнее соединение текущего потока
+    не закрывается и возвращается при выходе."""
+    databases = connections.databases
+    original = databases[DEFAULT_DB_ALIAS]
+    previous = connections[DEFAULT_DB_ALIAS]
+    databases[DEFAULT_DB_ALIAS] = {
+        **original,
+        'NAME': path,
+        'OPTIONS': (
+            original['OPTIONS'] if timeout is None
+            else {**original['OPTIONS'], 'timeout': timeout}
+        ),
+    }
+    connection = connections.create_connection(DEFAULT_DB_ALIAS)
+    connections[DEFAULT_DB_ALIAS] = connection
+    try:
+        # У реплики копии этой базы нет.
+        with primary_only():
+            call_command('migrate', verbosity=0, interactive=False)
+            yield connection
+    finally:
+        connection.close()
+        databases[DEFAULT_DB_ALIAS] = original
+        connections[DEFAULT_DB_ALIAS] = previous
+
+
+def _reader(seconds, barrier):
+    try:
+        with transaction.atomic():
+            try:
+                # Блокировка чтения берется до старта писателей.
+                Post.objects.exists()
+            except BaseException:
+                barrier.abort()
+                raise
+            barrier.wait()
+            time.sleep(seconds)
+    finally:
+        connections.close_all()
+
+
+def _writer(client, url, writes, latencies, errors, barrier):
+    try:
+        barrier.wait()
+        for number in range(writes):
+            started = time.perf_counter()
+            try:
+                client.post(url, {'text': f'Комментарий {number}'})
+            except OperationalError as error:
+                errors.append(str(error))
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        connections.close_all()
+
+
+def run(threads, writes, read_seconds=0):
+    """Пишет threads * writes комментариев из threads потоков
+    и возвращает пропускную способность и ошибки. При read_seconds
+    еще один поток столько секунд держит открытой транзакцию чтения."""
+    author = User.objects.create_user(username='stress-author')
+    post = Post.objects.create(text='Запись для комментариев', author=author)
+    url = reverse('add_comment', args=(author.username, post.pk))
+    clients = []
+    for number in range(threads):
+        client = Client()
+        client.force_login(
+            User.objects.create_user(username=f'stress-{number}')
+        )
+        clients.append(client)
+    latencies = []
+    errors = []
+    # Потоки начинают писать одновременно, после того как читатель
+    # открыл транзакцию.
+    barrier = threading.Barrier(threads + 1 + bool(read_seconds))
+    workers = [
+        threading.Thread(
+            target=_writer,
+            args=(client, url, writes, latencies, errors, barrier)
+        )
+        for client in clients
+    ]
+    reader = threading.Thread(target=_reader, args=(read_seconds, barrier))
+    for worker in workers:
+        worker.start()
+    if read_seconds:
+        reader.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - started
+    if read_seconds:
+        reader.join()
+    latencies.sort()
+    saved = Comment.objects.filter(post=post).count()
+    return {
+        'threads': threads,
+        'read_seconds': read_seconds,
+        'writes': threads * writes,
+        'saved': saved,
+        'errors': len(errors),
+        'locked_errors': sum('locked' in error for error in errors),
+        'seconds': round(seconds, 3),
+        'writes_per_s': round(saved / seconds, 1),
+        'p50_ms': round(percentile(latencies, 0.50) or 0, 2),
+        'p99_ms': round(percentile(latencies, 0.99) or 0, 2),
+    }
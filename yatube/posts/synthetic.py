@@ -0,0 +1,125 @@
+"""Синтетические данные для нагрузочных замеров (команда generate_data).
+
+Строки выдаются в формате выгрузки posts.transfer и загружаются
+его Importer. При одном и том же seed получаются одни и те же
+данные. Популярность авторов распределена по закону Ципфа: немногие
+авторы пишут большую часть записей и собирают большую часть подписок,
+а число подписок пользователя имеет распределение Парето.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+
+from django.db import reset_queries
+from django.db.models import Max
+
+from . import transfer
+from .models import Comment, Post
+
+WORDS = (
+    'кот пес дом лес река гора небо город море поле утро вечер ночь день '
+    'весна лето осень зима дорога поезд книга письмо окно сад дерево цветок '
+    'птица ветер дождь снег солнце луна звезда песня музыка картина друг '
+    'работа отпуск кофе чай завтрак ужин прогулка фотография путешествие '
+    'новость история вопрос ответ идея проект код программа ошибка релиз'
+).split()
+
+# Показатель закона Ципфа для популярности авторов и групп.
+ZIPF_EXPONENT = 1.1
+# Параметр распределения Парето числа подписок, его среднее — 3.
+PARETO_SHAPE = 1.5
+PARETO_MEAN = PARETO_SHAPE / (PARETO_SHAPE - 1)
+# Доля записей без группы.
+NO_GROUP_SHARE = 0.3
+# Записи распределены по периоду SPAN, заканчивающемуся в END.
+SPAN = timedelta(days=365)
+END = datetime(2021, 6, 1, tzinfo=timezone.utc)
+
+
+def zipf_weights(count):
+    """Накопленные веса для random.choices: вес i-го элемента
+    обратно пропорционален (i + 1) ** ZIPF_EXPONENT."""
+    return list(accumulate(
+        1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(count)
+    ))
+
+
+def _text(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(5, 40))).capitalize()
+
+
+def _date(index, total):
+    """Дата записи растет вместе с ее номером."""
+    return END - SPAN + SPAN * (index + 1) / total
+
+
+def generate_rows(users, groups, posts, comments, follows, seed=0,
+                  prefix='user', first_post_id=1, first_comment_id=1):
+    """Строки (model, row) для posts.transfer.Importer.
+    follows — среднее число подписок пользователя."""
+    rng = random.Random(seed)
+    usernames = [f'{prefix}{i}' for i in range(users)]
+    slugs = [f'{prefix}-group-{i}' for i in range(groups)]
+    user_weights = zipf_weights(users)
+    group_weights = zipf_weights(groups)
+    for username in usernames:
+        yield 'user', {
+            'username': username, 'email': f'{username}@example.com',
+            'first_name': '', 'last_name': '', 'password': '',
+            'date_joined': (END - SPAN).isoformat(),
+        }
+    for i, slug in enumerate(slugs):
+        yield 'group', {
+            'slug': slug, 'title': f'Группа {i}', 'description': _text(rng),
+        }
+    for i in range(posts):
+        group = ''
+        if slugs and rng.random() >= NO_GROUP_SHARE:
+            group = rng.choices(slugs, cum_weights=group_weights)[0]
+        yield 'post', {
+            'id': first_post_id + i,
+            'author': rng.choices(usernames, cum_weights=user_weights)[0],
+            'group': group, 'text': _text(rng),
+            'pub_date': _date(i, posts).isoformat(), 'image': '',
+        }
+    for i in range(comments if posts else 0):
+        # Свежие записи комментируют чаще.
+        index = posts - 1 - int(posts * rng.random() ** 3)
+        created = _date(index, posts) + timedelta(
+            minutes=rng.randint(1, 60 * 24)
+        )
+        yield 'comment', {
+            'id': first_comment_id + i, 'post': first_post_id + index,
+            'author': rng.choice(usernames), 'text': _text(rng),
+            'created': created.isoformat(),
+        }
+    for username in usernames:
+        count = int(follows * rng.paretovariate(PARETO_SHAPE) / PARETO_MEAN)
+        authors = set(rng.choices(
+            usernames, cum_weights=user_weights, k=min(count, users - 1)
+        ))
+        authors.discard(username)
+        for author in sorted(authors):
+            yield 'follow', {'user': username, 'author': author}
+
+
+def load(users, groups, posts, comments, follows, seed=0,
+         prefix='user', batch_size=2000):
+    """Загружает синтетические данные после уже имеющихся
+    и возвращает число строк каждой модели."""
+    rows = generate_rows(
+        users, groups, posts, comments, follows, seed=seed, prefix=prefix,
+        first_post_id=(Post.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1,
+        first_comment_id=(
+            Comment.objects.aggregate(Max('pk'))['pk__max'] or 0
+        ) + 1,
+    )
+    importer = transfer.Importer()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        importer.import_batch(batch)
+        reset_queries()
+    importer.finish()
+    return importer.counts
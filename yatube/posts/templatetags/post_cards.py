@@ -0,0 +1,42 @@
+from django import template
+from django.urls import reverse
+
+register = template.Library()
+
+
+def _url(context, name, *args):
+    """reverse() с запоминанием на время отрисовки страницы:
+    у записей ленты часто общие авторы и группы."""
+    urls = context.render_context.get('post_card_urls')
+    if urls is None:
+        urls = context.render_context['post_card_urls'] = {}
+    key = (name, *args)
+    if key not in urls:
+        urls[key] = reverse(name, args=args)
+    return urls[key]
+
+
+@register.inclusion_tag('includes/post_card.html', takes_context=True)
+def post_card(context, post):
+    """Карточка записи. Шаблон карточки получает только нужные ему
+    значения, а адреса строятся здесь, без тегов {% url %}.
+    Ссылка на комментарии показывается в списках записей (есть page)."""
+    user = context.get('user')
+    author = post.author.username
+    is_author = user is not None and user.pk == post.author_id
+    return {
+        'post': post,
+        'profile_url': _url(context, 'profile', author),
+        'group_url': (
+            _url(context, 'group_posts', post.group.slug)
+            if post.group_id else None
+        ),
+        'post_url': (
+            reverse('post', args=(author, post.pk))
+            if 'page' in context else None
+        ),
+        'edit_url': (
+            reverse('post_edit', args=(author, post.pk))
+            if is_author else None
+        ),
+    }
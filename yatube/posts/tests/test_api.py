@@ -0,0 +1,150 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from yatube.settings import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(POSTS_PER_PAGE + 3):
+            cls.post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.user,
+                group=cls.group
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail(self):
+        """Запись отдается вместе с первой страницей комментариев."""
+        post = ApiTests.post
+        response = self.client.get(reverse('api_post', args=(post.id,)))
+        data = response.json()
+        self.assertEqual(data['id'], post.id)
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['author'], ApiTests.user.username)
+        self.assertEqual(data['group'], ApiTests.group.slug)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Комментарий']
+        )
+
+    def test_group_and_profile(self):
+        """Группа и профиль отдаются с метаданными и счетчиками."""
+        group = self.client.get(
+            reverse('api_group', args=(ApiTests.group.slug,))
+        ).json()
+        self.assertEqual(group['title'], ApiTests.group.title)
+        profile = self.client.get(
+            reverse('api_profile', args=(ApiTests.user.username,))
+        ).json()
+        self.assertEqual(profile['posts_count'], POSTS_PER_PAGE + 3)
+        self.assertEqual(profile['followers_count'], 1)
+
+    def test_missing_objects(self):
+        """Для несуществующих объектов возвращается 404."""
+        urls = (
+            reverse('api_post', args=(0,)),
+            reverse('api_post_comments', args=(0,)),
+            reverse('api_group', args=('missing',)),
+            reverse('api_profile_posts', args=('missing',)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты листаются курсором, каждая страница — один запрос
+        к записям с нужными столбцами."""
+        urls = (
+            reverse('api_posts'),
+            reverse('api_group_posts', args=(ApiTests.group.slug,)),
+            reverse('api_profile_posts', args=(ApiTests.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(len(first['results']), POSTS_PER_PAGE)
+                self.assertIsNone(first['previous'])
+                second = self.client.get(first['next']).json()
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next'])
+                ids = [post['id'] for post in
+                       first['results'] + second['results']]
+                self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_conditional_requests(self):
+        """Повторный запрос с ETag получает 304 без запросов к БД,
+        новая запись меняет ETag."""
+        url = reverse('api_posts')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новая запись', author=ApiTests.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_group_changes_reset_pages(self):
+        """Переименование и удаление группы сбрасывают кеш и ETag
+        страниц группы и лент."""
+        group = Group.objects.create(
+            title='Временная группа', slug='temp-slug', description='Описание'
+        )
+        Post.objects.create(text='Запись во временной группе',
+                            author=ApiTests.user, group=group)
+        urls = (
+            reverse('api_posts'),
+            reverse('api_group', args=('temp-slug',)),
+            reverse('api_group_posts', args=('temp-slug',)),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        group.title = 'Новое название'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                etags[url] = response['ETag']
+        group.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertNotEqual(response.status_code, 304)
+        response = self.client.get(reverse('api_posts'))
+        self.assertNotContains(response, 'temp-slug')
+
+    def test_serializers_benchmark(self):
+        """Бенчмарк сериализации выводит результаты в JSON."""
+        out = StringIO()
+        call_command('bench_serializers', rows=10, repeat=1, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertGreater(results['compact_rows_per_second'], 0)
+        self.assertGreater(results['django_rows_per_second'], 0)
@@ -0,0 +1,152 @@
+import json
+import re
+import threading
+import time
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.http import Http404
+from django.test import (LiveServerTestCase, RequestFactory,
+                         TransactionTestCase)
+from django.urls import reverse
+
+from posts import async_views, views
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Маскированный CSRF-токен формы меняется при каждой отрисовке.
+CSRF_RE = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+class AsyncViewsTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Testuser')
+        self.reader = User.objects.create_user(username='Reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        Follow.objects.create(user=self.reader, author=self.user)
+        for i in range(3):
+            self.post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=self.user,
+                group=self.group
+            )
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.factory = RequestFactory()
+
+    def get(self, view, url, user, **kwargs):
+        cache.clear()
+        request = self.factory.get(url)
+        request.user = user
+        response = view(request, **kwargs)
+        response.content = CSRF_RE.sub(b'', response.content)
+        return response
+
+    def test_async_pages_match_sync_pages(self):
+        """Асинхронные страницы совпадают с синхронными."""
+        username = self.user.username
+        cases = (
+            ('index', reverse('index'), {}),
+            ('group_posts', reverse('group_posts', args=(self.group.slug,)),
+             {'slug': self.group.slug}),
+            ('profile', reverse('profile', args=(username,)),
+             {'username': username}),
+            ('post_view', reverse('post', args=(username, self.post.id)),
+             {'username': username, 'post_id': self.post.id}),
+        )
+        for user in (AnonymousUser(), self.reader):
+            for name, url, kwargs in cases:
+                with self.subTest(view=name, user=user):
+                    sync_response = self.get(
+                        getattr(views, name), url, user, **kwargs
+                    )
+                    async_response = self.get(
+                        async_to_sync(getattr(async_views, name)),
+                        url, user, **kwargs
+                    )
+                    self.assertEqual(async_response.status_code, 200)
+                    self.assertEqual(
+                        async_response.content, sync_response.content
+                    )
+
+    def test_missing_objects(self):
+        """Несуществующие объекты дают 404, как в синхронных view."""
+        cases = (
+            (async_views.group_posts, {'slug': 'missing'}),
+            (async_views.profile, {'username': 'missing'}),
+            (async_views.post_view,
+             {'username': self.reader.username, 'post_id': self.post.id}),
+        )
+        for view, kwargs in cases:
+            with self.subTest(view=view.__name__):
+                request = self.factory.get('/')
+                request.user = AnonymousUser()
+                with self.assertRaises(Http404):
+                    async_to_sync(view)(request, **kwargs)
+
+    async def test_queries_run_concurrently(self):
+        """Вне транзакции функции выполняются одновременно."""
+        started = time.perf_counter()
+        results = await async_views.run_concurrently(
+            lambda: time.sleep(0.2) or 1,
+            lambda: time.sleep(0.2) or 2,
+        )
+        self.assertEqual(results, [1, 2])
+        self.assertLess(time.perf_counter() - started, 0.35)
+
+    def test_transaction_runs_in_request_thread(self):
+        """Внутри транзакции функции выполняются по очереди в потоке
+        запроса и видят ее изменения."""
+        with transaction.atomic():
+            Post.objects.create(text='В транзакции', author=self.user)
+            thread, count = async_to_sync(async_views.run_concurrently)(
+                threading.get_ident,
+                lambda: Post.objects.filter(text='В транзакции').count(),
+            )
+        self.assertEqual(thread, threading.get_ident())
+        self.assertEqual(count, 1)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+
+    def test_loadtest_reports_latency(self):
+        """Команда loadtest выводит req/s и перцентили по каждой странице."""
+        User.objects.create_user(username='Testuser')
+        out = StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, concurrency=4,
+            requests=20, warmup=0, label='wsgi', author='Testuser',
+            stdout=out
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['label'], 'wsgi')
+        self.assertEqual(
+            [result['path'] for result in report['results']],
+            ['/', '/Testuser/']
+        )
+        for result in report['results']:
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['requests_per_second'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_errors_are_counted(self):
+        """Ответы с ошибкой не попадают в задержки."""
+        out = StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, path=['/missing/'],
+            concurrency=2, requests=5, warmup=0, stdout=out
+        )
+        result = json.loads(out.getvalue())['results'][0]
+        self.assertEqual(result['errors'], 5)
+        self.assertIsNone(result['p99_ms'])
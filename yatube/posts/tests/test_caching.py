@@ -0,0 +1,205 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Comment, Group, Post
+from yatube.caches import TwoTierCache, cache_settings, parse_cache_url
+
+SHARED_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class CacheSettingsTests(TestCase):
+
+    def test_parse_cache_url(self):
+        """URL кеша превращается в настройки бэкенда."""
+        urls = (
+            ('locmem://', 'locmem.LocMemCache', ''),
+            ('file:///tmp/yatube', 'filebased.FileBasedCache', '/tmp/yatube'),
+        )
+        for url, backend, location in urls:
+            with self.subTest(url=url):
+                config = parse_cache_url(url)
+                self.assertIn(backend, config['BACKEND'])
+                self.assertEqual(config['LOCATION'], location)
+
+    def test_unknown_scheme(self):
+        """Схемы без установленного бэкенда не принимаются."""
+        for url in ('memcached://a:11211', 'redis://localhost:6379/0'):
+            with self.subTest(url=url):
+                with self.assertRaises(ValueError):
+                    parse_cache_url(url)
+
+    def test_workers_need_shared_cache(self):
+        """Несколько воркеров не запускаются с кешем в памяти
+        процесса, с общим файловым кешем запускаются."""
+        with self.assertRaises(ImproperlyConfigured):
+            cache_settings({'WEB_CONCURRENCY': '4'})
+        with self.assertRaises(ImproperlyConfigured):
+            cache_settings({
+                'WEB_CONCURRENCY': '4',
+                'YATUBE_CACHE_URL': 'locmem://',
+                'YATUBE_CACHE_LOCAL_TIMEOUT': '5',
+            })
+        config = cache_settings({
+            'WEB_CONCURRENCY': '4', 'YATUBE_CACHE_URL': 'file:///tmp/yatube'
+        })
+        self.assertIn('FileBasedCache', config['default']['BACKEND'])
+
+    def test_two_tier_settings(self):
+        """Локальный таймаут включает двухуровневый кеш."""
+        config = cache_settings({
+            'YATUBE_CACHE_URL': 'file:///tmp/yatube',
+            'YATUBE_CACHE_LOCAL_TIMEOUT': '5',
+        })
+        self.assertEqual(config['default']['BACKEND'],
+                         'yatube.caches.TwoTierCache')
+        self.assertIn('FileBasedCache', config['shared']['BACKEND'])
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_DIR,
+    },
+})
+class TwoTierCacheTests(TestCase):
+    """Два экземпляра TwoTierCache изображают два воркера
+    с общим файловым кешем."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SHARED_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        params = {'OPTIONS': {'SHARED': 'shared', 'LOCAL_TIMEOUT': 60}}
+        self.worker_a = TwoTierCache('worker-a', params)
+        self.worker_b = TwoTierCache('worker-b', params)
+        self.worker_a.clear()
+        self.worker_b.clear()
+
+    def test_page_is_shared_and_kept_locally(self):
+        """Страница, сохраненная одним воркером, видна другому
+        и дальше читается им из локального уровня."""
+        key = caching.PAGE_PREFIX + 'page'
+        self.worker_a.set(key, 'content')
+        self.assertEqual(self.worker_b.get(key), 'content')
+        self.worker_b.shared.delete(key)
+        self.assertEqual(self.worker_b.get(key), 'content')
+
+    def test_version_bump_is_visible_to_other_worker(self):
+        """Счетчики версий не кешируются локально."""
+        key = caching.VERSION_PREFIX + caching.FEED
+        self.worker_a.set(key, 1)
+        self.assertEqual(self.worker_b.get(key), 1)
+        self.worker_a.incr(key)
+        self.assertEqual(self.worker_b.get(key), 2)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.user)
+        post = ConditionalGetTests.post
+        self.urls = (
+            reverse('index'),
+            reverse('group_posts', args=(ConditionalGetTests.group.slug,)),
+            reverse('profile', args=(post.author.username,)),
+            reverse('post', args=(post.author.username, post.id)),
+            reverse('post_comments', args=(post.author.username, post.id)),
+        )
+
+    def test_not_modified_for_anonymous(self):
+        """Повторный запрос гостя с валидаторами получает 304
+        без запросов к БД."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url,
+                        HTTP_IF_NONE_MATCH=response['ETag'],
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_for_user(self):
+        """Для вошедшего пользователя 304 стоит не больше одного
+        запроса (чтение сессии), ETag зависит от пользователя."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                # Первый ответ может выдать CSRF-cookie, от которой
+                # зависит ETag, поэтому валидатор берется со второго.
+                self.authorized_client.get(url)
+                etag = self.authorized_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(len(queries), 1)
+        index = reverse('index')
+        anonymous_etag = self.client.get(index)['ETag']
+        response = self.authorized_client.get(
+            index, HTTP_IF_NONE_MATCH=anonymous_etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_changes_reset_validators(self):
+        """Новый комментарий меняет ETag страницы записи."""
+        post = ConditionalGetTests.post
+        url = reverse('post', args=(post.author.username, post.id))
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=post, author=ConditionalGetTests.user,
+                               text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_page_cached_before_commit_is_dropped(self):
+        """Страница, закешированная во время транзакции записи,
+        после ее фиксации не отдается: версии увеличиваются еще раз."""
+        url = reverse('index')
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(text='Запись в транзакции',
+                                author=ConditionalGetTests.user)
+            etag = self.client.get(url)['ETag']
+            versions = caching.get_versions([caching.FEED])
+        self.assertNotEqual(caching.get_versions([caching.FEED]), versions)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
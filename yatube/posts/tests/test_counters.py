@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(
+            text='Тестовая запись',
+            author=cls.author,
+        )
+
+    def test_comments_count(self):
+        """Счетчик комментариев записи меняется при добавлении
+        и удалении комментария."""
+        comment = Comment.objects.create(
+            post=CountersTests.post,
+            author=CountersTests.reader,
+            text='Комментарий'
+        )
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 1)
+        comment.delete()
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 0)
+
+    def test_deleting_post_skips_per_comment_work(self):
+        """Каскадное удаление комментариев вместе с записью не меняет
+        счетчики и кеш по каждому комментарию: число запросов не
+        зависит от числа комментариев."""
+        counts = []
+        for comments in (1, 5):
+            post = Post.objects.create(
+                text='Удаляемая запись', author=CountersTests.author
+            )
+            for i in range(comments):
+                Comment.objects.create(
+                    post=post, author=CountersTests.reader, text=f'Ответ {i}'
+                )
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_user_stats(self):
+        """Счетчики записей и подписок пользователя
+        меняются при записи."""
+        Post.objects.create(text='Вторая запись', author=CountersTests.author)
+        follow = Follow.objects.create(user=CountersTests.reader,
+                                       author=CountersTests.author)
+        author_stats = UserStats.objects.get(user=CountersTests.author)
+        reader_stats = UserStats.objects.get(user=CountersTests.reader)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        follow.delete()
+        author_stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+
+    def test_recount_counters_command(self):
+        """Команда recount_counters восстанавливает счетчики."""
+        Comment.objects.create(
+            post=CountersTests.post,
+            author=CountersTests.reader,
+            text='Комментарий'
+        )
+        Post.objects.update(comments_count=0)
+        UserStats.objects.all().delete()
+        call_command('recount_counters', stdout=StringIO())
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=CountersTests.author).posts_count, 1
+        )
@@ -0,0 +1,204 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import events
+from posts.models import Follow, Group, Post
+from yatube.asgi import application
+
+User = get_user_model()
+
+
+class Connection:
+    """Клиент потока событий поверх ASGI-интерфейса."""
+
+    def __init__(self, path, cookie=None):
+        headers = [(b'cookie', cookie.encode())] if cookie else []
+        scope = {
+            'type': 'http', 'method': 'GET', 'headers': headers,
+            'path': settings.EVENTS_URL + path,
+        }
+        self.inbox = asyncio.Queue()
+        self.messages = []
+        self.task = asyncio.ensure_future(
+            application(scope, self.inbox.get, self.send)
+        )
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    @property
+    def status(self):
+        return self.messages[0]['status'] if self.messages else None
+
+    @property
+    def body(self):
+        return b''.join(
+            message.get('body', b'') for message in self.messages[1:]
+        ).decode()
+
+    def posts(self):
+        return [
+            json.loads(line[len('data: '):])['id']
+            for line in self.body.splitlines() if line.startswith('data: ')
+        ]
+
+    async def close(self):
+        await self.inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, 1)
+
+
+async def wait_for(condition, timeout=5):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError('Событие не дождалось подписчиков')
+        await asyncio.sleep(0.01)
+
+
+class EventsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def subscribers(self, channel):
+        return len(events.broker._channels.get(channel, ()))
+
+    async def test_many_subscribers_receive_each_event_once(self):
+        """Каждый из многих подписчиков получает каждое событие
+        ровно один раз, в том числе опубликованное из другого потока."""
+        group_channel = events.GROUP.format(slug=EventsTests.group.slug)
+        feed = [Connection('') for _ in range(300)]
+        group = [Connection('group/test-slug/') for _ in range(100)]
+        await wait_for(lambda: (
+            self.subscribers(events.FEED) == len(feed)
+            and self.subscribers(group_channel) == len(group)
+        ))
+        loop = asyncio.get_running_loop()
+        for post_id in range(3):
+            await loop.run_in_executor(
+                None, events.broker.publish,
+                [events.FEED, group_channel], {'id': post_id}
+            )
+        connections = feed + group
+        await wait_for(lambda: all(
+            len(connection.posts()) == 3 for connection in connections
+        ))
+        for connection in connections:
+            await connection.close()
+            self.assertEqual(connection.status, 200)
+            self.assertEqual(connection.posts(), [0, 1, 2])
+        self.assertEqual(self.subscribers(events.FEED), 0)
+        self.assertEqual(self.subscribers(group_channel), 0)
+
+    async def test_follow_stream(self):
+        """Поток подписок доступен после входа и получает записи
+        авторов, на которых подписан пользователь."""
+        connection = Connection('follow/')
+        await asyncio.wait_for(connection.task, 1)
+        self.assertEqual(connection.status, 403)
+        await sync_to_async(self.client.force_login)(EventsTests.reader)
+        cookie = f'{settings.SESSION_COOKIE_NAME}=' + self.client.cookies[
+            settings.SESSION_COOKIE_NAME
+        ].value
+        connection = Connection('follow/', cookie)
+        channel = events.AUTHOR.format(author_id=EventsTests.author.id)
+        await wait_for(lambda: self.subscribers(channel) == 1)
+        events.broker.publish([channel], {'id': 1})
+        await wait_for(lambda: connection.posts() == [1])
+        await connection.close()
+
+    async def test_follow_stream_checks_session_hash(self):
+        """После смены пароля старая сессия потока подписок
+        не открывает."""
+        await sync_to_async(self.client.force_login)(EventsTests.reader)
+        cookie = f'{settings.SESSION_COOKIE_NAME}=' + self.client.cookies[
+            settings.SESSION_COOKIE_NAME
+        ].value
+
+        def change_password():
+            reader = User.objects.get(pk=EventsTests.reader.pk)
+            reader.set_password('new-password')
+            reader.save()
+
+        await sync_to_async(change_password)()
+        connection = Connection('follow/', cookie)
+        await asyncio.wait_for(connection.task, 1)
+        self.assertEqual(connection.status, 403)
+
+    async def test_unknown_stream(self):
+        """Несуществующая группа и адрес отвечают 404."""
+        for path in ('group/missing/', 'unknown/'):
+            with self.subTest(path=path):
+                connection = Connection(path)
+                await asyncio.wait_for(connection.task, 1)
+                self.assertEqual(connection.status, 404)
+
+    @override_settings(EVENTS_HEARTBEAT=0.01)
+    async def test_heartbeat(self):
+        """Тихое соединение получает комментарии-пинги."""
+        connection = Connection('')
+        await wait_for(lambda: ': ping' in connection.body)
+        await connection.close()
+
+    def test_post_creation_publishes_event(self):
+        """Новая запись публикуется после фиксации транзакции
+        в каналы ленты, группы и автора."""
+        with mock.patch.object(events.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    text='Новая запись',
+                    author=EventsTests.author,
+                    group=EventsTests.group
+                )
+                publish.assert_not_called()
+        channels, event = publish.call_args[0]
+        self.assertEqual(set(channels), {
+            events.FEED,
+            events.GROUP.format(slug=EventsTests.group.slug),
+            events.AUTHOR.format(author_id=EventsTests.author.id),
+        })
+        self.assertEqual(event['id'], post.id)
+
+    def test_banner_only_with_events_app(self):
+        """Плашка новых записей выводится, только если подключено
+        приложение потоков, и слушает адрес внутри api/v1/."""
+        cache.clear()
+        response = self.client.get(reverse('index'))
+        self.assertNotContains(response, 'EventSource(')
+        cache.clear()
+        with override_settings(EVENTS_ENABLED=True):
+            response = self.client.get(reverse('index'))
+        self.assertContains(
+            response, f"new EventSource('{settings.EVENTS_URL}')"
+        )
+        self.assertTrue(settings.EVENTS_URL.startswith('/api/v1/'))
+
+    def test_events_username_served_by_django(self):
+        """Профиль пользователя events под ASGI обслуживает Django,
+        а не приложение потоков."""
+        scope = {'type': 'http', 'path': '/events/'}
+        with mock.patch('yatube.asgi.django_application',
+                        new=mock.AsyncMock()) as django_application, \
+                mock.patch('posts.sse.application',
+                           new=mock.AsyncMock()) as sse_application:
+            asyncio.run(application(scope, None, None))
+        django_application.assert_awaited_once()
+        sse_application.assert_not_called()
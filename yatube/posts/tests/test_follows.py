@@ -0,0 +1,185 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, Group, Post, TimelineEntry, UserStats
+from yatube.settings import USERS_PER_PAGE
+
+User = get_user_model()
+
+
+class FollowsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(
+                text=f'Запись {author.username}',
+                author=author,
+                group=cls.group,
+            )
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = self.client_class()
+        self.authorized_client.force_login(FollowsTests.reader)
+
+    def stats(self, user):
+        stats = UserStats.objects.get(user=user)
+        return stats.followers_count, stats.following_count
+
+    def test_group_follow_inserts_follows_at_once(self):
+        """Подписка на авторов группы — одна вставка подписок,
+        счетчики и лента обновлены."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.post(
+                reverse('group_follow', args=(FollowsTests.group.slug,))
+            )
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT')
+            and 'INTO "posts_follow"' in query['sql']
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertRedirects(
+            response, reverse('group_posts', args=(FollowsTests.group.slug,))
+        )
+        self.assertEqual(
+            set(Follow.objects.filter(
+                user=FollowsTests.reader
+            ).values_list('author', flat=True)),
+            {author.pk for author in FollowsTests.authors}
+        )
+        self.assertEqual(self.stats(FollowsTests.reader), (0, 3))
+        self.assertEqual(self.stats(FollowsTests.authors[2]), (1, 0))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=FollowsTests.reader).count(), 3
+        )
+
+    def test_group_follow_queries_do_not_grow(self):
+        """Число запросов массовой подписки и отписки не зависит
+        от числа авторов и их записей."""
+        url = reverse('group_follow', args=(FollowsTests.group.slug,))
+        unfollow_url = reverse(
+            'group_unfollow', args=(FollowsTests.group.slug,)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(url)
+        follow_count = len(queries)
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(unfollow_url)
+        unfollow_count = len(queries)
+        for i in range(3):
+            author = User.objects.create_user(username=f'Extra{i}')
+            for j in range(5):
+                Post.objects.create(
+                    text=f'Запись {j}', author=author,
+                    group=FollowsTests.group
+                )
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(url)
+        self.assertEqual(len(queries), follow_count)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=FollowsTests.reader).count(),
+            18
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(unfollow_url)
+        self.assertEqual(len(queries), unfollow_count)
+
+    def test_group_follow_requires_post(self):
+        """GET не меняет подписки."""
+        self.authorized_client.get(
+            reverse('group_follow', args=(FollowsTests.group.slug,))
+        )
+        self.assertEqual(
+            Follow.objects.filter(user=FollowsTests.reader).count(), 1
+        )
+
+    def test_group_unfollow(self):
+        """Отписка от авторов группы снимает подписки, счетчики
+        и записи ленты."""
+        self.authorized_client.post(
+            reverse('group_unfollow', args=(FollowsTests.group.slug,))
+        )
+        self.assertFalse(Follow.objects.filter(
+            user=FollowsTests.reader
+        ).exists())
+        self.assertEqual(self.stats(FollowsTests.reader), (0, 0))
+        self.assertEqual(self.stats(FollowsTests.authors[0]), (0, 0))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=FollowsTests.reader
+        ).exists())
+
+    def test_follow_list_pages(self):
+        """Страницы подписчиков и подписок листаются курсором,
+        новые подписки сверху."""
+        author = FollowsTests.authors[0]
+        followers = [FollowsTests.reader] + [
+            User.objects.create_user(username=f'Follower{i}')
+            for i in range(USERS_PER_PAGE)
+        ]
+        for follower in followers[1:]:
+            Follow.objects.create(user=follower, author=author)
+        response = self.client.get(
+            reverse('followers', args=(author.username,))
+        )
+        self.assertEqual(
+            response.context['people'], followers[:0:-1]
+        )
+        response = self.client.get(
+            reverse('followers', args=(author.username,)),
+            {'cursor': response.context['page'].next_cursor}
+        )
+        self.assertEqual(response.context['people'], [FollowsTests.reader])
+        response = self.client.get(
+            reverse('following', args=(FollowsTests.reader.username,))
+        )
+        self.assertEqual(response.context['people'], [author])
+
+    def test_suggestions(self):
+        """Рекомендуются авторы, которых читают подписки
+        пользователя, затем популярные; уже отслеживаемые
+        и сам пользователь не предлагаются."""
+        first, second, third = FollowsTests.authors
+        Follow.objects.create(user=first, author=third)
+        Follow.objects.create(user=first, author=FollowsTests.reader)
+        popular = User.objects.create_user(username='Popular')
+        Follow.objects.create(user=second, author=popular)
+        suggested = follows.suggestions(FollowsTests.reader)
+        self.assertEqual(suggested, [third, popular])
+        self.assertEqual(
+            [author.mutual_count for author in suggested], [1, 0]
+        )
+        Follow.objects.create(user=FollowsTests.reader, author=third)
+        self.assertEqual(
+            follows.suggestions(FollowsTests.reader), [popular]
+        )
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertContains(response, '@Popular')
+
+    @override_settings(SUGGESTIONS_SCAN=1)
+    def test_suggestions_scan_is_capped(self):
+        """Подписки отслеживаемых авторов просматриваются не больше
+        SUGGESTIONS_SCAN штук."""
+        first, second, third = FollowsTests.authors
+        Follow.objects.create(user=first, author=second)
+        Follow.objects.create(user=first, author=third)
+        self.assertEqual(
+            len(follows._second_degree(FollowsTests.reader, 5)), 1
+        )
@@ -0,0 +1,149 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import group_stats
+from posts.models import Group, GroupAuthorStats, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        cls.empty_group = Group.objects.create(
+            title='Пустая группа',
+            slug='empty-slug',
+            description='В этой группе нет записей'
+        )
+        cls.old_post = Post.objects.create(
+            text='Старая запись',
+            author=cls.other,
+            group=cls.group,
+        )
+        cls.post = Post.objects.create(
+            text='Новая запись в группе',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.second_post = Post.objects.create(
+            text='Еще одна запись автора',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = self.client_class()
+        self.authorized_client.force_login(GroupStatsTests.author)
+
+    def stats(self, group):
+        stats = GroupStats.objects.get(group=group)
+        return stats.posts_count, stats.last_post_date, stats.top_authors
+
+    def test_posts_update_stats(self):
+        """Создание записи обновляет число записей, последнюю запись
+        и самых активных авторов группы."""
+        group = GroupStatsTests.group
+        self.assertEqual(self.stats(group), (
+            3, GroupStatsTests.second_post.pub_date,
+            [{'username': 'Author', 'posts_count': 2},
+             {'username': 'Other', 'posts_count': 1}]
+        ))
+        self.assertEqual(
+            self.stats(GroupStatsTests.empty_group), (0, None, [])
+        )
+
+    def test_deleting_post_updates_stats(self):
+        """Удаление последней записи возвращает время предыдущей,
+        автор без записей в группе пропадает из лучших."""
+        post = Post.objects.create(
+            text='Удаляемая запись',
+            author=GroupStatsTests.other,
+            group=GroupStatsTests.group,
+            pub_date=GroupStatsTests.second_post.pub_date + timedelta(1),
+        )
+        post.delete()
+        GroupStatsTests.old_post.delete()
+        self.assertEqual(self.stats(GroupStatsTests.group), (
+            2, GroupStatsTests.second_post.pub_date,
+            [{'username': 'Author', 'posts_count': 2}]
+        ))
+
+    def test_edit_moves_post_between_groups(self):
+        """Смена группы в post_edit переносит запись
+        в статистике групп."""
+        post = GroupStatsTests.second_post
+        self.authorized_client.post(
+            reverse('post_edit', args=(post.author.username, post.pk)),
+            data={'text': post.text, 'group': GroupStatsTests.empty_group.pk},
+        )
+        self.assertEqual(self.stats(GroupStatsTests.group), (
+            2, GroupStatsTests.post.pub_date,
+            [{'username': 'Author', 'posts_count': 1},
+             {'username': 'Other', 'posts_count': 1}]
+        ))
+        self.assertEqual(self.stats(GroupStatsTests.empty_group), (
+            1, post.pub_date, [{'username': 'Author', 'posts_count': 1}]
+        ))
+
+    def test_rebuild_matches_incremental_stats(self):
+        """Пересчет дает ту же статистику, что и обновления
+        при записи."""
+        incremental = {
+            group: self.stats(group)
+            for group in (GroupStatsTests.group, GroupStatsTests.empty_group)
+        }
+        authors = list(GroupAuthorStats.objects.values_list(
+            'group', 'author', 'posts_count'
+        ).order_by('group', 'author'))
+        self.assertEqual(
+            group_stats.rebuild(), 2
+        )
+        for group, stats in incremental.items():
+            self.assertEqual(self.stats(group), stats)
+        self.assertEqual(list(GroupAuthorStats.objects.values_list(
+            'group', 'author', 'posts_count'
+        ).order_by('group', 'author')), authors)
+
+    def test_group_list_page(self):
+        """Каталог показывает группы со статистикой одним запросом
+        к группам и обновляется после новой записи."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('group_list'))
+        self.assertEqual(
+            list(response.context['page']),
+            [GroupStatsTests.empty_group, GroupStatsTests.group]
+        )
+        self.assertContains(response, 'Записей: 3')
+        self.assertContains(
+            response, reverse('profile', args=('Author',))
+        )
+        Post.objects.create(
+            text='Первая запись', author=GroupStatsTests.other,
+            group=GroupStatsTests.empty_group
+        )
+        response = self.client.get(reverse('group_list'))
+        self.assertContains(response, 'Записей: 1')
+
+    def test_rebuild_group_stats_command(self):
+        """Команда восстанавливает потерянную статистику."""
+        GroupStats.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_group_stats', stdout=out)
+        self.assertIn('Статистика групп пересчитана: 2', out.getvalue())
+        self.assertEqual(self.stats(GroupStatsTests.group)[0], 3)
@@ -0,0 +1,85 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTests(TestCase):
+    """Главные запросы лент выполняются по индексам, без полного
+    просмотра таблиц."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(3):
+            post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.user,
+                group=cls.group
+            )
+            Comment.objects.create(post=post, author=cls.reader,
+                                   text='Комментарий')
+        cls.post = post
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedIndexesTests.reader)
+        cache.clear()
+
+    def query_plans(self, url, table):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or table not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def test_views_use_indexes(self):
+        """Каждая лента выбирает записи по своему индексу."""
+        username = FeedIndexesTests.user.username
+        post_id = FeedIndexesTests.post.id
+        # UniqueConstraint в SQLite создается автоиндексом таблицы.
+        cases = (
+            (reverse('index'), '"posts_post"', 'posts_post_date_idx'),
+            (reverse('group_posts', args=(FeedIndexesTests.group.slug,)),
+             '"posts_post"', 'posts_post_group_date_idx'),
+            (reverse('profile', args=(username,)),
+             '"posts_post"', 'posts_post_author_date_idx'),
+            (reverse('profile', args=(username,)),
+             '"posts_follow"', 'sqlite_autoindex_posts_follow'),
+            (reverse('follow_index'),
+             '"posts_timelineentry"', 'posts_timeline_feed_idx'),
+            (reverse('post', args=(username, post_id)),
+             '"posts_comment"', 'posts_comment_post_created_idx'),
+        )
+        for url, table, index in cases:
+            with self.subTest(url=url, index=index):
+                plans = self.query_plans(url, table)
+                self.assertTrue(any(index in plan for plan in plans), plans)
+                for plan in plans:
+                    for step in plan.split('SCAN')[1:]:
+                        self.assertIn('USING', step.split('SEARCH')[0],
+                                      plan)
@@ -0,0 +1,115 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from yatube import metrics
+
+User = get_user_model()
+
+
+def sample(view, name):
+    """Значение метрики yatube_<name> для view из /metrics/."""
+    prefix = f'yatube_{name}{{view="{view}"}} '
+    for line in metrics.registry.render().splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return None
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def test_request_metrics(self):
+        """Запрос учитывается по имени URL: SQL, шаблоны и кеш."""
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        self.assertEqual(sample('index', 'requests_total'), 2)
+        self.assertGreater(sample('index', 'db_queries_total'), 0)
+        self.assertGreater(sample('index', 'db_seconds_total'), 0)
+        self.assertGreater(sample('index', 'template_seconds_total'), 0)
+        self.assertEqual(sample('index', 'cache_misses_total'), 1)
+        self.assertEqual(sample('index', 'cache_hits_total'), 1)
+        self.assertEqual(sample('index', 'n_plus_one_total'), 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        """Метрики отдаются в формате Prometheus только
+        разрешенным адресам с токеном."""
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='127.0.0.1',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(response, '# TYPE yatube_requests_total counter')
+        self.assertContains(response, 'yatube_requests_total{view="index"} 1')
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='10.0.0.1',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_requires_token(self):
+        """За локальным прокси адрес 127.0.0.1 без верного токена
+        метрик не получает."""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(
+                    reverse('metrics'), REMOTE_ADDR='127.0.0.1', **headers
+                )
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_endpoint_without_token(self):
+        """Без токена метрики отдаются только при DEBUG."""
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse('metrics'),
+                                       REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=3)
+    def test_n_plus_one(self):
+        """Повторы одного SQL отмечаются и пишутся в журнал."""
+        def view(request):
+            for _ in range(3):
+                Post.objects.filter(pk=MetricsTests.post.pk).exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        with self.assertLogs('yatube.metrics', 'WARNING') as logs:
+            metrics.MetricsMiddleware(view)(request)
+        self.assertIn('3 одинаковых запросов', logs.output[0])
+        self.assertEqual(sample('<unresolved>', 'n_plus_one_total'), 1)
+        self.assertEqual(sample('<unresolved>', 'db_queries_total'), 3)
+
+    def test_async_requests(self):
+        """Запросы из потоков sync_to_async асинхронного view
+        учитываются в его запросе."""
+        async def view(request):
+            # Таблица групп не менялась в транзакции теста,
+            # поэтому ее можно читать из соединения другого потока.
+            await sync_to_async(
+                Group.objects.exists, thread_sensitive=False
+            )()
+            return HttpResponse()
+
+        middleware = metrics.MetricsMiddleware(view)
+        async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertEqual(sample('<unresolved>', 'requests_total'), 1)
+        self.assertEqual(sample('<unresolved>', 'db_queries_total'), 1)
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+            group=cls.group
+        )
+        cls.post_url = reverse('post', args=('Author', cls.post.id))
+        cls.edit_url = reverse('post_edit', args=('Author', cls.post.id))
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(PostCardTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(PostCardTests.reader)
+
+    def test_card_links(self):
+        """Карточка в ленте ссылается на автора, группу и запись."""
+        response = self.reader_client.get(reverse('index'))
+        self.assertContains(response, reverse('profile', args=('Author',)))
+        self.assertContains(
+            response, reverse('group_posts', args=('test-slug',))
+        )
+        self.assertContains(response, f'href="{PostCardTests.post_url}"')
+        self.assertNotContains(response, PostCardTests.edit_url)
+
+    def test_edit_link_for_author(self):
+        """Ссылку на редактирование видит только автор."""
+        response = self.author_client.get(reverse('index'))
+        self.assertContains(response, PostCardTests.edit_url)
+
+    def test_post_page_card(self):
+        """На странице записи карточка без ссылки на комментарии."""
+        response = self.author_client.get(PostCardTests.post_url)
+        self.assertNotContains(response, f'href="{PostCardTests.post_url}"')
+        self.assertContains(response, PostCardTests.edit_url)
@@ -0,0 +1,128 @@
+import json
+import os
+import re
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import querylog
+
+User = get_user_model()
+
+
+class QueryLogTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        querylog.querylog.clear()
+
+    def test_normalize(self):
+        """Из SQL убираются значения, списки IN сводятся к одному."""
+        self.assertEqual(
+            querylog.normalize(
+                "SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s,  %s)"
+                "\n  AND c > 10 LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c > ? LIMIT ?'
+        )
+
+    def test_same_shape_same_fingerprint(self):
+        """Запросы одного вида с разными значениями дают
+        один отпечаток."""
+        first = str(Post.objects.filter(pk__in=[1, 2]).query)
+        second = str(Post.objects.filter(pk__in=[3, 4, 5]).query)
+        other = str(Post.objects.filter(text='x').query)
+        self.assertEqual(
+            querylog.fingerprint(first)[0], querylog.fingerprint(second)[0]
+        )
+        self.assertNotEqual(
+            querylog.fingerprint(first)[0], querylog.fingerprint(other)[0]
+        )
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged_with_view_and_frame(self):
+        """Медленный запрос пишется в журнал с именем view
+        и кадром стека из кода проекта."""
+        with self.assertLogs('yatube.querylog', 'WARNING') as logs:
+            self.client.get(reverse('profile', args=('Testuser',)))
+        profile_logs = [
+            line for line in logs.output if 'view=profile' in line
+        ]
+        self.assertTrue(profile_logs)
+        # Под ASGI страницу отдает posts/async_views.py.
+        self.assertTrue(any(
+            re.search(r'at posts/(async_)?views\.py:\d+', line)
+            for line in profile_logs
+        ))
+
+    @override_settings(QUERYLOG_WINDOW=0)
+    def test_rolling_window(self):
+        """Гистограммы хранятся за текущее и предыдущее окно."""
+        log = querylog.QueryLog()
+        for sql in ('SELECT 1', 'SELECT a', 'SELECT b'):
+            log.add(sql, 1, 'index')
+        texts = {entry['sql'] for entry in log.snapshot().values()}
+        self.assertEqual(texts, {'SELECT a', 'SELECT b'})
+
+    def test_histogram(self):
+        """Гистограмма отпечатка дает число, сумму и перцентили."""
+        log = querylog.QueryLog()
+        for ms in (0.5, 3, 3, 3, 700):
+            log.add('SELECT * FROM t WHERE id = %s', ms, 'post')
+        entry, = log.snapshot().values()
+        self.assertEqual(entry['count'], 5)
+        self.assertEqual(entry['total_ms'], 709.5)
+        self.assertEqual(querylog.percentile(entry, 0.5), 5)
+        self.assertEqual(querylog.percentile(entry, 0.99), 1000)
+        self.assertEqual(entry['views'], {'post': 5})
+
+    def test_slow_queries_command(self):
+        """Команда slow_queries сводит гистограммы процессов
+        и выводит отпечатки с наибольшим временем."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(QUERYLOG_DIR=directory):
+                log = querylog.QueryLog()
+                log.add('SELECT * FROM a WHERE id = %s', 50, 'profile')
+                log.add('SELECT * FROM b', 1, 'index')
+                log.flush()
+                out = StringIO()
+                call_command('slow_queries', dir=directory, json=True,
+                             stdout=out)
+        rows = json.loads(out.getvalue())
+        self.assertEqual(
+            [row['sql'] for row in rows],
+            ['SELECT * FROM a WHERE id = ?', 'SELECT * FROM b']
+        )
+        self.assertEqual(rows[0]['views'], {'profile': 1})
+        self.assertEqual(rows[0]['total_ms'], 50)
+        with self.assertRaisesMessage(CommandError, 'YATUBE_QUERYLOG_DIR'):
+            call_command('slow_queries', dir='', stdout=StringIO())
+
+    @override_settings(QUERYLOG_FLUSH=0)
+    def test_flush_after_request(self):
+        """Гистограммы сохраняются после ответа, а не при выполнении
+        запроса к БД; без QUERYLOG_DIR не сохраняются."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(QUERYLOG_DIR=directory):
+                Post.objects.exists()
+                self.assertEqual(os.listdir(directory), [])
+                self.client.get(reverse('index'))
+                self.assertEqual(
+                    os.listdir(directory), [f'{os.getpid()}.json']
+                )
+            with mock.patch.object(querylog.QueryLog, 'flush') as flush:
+                self.client.get(reverse('index'))
+        flush.assert_not_called()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import replicas
+
+User = get_user_model()
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def replicate():
+    """Репликация: копия основной базы переносится в файл реплики.
+    До вызова реплика отстает от default."""
+    source = connections[DEFAULT_DB_ALIAS]
+    target = connections[replicas.REPLICA]
+    source.ensure_connection()
+    target.ensure_connection()
+    source.connection.backup(target.connection)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, который догоняет основную
+    базу только при вызове replicate()."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Псевдоним заводится после setUpClass: иначе тестовый раннер
+        # создал бы под него свою базу, а реплику заполняет replicate().
+        # Реплика из окружения на время тестов откладывается.
+        cls.saved = None
+        if replicas.REPLICA in connections.databases:
+            cls.saved = (
+                connections.databases[replicas.REPLICA],
+                connections[replicas.REPLICA],
+            )
+            del connections[replicas.REPLICA]
+        connections.databases[replicas.REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(TEMP_DIR, 'replica.sqlite3'),
+        }
+        connections.ensure_defaults(replicas.REPLICA)
+        connections.prepare_test_settings(replicas.REPLICA)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[replicas.REPLICA].close()
+        del connections[replicas.REPLICA]
+        del connections.databases[replicas.REPLICA]
+        if cls.saved is not None:
+            connections.databases[replicas.REPLICA] = cls.saved[0]
+            connections[replicas.REPLICA] = cls.saved[1]
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Testuser')
+        self.client.force_login(self.user)
+        replicate()
+
+    def test_reads_outside_requests_use_default(self):
+        """Вне HTTP-запросов чтения идут в default."""
+        Post.objects.create(text='Запись с основной базы', author=self.user)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Post.objects.using(replicas.REPLICA).count(), 0)
+
+    def test_pages_read_replica(self):
+        """Страницы читают реплику и показывают запись, когда она
+        туда доходит."""
+        Post.objects.create(text='Запись с основной базы', author=self.user)
+        url = reverse('profile', args=(self.user.username,))
+        self.assertNotContains(self.client.get(url), 'Запись с основной базы')
+        replicate()
+        self.assertContains(self.client.get(url), 'Запись с основной базы')
+
+    def test_lagging_pages_are_not_cached(self):
+        """Страница с данными реплики не кешируется и не получает ETag,
+        пока реплика может отставать."""
+        Post.objects.create(text='Запись с основной базы', author=self.user)
+        url = reverse('index')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Запись с основной базы')
+        self.assertFalse(response.has_header('ETag'))
+        replicate()
+        self.assertContains(self.client.get(url), 'Запись с основной базы')
+        with override_settings(REPLICA_LAG_SECONDS=0):
+            self.assertTrue(self.client.get(url).has_header('ETag'))
+
+    def test_author_reads_own_writes(self):
+        """После записи автор читает default, пока действует cookie."""
+        response = self.client.post(
+            reverse('new_post'), {'text': 'Своя запись'}, follow=True
+        )
+        self.assertContains(response, 'Своя запись')
+        cookie = self.client.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_LAG_SECONDS)
+        del self.client.cookies[replicas.PIN_COOKIE]
+        response = self.client.get(
+            reverse('profile', args=(self.user.username,))
+        )
+        self.assertNotContains(response, 'Своя запись')
+
+    def test_write_pins_rest_of_request(self):
+        """После записи и внутри транзакции запрос читает default."""
+        router = replicas.ReplicaRouter()
+        token = replicas.current.set(replicas.ReadState(pinned=False))
+        try:
+            self.assertEqual(router.db_for_read(Post), replicas.REPLICA)
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        finally:
+            replicas.current.reset(token)
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, SearchTerm
+from posts.search import search_posts, tokenize
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        cls.python_post = Post.objects.create(
+            text='Питон, питон и еще раз Питон',
+            author=cls.user,
+            group=cls.group
+        )
+        cls.mixed_post = Post.objects.create(
+            text='Питон и Django',
+            author=cls.other
+        )
+        cls.other_post = Post.objects.create(
+            text='Ёлка в лесу',
+            author=cls.user
+        )
+
+    def test_tokenize(self):
+        """Слова приводятся к нижнему регистру, ё заменяется на е,
+        однобуквенные слова отбрасываются."""
+        self.assertEqual(tokenize('Ёлка и Лес!'), ['елка', 'лес'])
+
+    def test_ranked_results(self):
+        """Запись с большим числом вхождений слова выше в выдаче,
+        записи без всех слов запроса не находятся."""
+        self.assertEqual(
+            list(search_posts('питон')),
+            [SearchTests.python_post, SearchTests.mixed_post]
+        )
+        self.assertEqual(
+            list(search_posts('питон django')), [SearchTests.mixed_post]
+        )
+        self.assertEqual(list(search_posts('елка')), [SearchTests.other_post])
+        self.assertEqual(list(search_posts('нет такого')), [])
+
+    def test_index_follows_edits(self):
+        """Индекс обновляется при изменении и удалении записи."""
+        post = Post.objects.create(text='Старый текст', author=self.user)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(list(search_posts('старый')), [])
+        self.assertEqual(list(search_posts('новый')), [post])
+        post.delete()
+        self.assertFalse(SearchTerm.objects.filter(post_id=post.pk).exists())
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс по текстам записей."""
+        SearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_posts('питон')), 2)
+
+    def test_search_view_filters(self):
+        """Поиск фильтрует записи по группе и автору."""
+        url = reverse('search')
+        cases = (
+            ({'q': 'питон'}, 2),
+            ({'q': 'питон', 'group': SearchTests.group.slug}, 1),
+            ({'q': 'питон', 'author': SearchTests.other.username}, 1),
+            ({'q': 'питон', 'author': 'nobody'}, 0),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(len(response.context['page']), expected)
+
+    def test_search_view_pagination(self):
+        """Результаты листаются курсором по рангу, ссылки
+        сохраняют запрос."""
+        Post.objects.bulk_create([
+            Post(text='Кот ' * (i % 3 + 1), author=SearchTests.user)
+            for i in range(12)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        url = reverse('search')
+        response = self.client.get(url, {'q': 'кот'})
+        first_page = list(response.context['page'])
+        cursor = response.context['page'].next_cursor
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&cursor=')
+        response = self.client.get(url, {'q': 'кот', 'cursor': cursor})
+        second_page = list(response.context['page'])
+        self.assertEqual(len(first_page) + len(second_page), 12)
+        self.assertFalse(set(first_page) & set(second_page))
+        ranks = [post.rank for post in first_page + second_page]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_search_cursor_survives_new_posts(self):
+        """Новые записи между страницами меняют веса слов, но курсор
+        хранит веса первой страницы: результаты не пропускаются
+        и не повторяются."""
+        posts = [
+            Post.objects.create(
+                text='Кот ' * (i % 3 + 1), author=SearchTests.user
+            )
+            for i in range(12)
+        ]
+        url = reverse('search')
+        response = self.client.get(url, {'q': 'кот'})
+        first_page = list(response.context['page'])
+        cursor = response.context['page'].next_cursor
+        for i in range(20):
+            Post.objects.create(text=f'Пес {i}', author=SearchTests.user)
+        response = self.client.get(url, {'q': 'кот', 'cursor': cursor})
+        second_page = list(response.context['page'])
+        shown = first_page + second_page
+        self.assertEqual(len(shown), len(set(shown)))
+        self.assertEqual(set(shown), set(posts))
+
+    def test_search_query_count(self):
+        """Число запросов поиска не зависит от числа записей."""
+        with self.assertNumQueries(3):
+            list(search_posts('питон'))
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from posts import stress
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    # Тесты открывают собственные соединения с временными файлами,
+    # а pytest-django пускает SimpleTestCase к базе только так.
+    databases = '__all__'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def pragmas(self, name):
+        """Прагмы нового соединения с файлом name."""
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(TEMP_DIR, name),
+        }, alias='sqlite_profile')
+        try:
+            with wrapper.cursor() as cursor:
+                values = {}
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    values[pragma] = cursor.fetchone()[0]
+                return values
+        finally:
+            wrapper.close()
+
+    @override_settings(SQLITE_PRODUCTION=True)
+    def test_production_pragmas(self):
+        """Новое соединение получает WAL, synchronous=NORMAL
+        и ожидание блокировки."""
+        self.assertEqual(self.pragmas('production.sqlite3'), {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout'],
+        })
+
+    @override_settings(SQLITE_PRODUCTION=False)
+    def test_stock_pragmas(self):
+        """Без профиля остаются настройки SQLite по умолчанию."""
+        self.assertEqual(
+            self.pragmas('stock.sqlite3')['journal_mode'], 'delete'
+        )
+
+    @override_settings(SLOW_QUERY_MS=60 * 1000)
+    def test_concurrent_writers(self):
+        """Пока открыта долгая транзакция чтения, без профиля писатели
+        получают database is locked, а в профиле для продакшена
+        пишут все комментарии без ошибок."""
+        reports = {}
+        for production in (False, True):
+            path = os.path.join(TEMP_DIR, f'stress-{production}.sqlite3')
+            with override_settings(SQLITE_PRODUCTION=production), \
+                    stress.file_database(path, timeout=0.1):
+                reports[production] = stress.run(
+                    threads=4, writes=5, read_seconds=0.5
+                )
+        self.assertGreater(reports[False]['locked_errors'], 0)
+        self.assertLess(reports[False]['saved'], 20)
+        self.assertEqual(reports[True]['errors'], 0)
+        self.assertEqual(reports[True]['saved'], 20)
@@ -0,0 +1,77 @@
+from collections import Counter
+from io import StringIO
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from posts import benchmarks, synthetic
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class SyntheticDataTests(TestCase):
+
+    def test_same_seed_same_rows(self):
+        """При одном seed данные совпадают, при другом — нет."""
+        def rows(seed):
+            return list(synthetic.generate_rows(50, 3, 200, 100, 5,
+                                                seed=seed))
+        self.assertEqual(rows(1), rows(1))
+        self.assertNotEqual(rows(1), rows(2))
+
+    def test_follow_graph_is_skewed(self):
+        """Подписки сосредоточены у немногих популярных авторов."""
+        follows = [
+            row for model, row in synthetic.generate_rows(500, 0, 0, 0, 10)
+            if model == 'follow'
+        ]
+        counts = Counter(row['author'] for row in follows).values()
+        self.assertGreater(max(counts), 10 * median(counts))
+        self.assertTrue(all(row['user'] != row['author'] for row in follows))
+
+    def test_generate_data_command(self):
+        """Команда generate_data загружает данные со счетчиками,
+        лентами и датами, растущими вместе с id записи."""
+        call_command('generate_data', users=30, groups=3, posts=120,
+                     comments=60, follows=5, seed=7, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        dates = list(
+            Post.objects.order_by('pk').values_list('pub_date', flat=True)
+        )
+        self.assertEqual(dates, sorted(dates))
+
+    def test_generate_data_appends(self):
+        """Повторный запуск с другим префиксом добавляет данные
+        после уже имеющихся."""
+        call_command('generate_data', users=5, posts=10, comments=5,
+                     stdout=StringIO())
+        call_command('generate_data', users=5, posts=10, comments=5,
+                     prefix='other', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 10)
+
+
+class BenchmarksTests(TransactionTestCase):
+    # Страницы читают реплику, если она настроена (YATUBE_REPLICA_DB).
+    databases = '__all__'
+
+    def test_run_reports_every_view(self):
+        """Замеры содержат p50/p99 и число запросов каждой страницы."""
+        results = benchmarks.run([50], repeat=2)
+        self.assertEqual(
+            [result['view'] for result in results],
+            ['index', 'follow_index', 'group_posts', 'profile', 'post_view',
+             'search', 'api_posts']
+        )
+        for result in results:
+            self.assertEqual(result['scale'], 50)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries'], 0)
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, use_pool
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ThumbnailsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Запись с картинкой',
+            author=ThumbnailsTests.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+
+    def test_generate_thumbnails(self):
+        """Миниатюра строится заранее и выводится в карточке."""
+        generate_thumbnails(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.card_thumbnail)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, self.post.card_thumbnail)
+
+    def test_card_shows_original_until_thumbnail_ready(self):
+        """Пока миниатюры нет, карточка показывает исходное
+        изображение."""
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, self.post.image.url)
+
+    def test_new_image_resets_thumbnail(self):
+        """Замена изображения сбрасывает старую миниатюру."""
+        generate_thumbnails(self.post.pk)
+        self.post.refresh_from_db()
+        self.post.image = SimpleUploadedFile(
+            name='other.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.card_thumbnail, '')
+
+    def test_pool_not_used_with_in_memory_sqlite(self):
+        """С пулом миниатюры строятся в фоне, кроме базы SQLite
+        в памяти и режима THUMBNAIL_WORKERS = 0."""
+        self.assertFalse(use_pool())
+        with self.settings(THUMBNAIL_WORKERS=2):
+            with mock.patch.object(
+                connection, 'is_in_memory_db', return_value=False
+            ):
+                self.assertTrue(use_pool())
+            with mock.patch.object(
+                connection, 'is_in_memory_db', return_value=True
+            ):
+                self.assertEqual(use_pool(), connection.vendor != 'sqlite')
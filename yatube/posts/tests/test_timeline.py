@@ -0,0 +1,132 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Follow, Post, TimelineEntry
+from posts.timeline import timeline_posts
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.old_post = Post.objects.create(
+            text='Запись до подписки',
+            author=cls.author,
+        )
+
+    def test_follow_backfills_timeline(self):
+        """При подписке в ленту попадают прежние записи автора."""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        self.assertEqual(
+            list(timeline_posts(TimelineTests.reader)),
+            [TimelineTests.old_post]
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новая запись раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        new_post = Post.objects.create(text='Новая запись',
+                                       author=TimelineTests.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTests.reader, post=new_post
+        ).exists())
+        self.assertEqual(
+            list(timeline_posts(TimelineTests.reader))[0], new_post
+        )
+
+    def test_unfollow_trims_timeline(self):
+        """После отписки записи автора убираются из ленты."""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        Follow.objects.filter(user=TimelineTests.reader,
+                              author=TimelineTests.author).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.reader).exists()
+        )
+        self.assertEqual(list(timeline_posts(TimelineTests.reader)), [])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 0)
+    def test_celebrity_posts_read_on_demand(self):
+        """Записи популярного автора не раскладываются по лентам,
+        а подмешиваются при чтении."""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        new_post = Post.objects.create(text='Новая запись',
+                                       author=TimelineTests.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.reader).exists()
+        )
+        self.assertEqual(
+            list(timeline_posts(TimelineTests.reader)),
+            [new_post, TimelineTests.old_post]
+        )
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 0)
+    def test_celebrity_check_reads_counters(self):
+        """Популярность автора берется из счетчика подписчиков,
+        подписки автора при чтении ленты не агрегируются."""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        with CaptureQueriesContext(connection) as queries:
+            list(timeline_posts(TimelineTests.reader))
+        self.assertEqual(len(queries), 2)
+        self.assertIn('posts_userstats', queries.captured_queries[0]['sql'])
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    @mock.patch('posts.timeline.TIMELINE_LENGTH', 2)
+    def test_timeline_trimmed_to_length(self):
+        """Лента обрезается до TIMELINE_LENGTH последних записей
+        и при подписке, и при раскладке новой записи."""
+        author = TimelineTests.author
+        posts = [
+            Post.objects.create(text=f'Запись {i}', author=author)
+            for i in range(2)
+        ]
+        Follow.objects.create(user=TimelineTests.reader, author=author)
+        self.assertEqual(
+            list(timeline_posts(TimelineTests.reader)), posts[::-1]
+        )
+        new_post = Post.objects.create(text='Новая запись', author=author)
+        self.assertEqual(
+            list(timeline_posts(TimelineTests.reader)), [new_post, posts[1]]
+        )
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 1)
+    def test_crossing_celebrity_threshold(self):
+        """Ставший популярным автор пропадает из лент подписчиков,
+        а опустившийся до порога раскладывается по ним заново,
+        вместе с записями, сделанными в период популярности."""
+        author = TimelineTests.author
+        reader = TimelineTests.reader
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=other, author=author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=author).exists()
+        )
+        new_post = Post.objects.create(text='Новая запись', author=author)
+        self.assertEqual(
+            list(timeline_posts(reader)), [new_post, TimelineTests.old_post]
+        )
+        Follow.objects.filter(user=other, author=author).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=reader
+            ).values_list('post', flat=True)),
+            {new_post.pk, TimelineTests.old_post.pk}
+        )
+        self.assertEqual(
+            list(timeline_posts(reader)), [new_post, TimelineTests.old_post]
+        )
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import search, transfer
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author',
+                                              password='secret')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        for i in range(5):
+            post = Post.objects.create(
+                text=f'Кошка номер {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None
+            )
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=datetime(2020, 1, 1, tzinfo=timezone.utc)
+        )
+        Comment.objects.create(post=post, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'yatube.ndjson')
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group__slug',
+                'comments_count'
+            )),
+            'comments': list(Comment.objects.values_list(
+                'pk', 'post', 'author__username', 'created'
+            )),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+            'password': User.objects.get(username='Author').password,
+            'posts_count': User.objects.get(
+                username='Author'
+            ).stats.posts_count,
+        }
+
+    def clear(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+    def call(self, name, *args, **options):
+        call_command(name, *args, stdout=StringIO(), **options)
+
+    def assert_round_trip(self, path, **options):
+        expected = self.snapshot()
+        self.call('export_yatube', path, **options)
+        self.clear()
+        self.call('import_yatube', path, batch_size=3)
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(search.search_posts('кошка').count(), 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__username='Reader').count(), 5
+        )
+        self.assertFalse(os.path.exists(path + '.progress'))
+
+    def test_ndjson_round_trip(self):
+        """Выгрузка NDJSON загружается обратно без потерь, с id,
+        датами, счетчиками, поисковым индексом и лентами."""
+        self.assert_round_trip(self.path)
+        with open(self.path, encoding='utf-8') as stream:
+            models = [json.loads(line)['model'] for line in stream]
+        self.assertEqual(models, ['user'] * 2 + ['group'] + ['post'] * 5
+                         + ['comment', 'follow'])
+
+    def test_csv_round_trip(self):
+        """Выгрузка в каталог CSV загружается обратно без потерь."""
+        directory = os.path.join(self.directory.name, 'csv')
+        self.assert_round_trip(directory, format='csv')
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            ['comment.csv', 'follow.csv', 'group.csv', 'post.csv',
+             'user.csv']
+        )
+
+    def test_resume_after_failure(self):
+        """После сбоя загрузка продолжается с --resume с последнего
+        загруженного пакета и ничего не дублирует."""
+        expected = self.snapshot()
+        self.call('export_yatube', self.path)
+        self.clear()
+        with mock.patch.object(
+            transfer.Importer, '_import_comments',
+            side_effect=transfer.TransferError('сбой')
+        ):
+            with self.assertRaisesMessage(CommandError, 'после строки 6'):
+                self.call('import_yatube', self.path, batch_size=3)
+        self.assertEqual(Post.objects.count(), 3)
+        with self.assertRaisesMessage(CommandError, '--resume'):
+            self.call('import_yatube', self.path, batch_size=3)
+        self.call('import_yatube', self.path, batch_size=3, resume=True)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_repeated_import_skips_existing_rows(self):
+        """Строки, которые уже есть в базе, пропускаются."""
+        expected = self.snapshot()
+        self.call('export_yatube', self.path)
+        self.call('import_yatube', self.path)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_import_into_database_with_posts(self):
+        """Запись выгрузки, чей id занят чужой записью, получает новый
+        id вместе со своими комментариями и индексом, чужая запись
+        не меняется, повторная загрузка ничего не дублирует."""
+        commented = Comment.objects.get().post
+        self.call('export_yatube', self.path)
+        self.clear()
+        other = User.objects.create_user(username='Other')
+        taken = Post.objects.create(id=commented.pk, text='Чужая запись',
+                                    author=other)
+        for _ in range(2):
+            self.call('import_yatube', self.path, batch_size=3)
+            self.assertEqual(Post.objects.count(), 6)
+            self.assertEqual(
+                Post.objects.get(pk=taken.pk).text, 'Чужая запись'
+            )
+            self.assertFalse(Comment.objects.filter(post=taken).exists())
+            imported = Post.objects.get(text=commented.text)
+            self.assertNotEqual(imported.pk, taken.pk)
+            self.assertEqual(imported.comments.get().text, 'Комментарий')
+            self.assertEqual(imported.comments_count, 1)
+            self.assertEqual(search.search_posts('кошка').count(), 5)
+            self.assertNotIn(taken, search.search_posts('кошка'))
+
+    def test_unknown_author(self):
+        """Запись неизвестного автора останавливает загрузку."""
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            stream.write(json.dumps({
+                'model': 'post', 'id': 100, 'author': 'nobody', 'group': '',
+                'text': 'Текст', 'pub_date': '2021-01-01T00:00:00+00:00',
+                'image': '',
+            }) + '\n')
+        with self.assertRaisesMessage(CommandError, 'nobody'):
+            self.call('import_yatube', self.path)
+        self.assertFalse(Post.objects.filter(pk=100).exists())
@@ -0,0 +1,164 @@
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import trending
+from posts.models import Comment, Follow, Group, GroupScore, Post, PostScore
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        cls.post = Post.objects.create(
+            text='Обсуждаемая запись',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.quiet_post = Post.objects.create(
+            text='Тихая запись',
+            author=cls.reader,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def score(self, post):
+        value = PostScore.objects.get(post=post)
+        return value.score * trending.decay(value.scored_at, time.time())
+
+    def comment(self, post, count=1):
+        for i in range(count):
+            Comment.objects.create(
+                post=post, author=TrendingTests.reader, text=f'Ответ {i}'
+            )
+
+    def test_events_update_scores(self):
+        """Публикация, комментарий и подписка меняют оценки записи
+        и ее группы сразу при записи."""
+        post = TrendingTests.post
+        self.assertAlmostEqual(
+            self.score(post), settings.TRENDING_POST_WEIGHT, places=3
+        )
+        self.comment(post)
+        Follow.objects.create(user=TrendingTests.reader,
+                              author=TrendingTests.author)
+        expected = (
+            settings.TRENDING_POST_WEIGHT
+            + settings.TRENDING_COMMENT_WEIGHT
+            + settings.TRENDING_FOLLOWER_WEIGHT
+        )
+        self.assertAlmostEqual(self.score(post), expected, places=3)
+        self.assertAlmostEqual(
+            GroupScore.objects.get(group=TrendingTests.group).score,
+            expected, places=3
+        )
+
+    def test_follow_updates_scores_in_constant_queries(self):
+        """Подписка меняет оценки всех записей автора двумя UPDATE,
+        сколько бы записей у него ни было."""
+        for i in range(5):
+            Post.objects.create(text=f'Запись {i}',
+                                author=TrendingTests.author,
+                                group=TrendingTests.group)
+        with CaptureQueriesContext(connection) as queries:
+            trending.record_follow(TrendingTests.author.pk)
+        self.assertEqual(len(queries), 2)
+        self.assertAlmostEqual(
+            self.score(TrendingTests.post),
+            settings.TRENDING_POST_WEIGHT + settings.TRENDING_FOLLOWER_WEIGHT,
+            places=3
+        )
+        self.assertAlmostEqual(
+            GroupScore.objects.get(group=TrendingTests.group).score,
+            6 * (settings.TRENDING_POST_WEIGHT
+                 + settings.TRENDING_FOLLOWER_WEIGHT),
+            places=3
+        )
+
+    def test_rebuild_matches_incremental_scores(self):
+        """Пересчет дает те же оценки, что и обновления при записи."""
+        self.comment(TrendingTests.post, 3)
+        Follow.objects.create(user=TrendingTests.reader,
+                              author=TrendingTests.author)
+        incremental = self.score(TrendingTests.post)
+        self.assertEqual(trending.rebuild(), (2, 1))
+        self.assertAlmostEqual(
+            self.score(TrendingTests.post), incremental, places=3
+        )
+
+    def test_scores_decay(self):
+        """Через период полураспада оценка уменьшается вдвое,
+        события старше горизонта не учитываются."""
+        now = time.time()
+        trending.rebuild(now + settings.TRENDING_HALF_LIFE)
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=TrendingTests.post).score,
+            settings.TRENDING_POST_WEIGHT / 2, places=3
+        )
+        later = now + (trending.HORIZON + 1) * settings.TRENDING_HALF_LIFE
+        self.assertEqual(trending.rebuild(later), (0, 0))
+
+    def test_deleting_post_keeps_scores_consistent(self):
+        """Удаление записи с комментариями удаляет ее оценку
+        и вычитает ее из оценки группы."""
+        post = Post.objects.create(text='Удаляемая запись',
+                                   author=TrendingTests.author,
+                                   group=TrendingTests.group)
+        self.comment(post, 2)
+        post_id = post.pk
+        post.delete()
+        self.assertFalse(PostScore.objects.filter(pk=post_id).exists())
+        group_score = GroupScore.objects.get(group=TrendingTests.group)
+        self.assertAlmostEqual(
+            group_score.score * trending.decay(
+                group_score.scored_at, time.time()
+            ),
+            self.score(TrendingTests.post), places=3
+        )
+
+    def test_trending_page(self):
+        """Страница показывает записи по убыванию оценки и группы."""
+        self.comment(TrendingTests.quiet_post, 2)
+        trending.rebuild()
+        response = self.client.get(reverse('trending'))
+        self.assertEqual(
+            list(response.context['page']),
+            [TrendingTests.quiet_post, TrendingTests.post]
+        )
+        self.assertEqual(
+            list(response.context['groups']), [TrendingTests.group]
+        )
+        self.assertContains(response, TrendingTests.group.title)
+
+    def test_rank_trending_command(self):
+        """Команда пересчитывает оценки на заданный момент."""
+        out = StringIO()
+        moment = TrendingTests.post.pub_date + timedelta(
+            seconds=settings.TRENDING_HALF_LIFE
+        )
+        call_command('rank_trending', '--at', moment.isoformat(), stdout=out)
+        self.assertIn('Оценено записей: 2, групп: 1', out.getvalue())
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=TrendingTests.post).score,
+            settings.TRENDING_POST_WEIGHT / 2, places=3
+        )
@@ -0,0 +1,122 @@
+import io
+import shutil
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             StopFutureHandlers)
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import Post
+from posts.uploads import LimitedUploadHandler, OversizedUploadedFile
+
+User = get_user_model()
+
+
+def image_file(size, image_format='JPEG', name='image.jpg', **save_kwargs):
+    output = io.BytesIO()
+    Image.new('RGB', size, (255, 0, 0)).save(
+        output, format=image_format, **save_kwargs
+    )
+    return SimpleUploadedFile(name, output.getvalue(), 'image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    POST_IMAGE_MAX_BYTES=64 * 1024,
+    POST_IMAGE_MAX_PIXELS=1000 * 1000,
+    POST_IMAGE_MAX_SIDE=200,
+)
+class PostImageUploadTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PostImageUploadTests.user)
+
+    def test_image_is_downscaled_without_metadata(self):
+        """Изображение уменьшается и сохраняется без exif."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        form = PostForm(
+            data={'text': 'Запись'},
+            files={'image': image_file((800, 600), exif=exif.tobytes())}
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertLessEqual(max(image.size), 200)
+        self.assertNotIn('exif', image.info)
+
+    def test_too_many_pixels_rejected_before_decoding(self):
+        """Изображение с превышением числа пикселей отклоняется
+        по заголовку, пиксели не декодируются."""
+        uploaded = image_file((1200, 1000), 'PNG', 'big.png')
+        with mock.patch.object(Image.Image, 'load',
+                               side_effect=AssertionError('decoded')):
+            form = PostForm(data={'text': 'Запись'},
+                            files={'image': uploaded})
+            self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_oversized_upload_rejected(self):
+        """Слишком большой файл не принимается, запись не создается."""
+        posts_count = Post.objects.count()
+        uploaded = SimpleUploadedFile(
+            'big.jpg', b'\xff' * (128 * 1024), 'image/jpeg'
+        )
+        response = self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Запись', 'image': uploaded},
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(
+            response.context['form'].has_error('image', 'file_too_large')
+        )
+
+    def test_upload_handler_memory_is_flat(self):
+        """Объем памяти при приеме файла не зависит от его размера."""
+        chunk = b'\0' * 64 * 1024
+
+        def stream(total_chunks):
+            handlers = [LimitedUploadHandler(), MemoryFileUploadHandler()]
+            for handler in handlers:
+                handler.handle_raw_input(None, {}, 0, 'boundary')
+                try:
+                    handler.new_file('image', 'big.jpg', 'image/jpeg', None)
+                except StopFutureHandlers:
+                    break
+            tracemalloc.start()
+            for i in range(total_chunks):
+                data = chunk
+                for handler in handlers:
+                    data = handler.receive_data_chunk(data, i * len(chunk))
+                    if data is None:
+                        break
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            for handler in handlers:
+                uploaded = handler.file_complete(total_chunks * len(chunk))
+                if uploaded is not None:
+                    return uploaded, peak
+
+        small_file, small_peak = stream(1)
+        big_file, big_peak = stream(400)
+        self.assertNotIsInstance(small_file, OversizedUploadedFile)
+        self.assertIsInstance(big_file, OversizedUploadedFile)
+        self.assertLess(big_peak, small_peak * 2 + len(chunk))
@@ -5,12 +5,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post
 from posts.forms import CommentForm, PostForm
-from yatube.settings import POSTS_PER_PAGE
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 
 User = get_user_model()
 
@@ -150,20 +152,36 @@ class PostViewsTests(TestCase):
         self.check_post_data(response, PostViewsTests.post, is_post=True)
 
     def test_cache_index(self):
-        """Страница index закеширована"""
+        """Страница index закеширована до изменения записей"""
         response = self.authorized_client.get(reverse('index'))
         caсhe_page = response.content
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('index'))
+        self.assertEqual(caсhe_page, response.content)
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in queries
+        ))
         Post.objects.create(
             text='Новая запись',
             author=PostViewsTests.user,
         )
         response = self.authorized_client.get(reverse('index'))
         current_page = response.content
-        self.assertEqual(caсhe_page, current_page)
-        cache.clear()
-        response = self.authorized_client.get(reverse('index'))
-        current_page = response.content
         self.assertNotEqual(current_page, caсhe_page)
+        self.assertContains(response, 'Новая запись')
+
+    def test_cache_invalidated_by_comment(self):
+        """Новый комментарий сбрасывает кеш страницы записи"""
+        reverse_name = reverse('post', args=(PostViewsTests.user,
+                                             PostViewsTests.post.id))
+        self.authorized_client.get(reverse_name)
+        Comment.objects.create(
+            post=PostViewsTests.post,
+            author=PostViewsTests.user,
+            text='Новый комментарий'
+        )
+        response = self.authorized_client.get(reverse_name)
+        self.assertContains(response, 'Новый комментарий')
 
     def test_profile_follow(self):
         """Авторизованный пользователь может подписываться
@@ -256,9 +274,183 @@ class PaginatorViewsTest(TestCase):
         ]
         Post.objects.bulk_create(objects)
 
+    def setUp(self):
+        cache.clear()
+
     def test_paginator_first_page_contains_ten_records(self):
         """Количество записей на первой странице равно POSTS_PER_PAGE."""
         response = self.client.get(reverse('index'))
         self.assertEqual(
             len(response.context.get('page').object_list), POSTS_PER_PAGE
         )
+
+    def test_paginator_cursor_second_page_contains_rest_records(self):
+        """Курсор следующей страницы выдает оставшиеся записи,
+        курсор предыдущей возвращает к первой странице."""
+        first_page = self.client.get(reverse('index')).context['page']
+        self.assertIsNotNone(first_page.next_cursor)
+        self.assertIsNone(first_page.previous_cursor)
+        response = self.client.get(
+            reverse('index'), {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page']
+        self.assertEqual(len(second_page.object_list), 15 - POSTS_PER_PAGE)
+        self.assertIsNone(second_page.next_cursor)
+        response = self.client.get(
+            reverse('index'), {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page'].object_list),
+            list(first_page.object_list)
+        )
+
+    def test_paginator_cursor_page_does_not_count(self):
+        """Страница по курсору не выполняет COUNT(*)."""
+        first_page = self.client.get(reverse('index')).context['page']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('index'), {'cursor': first_page.next_cursor}
+            )
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_paginator_page_number_still_supported(self):
+        """Ссылки вида ?page=N продолжают работать."""
+        response = self.client.get(reverse('index'), {'page': 2})
+        self.assertEqual(
+            len(response.context.get('page').object_list),
+            15 - POSTS_PER_PAGE
+        )
+
+
+class FeedQueriesTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Это тестовая группа'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedQueriesTests.reader)
+        cache.clear()
+
+    def create_posts_with_comments(self, posts, comments):
+        for i in range(posts):
+            post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=FeedQueriesTests.user,
+                group=FeedQueriesTests.group
+            )
+            Comment.objects.bulk_create(
+                Comment(post=post, author=FeedQueriesTests.reader,
+                        text='Комментарий ' * 100)
+                for _ in range(comments)
+            )
+
+    def feed_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(url)
+        return queries.captured_queries
+
+    def test_feed_pages_do_not_load_comments(self):
+        """Ленты выполняют фиксированное число запросов и не читают
+        комментарии, сколько бы их ни было."""
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=(FeedQueriesTests.group.slug,)),
+            reverse('profile', args=(FeedQueriesTests.user.username,)),
+            reverse('follow_index'),
+        )
+        self.create_posts_with_comments(posts=2, comments=1)
+        baseline = {url: len(self.feed_queries(url)) for url in urls}
+        self.create_posts_with_comments(posts=POSTS_PER_PAGE * 2, comments=5)
+        for url in urls:
+            with self.subTest(url=url):
+                queries = self.feed_queries(url)
+                self.assertEqual(len(queries), baseline[url])
+                self.assertFalse(any(
+                    'posts_comment' in query['sql'] for query in queries
+                ))
+                self.assertTrue(any(
+                    f'LIMIT {POSTS_PER_PAGE + 1}' in query['sql']
+                    for query in queries
+                ))
+
+
+class CommentsPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Testuser')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_comments(self, count):
+        prefix = f'Commentator{Comment.objects.count()}_'
+        User.objects.bulk_create(
+            User(username=f'{prefix}{i}') for i in range(count)
+        )
+        authors = User.objects.filter(username__startswith=prefix)
+        Comment.objects.bulk_create(
+            Comment(post=CommentsPaginationTests.post, author=author,
+                    text=f'Комментарий {i}')
+            for i, author in enumerate(authors)
+        )
+
+    def post_queries(self):
+        cache.clear()
+        post = CommentsPaginationTests.post
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('post', args=(post.author.username, post.id))
+            )
+        return response, len(queries)
+
+    def test_post_page_shows_first_comments(self):
+        """Страница записи выводит первую страницу комментариев
+        с авторами, число запросов не зависит от числа комментариев."""
+        self.create_comments(2)
+        _, baseline = self.post_queries()
+        self.create_comments(COMMENTS_PER_PAGE * 2)
+        response, queries = self.post_queries()
+        self.assertEqual(queries, baseline)
+        comments_page = response.context['comments_page']
+        self.assertEqual(len(comments_page), COMMENTS_PER_PAGE)
+        self.assertIsNotNone(comments_page.next_cursor)
+        self.assertContains(response, 'js-more-comments')
+
+    def test_comments_fragment_loads_next_slice(self):
+        """Фрагмент со следующими комментариями отдается без
+        страницы записи, срезы не пересекаются."""
+        self.create_comments(COMMENTS_PER_PAGE + 5)
+        post = CommentsPaginationTests.post
+        response, _ = self.post_queries()
+        first = list(response.context['comments_page'])
+        cursor = response.context['comments_page'].next_cursor
+        response = self.client.get(
+            reverse('post_comments', args=(post.author.username, post.id)),
+            {'cursor': cursor}
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        rest = list(response.context['comments_page'])
+        self.assertEqual(len(rest), 5)
+        self.assertFalse(set(first) & set(rest))
+        self.assertIsNone(response.context['comments_page'].next_cursor)
+        self.assertNotContains(response, 'js-more-comments')
@@ -0,0 +1,87 @@
+"""Фоновая подготовка миниатюр изображений записей.
+
+Миниатюры всех размеров, которые используют шаблоны, строятся
+пулом потоков после сохранения записи с новым изображением.
+Шаблоны читают готовый адрес из Post.card_thumbnail и не вызывают
+Pillow при обработке запроса.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Поле модели -> параметры sorl-thumbnail для этого размера.
+THUMBNAIL_SIZES = {
+    'card_thumbnail': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def generate_thumbnails(post_id):
+    """Строит миниатюры записи и сохраняет их адреса."""
+    try:
+        post = Post.objects.select_related('author', 'group').get(pk=post_id)
+        if not post.image:
+            return
+        urls = {}
+        for field, (geometry, options) in THUMBNAIL_SIZES.items():
+            thumbnail = get_thumbnail(post.image, geometry, **options)
+            if not thumbnail.exists():
+                logger.warning('Не удалось построить миниатюру %s', post.image)
+                return
+            urls[field] = thumbnail.url
+        updated = Post.objects.filter(
+            pk=post_id, image=post.image.name
+        ).update(**urls)
+        if updated:
+            caching.bump_post_pages(post)
+    except Exception:
+        logger.exception('Ошибка построения миниатюр записи %s', post_id)
+
+
+def _generate_in_worker(post_id):
+    try:
+        generate_thumbnails(post_id)
+    finally:
+        connections.close_all()
+
+
+def use_pool():
+    """Строить ли миниатюры в пуле. Не для базы SQLite в памяти
+    (так работают тестовые базы): в ней блокировки на уровне таблиц
+    без ожидания, и фоновая запись падает с «database table is
+    locked», если параллельно идет запрос или очистка базы."""
+    if not settings.THUMBNAIL_WORKERS:
+        return False
+    return not (
+        connection.vendor == 'sqlite' and connection.is_in_memory_db()
+    )
+
+
+def schedule_thumbnails(post):
+    """Ставит построение миниатюр в очередь после фиксации транзакции.
+    Без пула (THUMBNAIL_WORKERS = 0) миниатюры строятся сразу."""
+    if use_pool():
+        transaction.on_commit(
+            lambda: get_executor().submit(_generate_in_worker, post.pk)
+        )
+    else:
+        transaction.on_commit(lambda: generate_thumbnails(post.pk))
@@ -0,0 +1,225 @@
+"""Предрассчитанная лента подписок (fan-out on write).
+
+Запись автора раскладывается по лентам подписчиков при публикации.
+Для авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+раскладка не делается: их записи подмешиваются в ленту при чтении.
+Популярность определяется по счетчику UserStats.followers_count,
+без подсчета подписок автора. Когда автор переходит порог, его записи
+убираются из лент подписчиков или раскладываются по ним заново
+(followers_changed()).
+
+После каждой раскладки лента обрезается до TIMELINE_LENGTH последних
+записей, так что таблица TimelineEntry не растет с числом записей.
+"""
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from yatube.settings import TIMELINE_FANOUT_LIMIT, TIMELINE_LENGTH
+
+# Ключ листания ленты: при чтении из TimelineEntry он берется
+# из ее столбцов, чтобы выборка шла по индексу (user, pub_date, post).
+TIMELINE_KEYS = ('feed_date', 'feed_post')
+
+
+def is_celebrity(author):
+    """Автор слишком популярен для раскладки записей по лентам."""
+    return UserStats.objects.filter(
+        user_id=author.pk, followers_count__gt=TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def celebrity_authors(user):
+    """id популярных авторов, на которых подписан пользователь:
+    подписки пользователя по индексу, счетчик каждого автора
+    по первичному ключу UserStats."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=TIMELINE_FANOUT_LIMIT
+        ).values_list('author', flat=True)
+    )
+
+
+def _trim(entries):
+    """Оставляет в лентах записей entries не больше TIMELINE_LENGTH
+    последних: удаляются записи старше TIMELINE_LENGTH-й записи ленты
+    того же пользователя (поиск по индексу (user, pub_date, post))."""
+    cutoff = TimelineEntry.objects.filter(
+        user=OuterRef('user')
+    ).order_by('-pub_date').values('pub_date')[
+        TIMELINE_LENGTH - 1:TIMELINE_LENGTH
+    ]
+    entries.filter(pub_date__lt=Subquery(cutoff)).delete()
+
+
+def fan_out_post(post):
+    """Раскладывает новую запись по лентам подписчиков автора."""
+    if is_celebrity(post.author):
+        return
+    followers = Follow.objects.filter(
+        author=post.author
+    ).values_list('user', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True
+    )
+    _trim(TimelineEntry.objects.filter(user__in=followers))
+
+
+def backfill(user, author):
+    """Добавляет в ленту пользователя последние записи автора."""
+    if is_celebrity(author):
+        return
+    posts = author.posts.order_by('-pub_date').values_list(
+        'id', 'pub_date'
+    )[:TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True
+    )
+    _trim(TimelineEntry.objects.filter(user=user))
+
+
+def backfill_many(user, author_ids):
+    """backfill() для нескольких авторов: популярные отсеиваются
+    одним запросом, последние TIMELINE_LENGTH записей остальных
+    выбираются одним запросом (коррелированный подзапрос по индексу
+    (author, pub_date)) и добавляются одной вставкой."""
+    latest = Post.objects.filter(
+        author_id=OuterRef('author_id')
+    ).order_by('-pub_date').values('pk')[:TIMELINE_LENGTH]
+    posts = Post.objects.filter(
+        author_id__in=author_ids, pk__in=Subquery(latest)
+    ).exclude(
+        author__stats__followers_count__gt=TIMELINE_FANOUT_LIMIT
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True
+    )
+    _trim(TimelineEntry.objects.filter(user=user))
+
+
+def backfill_followers(author_id, batch_size=1000):
+    """Раскладывает последние записи автора по лентам всех его
+    подписчиков."""
+    posts = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date')
+        .values_list('id', 'pub_date')[:TIMELINE_LENGTH]
+    )
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.extend(
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        )
+        if len(batch) >= batch_size:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    _trim(TimelineEntry.objects.filter(user__in=followers))
+
+
+def followers_changed(author_ids, delta):
+    """Вызывается после изменения счетчика подписчиков авторов
+    на delta. Записи автора, ставшего популярным, убираются из лент:
+    они подмешиваются при чтении. Автору, опустившемуся до порога,
+    записи раскладываются заново, в том числе сделанные без
+    раскладки, пока он был популярен."""
+    if delta > 0:
+        threshold = TIMELINE_FANOUT_LIMIT + 1
+    else:
+        threshold = TIMELINE_FANOUT_LIMIT
+    crossed = list(
+        UserStats.objects.filter(
+            user_id__in=author_ids, followers_count=threshold
+        ).values_list('user', flat=True)
+    )
+    if not crossed:
+        return
+    if delta > 0:
+        TimelineEntry.objects.filter(post__author_id__in=crossed).delete()
+        return
+    for author_id in crossed:
+        backfill_followers(author_id)
+
+
+def trim(user, author):
+    """Убирает из ленты пользователя записи автора."""
+    trim_many(user, [author.pk])
+
+
+def trim_many(user, author_ids):
+    TimelineEntry.objects.filter(
+        user=user, post__author_id__in=author_ids
+    ).delete()
+
+
+def rebuild(batch_size=1000):
+    """Заново заполняет ленты по подпискам: в ленту попадают
+    последние TIMELINE_LENGTH записей каждого автора, кроме
+    популярных. Нужна после загрузки данных в обход сигналов,
+    после пересчета счетчиков (counters.recount).
+    Идет одной транзакцией: открытые курсоры iterator() держат снимок
+    базы, и в режиме WAL журнал из-за них рос бы с каждым пакетом."""
+    with transaction.atomic():
+        _rebuild(batch_size)
+
+
+def _rebuild(batch_size):
+    TimelineEntry.objects.all().delete()
+    authors = UserStats.objects.filter(
+        followers_count__gt=0, followers_count__lte=TIMELINE_FANOUT_LIMIT
+    ).values_list('user', flat=True).order_by('user')
+    batch = []
+    for author_id in authors.iterator():
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by('-pub_date')
+            .values_list('id', 'pub_date')[:TIMELINE_LENGTH]
+        )
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user', flat=True)
+        for user_id in followers.iterator():
+            batch.extend(
+                TimelineEntry(user_id=user_id, post_id=post_id,
+                              pub_date=pub_date)
+                for post_id, pub_date in posts
+            )
+            if len(batch) >= batch_size:
+                TimelineEntry.objects.bulk_create(batch)
+                batch = []
+    TimelineEntry.objects.bulk_create(batch)
+    _trim(TimelineEntry.objects.all())
+
+
+def timeline_posts(user):
+    """Queryset записей ленты подписок пользователя
+    с аннотациями ключа листания TIMELINE_KEYS."""
+    celebrities = celebrity_authors(user)
+    if not celebrities:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        ).order_by('-feed_date', '-feed_post')
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author__in=celebrities)
+    ).annotate(
+        feed_date=F('pub_date'), feed_post=F('pk')
+    ).order_by('-feed_date', '-feed_post')
@@ -0,0 +1,356 @@
+"""Выгрузка и загрузка данных для команд export_yatube и import_yatube.
+
+Данные идут потоком в порядке зависимостей: пользователи, группы,
+записи, комментарии, подписки. NDJSON — один файл, где у каждой
+строки есть поле model; CSV — каталог с файлом <model>.csv на модель.
+Пользователи и группы ссылаются по username и slug, записи
+и комментарии сохраняют id из выгрузки.
+
+Загрузка идет пакетами bulk_create, каждый пакет в своей транзакции.
+Строки, ключи которых уже есть в базе, пропускаются, поэтому пакет,
+прерванный сбоем, можно загрузить заново. Запись или комментарий,
+чей id в базе занят другой строкой, получает новый id, и ссылки
+на него в следующих строках выгрузки заменяются. Сигналы при bulk_create
+не срабатывают: поисковый индекс и версии кеша обновляются для
+каждого пакета, счетчики, ленты подписок и рейтинг популярного —
+в finish().
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+from itertools import chain
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, group_stats, search, timeline, trending
+from .models import Comment, Follow, Group, Post, SearchTerm
+
+User = get_user_model()
+
+FIELDS = {
+    'user': ('username', 'email', 'first_name', 'last_name', 'password',
+             'date_joined'),
+    'group': ('slug', 'title', 'description'),
+    'post': ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+    'comment': ('id', 'post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+
+DATE_FIELDS = ('date_joined', 'pub_date', 'created')
+
+
+class TransferError(Exception):
+    """Данные нельзя загрузить."""
+
+
+def _querysets():
+    """Выборки строк выгрузки: столбцы соответствуют FIELDS."""
+    return {
+        'user': User.objects.values_list(*FIELDS['user']),
+        'group': Group.objects.values_list(*FIELDS['group']),
+        'post': Post.objects.values_list(
+            'id', 'author__username', 'group__slug', 'text', 'pub_date',
+            'image'
+        ),
+        'comment': Comment.objects.values_list(
+            'id', 'post_id', 'author__username', 'text', 'created'
+        ),
+        'follow': Follow.objects.values_list(
+            'user__username', 'author__username'
+        ),
+    }
+
+
+def export_rows(chunk_size=2000):
+    """Строки выгрузки (model, row) с постоянным расходом памяти."""
+    for model, queryset in _querysets().items():
+        for values in queryset.order_by('pk').iterator(chunk_size):
+            row = dict(zip(FIELDS[model], values))
+            for field in DATE_FIELDS:
+                if field in row:
+                    row[field] = row[field].isoformat()
+            if model == 'post':
+                row['group'] = row['group'] or ''
+                row['image'] = row['image'] or ''
+            yield model, row
+
+
+def write_ndjson(rows, stream):
+    count = 0
+    for model, row in rows:
+        stream.write(json.dumps({'model': model, **row}, ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def write_csv(rows, directory):
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    count = 0
+    try:
+        for model, row in rows:
+            if model not in files:
+                stream = open(os.path.join(directory, f'{model}.csv'), 'w',
+                              newline='', encoding='utf-8')
+                writer = csv.DictWriter(stream, FIELDS[model])
+                writer.writeheader()
+                files[model] = stream, writer
+            files[model][1].writerow(row)
+            count += 1
+    finally:
+        for stream, _ in files.values():
+            stream.close()
+    return count
+
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as stream:
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                model = row.pop('model')
+            except (ValueError, KeyError):
+                raise TransferError(f'Строка {number}: неверная запись')
+            yield model, row
+
+
+def read_csv(directory):
+    for model in FIELDS:
+        path = os.path.join(directory, f'{model}.csv')
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as stream:
+            for row in csv.DictReader(stream):
+                yield model, row
+
+
+@contextmanager
+def explicit_dates():
+    """bulk_create заполняет поля auto_now_add текущим временем,
+    а загрузке нужны даты из выгрузки."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загружает пакеты строк, сопоставляя username и slug с id
+    через словари в памяти. Словари растут с числом пользователей
+    и групп, но не записей: из записей запоминаются только те,
+    которым пришлось дать новый id."""
+
+    # Поля, по которым строка в базе с тем же id считается той же
+    # строкой выгрузки, загруженной раньше.
+    SAME_FIELDS = {
+        Post: ('author_id', 'pub_date', 'text'),
+        Comment: ('post_id', 'author_id', 'created', 'text'),
+    }
+
+    def __init__(self):
+        self.user_ids = {}
+        self.group_ids = {}
+        self.post_ids = {}
+        self.comment_ids = {}
+        self.counts = dict.fromkeys(FIELDS, 0)
+
+    def _insert(self, model, objects, id_map):
+        """Вставляет объекты с id из выгрузки и возвращает
+        вставленные. Объект, id которого занят той же строкой, уже
+        загружен и пропускается. Объект, id которого занят другой
+        строкой, вставляется с новым id или сопоставляется со своей
+        копией из прерванной загрузки; замена запоминается в id_map."""
+        fields = self.SAME_FIELDS[model]
+
+        def key(obj):
+            return tuple(getattr(obj, field) for field in fields)
+
+        existing = {
+            pk: tuple(values) for pk, *values in model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', *fields)
+        }
+        fresh = [obj for obj in objects if obj.pk not in existing]
+        collided = [
+            obj for obj in objects
+            if obj.pk in existing and existing[obj.pk] != key(obj)
+        ]
+        if collided:
+            copies = {
+                tuple(values): pk for pk, *values in model.objects.filter(**{
+                    f'{fields[0]}__in': {key(obj)[0] for obj in collided},
+                    f'{fields[1]}__in': {key(obj)[1] for obj in collided},
+                }).values_list('pk', *fields)
+            }
+            next_id = max(
+                model.objects.aggregate(top=Max('pk'))['top'] or 0,
+                *(obj.pk for obj in objects)
+            ) + 1
+            for obj in collided:
+                copy_id = copies.get(key(obj))
+                if copy_id is not None:
+                    id_map[obj.pk] = copy_id
+                    continue
+                id_map[obj.pk] = obj.pk = next_id
+                next_id += 1
+                fresh.append(obj)
+        model.objects.bulk_create(fresh)
+        return fresh
+
+    def _resolve(self, model, field, ids, keys):
+        """Дополняет словарь ids ключами keys из базы."""
+        missing = {key for key in keys if key and key not in ids}
+        if missing:
+            ids.update(
+                model.objects.filter(
+                    **{f'{field}__in': missing}
+                ).values_list(field, 'pk')
+            )
+        unknown = missing - ids.keys()
+        if unknown:
+            raise TransferError(
+                f'Не найдены {field}: ' + ', '.join(sorted(unknown))
+            )
+
+    def _import_users(self, rows):
+        User.objects.bulk_create(
+            [
+                User(
+                    username=row['username'], email=row['email'],
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    password=row['password'] or make_password(None),
+                    date_joined=row['date_joined'],
+                )
+                for row in rows
+            ],
+            ignore_conflicts=True
+        )
+        self._resolve(User, 'username', self.user_ids,
+                      [row['username'] for row in rows])
+
+    def _import_groups(self, rows):
+        Group.objects.bulk_create(
+            [
+                Group(slug=row['slug'], title=row['title'],
+                      description=row['description'])
+                for row in rows
+            ],
+            ignore_conflicts=True
+        )
+        self._resolve(Group, 'slug', self.group_ids,
+                      [row['slug'] for row in rows])
+
+    def _import_posts(self, rows):
+        self._resolve(User, 'username', self.user_ids,
+                      [row['author'] for row in rows])
+        self._resolve(Group, 'slug', self.group_ids,
+                      [row['group'] for row in rows])
+        posts = [
+            Post(
+                id=row['id'], text=row['text'],
+                author_id=self.user_ids[row['author']],
+                group_id=self.group_ids.get(row['group']),
+                pub_date=row['pub_date'], image=row['image'],
+            )
+            for row in rows
+        ]
+        inserted = self._insert(Post, posts, self.post_ids)
+        SearchTerm.objects.bulk_create(
+            chain.from_iterable(search.index_terms(post) for post in inserted)
+        )
+
+    def _import_comments(self, rows):
+        self._resolve(User, 'username', self.user_ids,
+                      [row['author'] for row in rows])
+        self._insert(Comment, [
+            Comment(
+                id=row['id'], text=row['text'],
+                post_id=self.post_ids.get(row['post'], row['post']),
+                author_id=self.user_ids[row['author']],
+                created=row['created'],
+            )
+            for row in rows
+        ], self.comment_ids)
+
+    def _import_follows(self, rows):
+        self._resolve(User, 'username', self.user_ids,
+                      [row[field] for row in rows
+                       for field in ('user', 'author')])
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=self.user_ids[row['user']],
+                       author_id=self.user_ids[row['author']])
+                for row in rows
+            ],
+            ignore_conflicts=True
+        )
+
+    def _scopes(self, batch):
+        """Области кеша, которые задевает пакет."""
+        scopes = {caching.FEED}
+        slugs = [row['slug'] for row in batch['group']] + [
+            row['group'] for row in batch['post'] if row['group']
+        ]
+        usernames = [row['author'] for row in batch['post']] + [
+            row[field] for row in batch['follow']
+            for field in ('user', 'author')
+        ]
+        scopes.update(caching.GROUP.format(slug=slug) for slug in slugs)
+        scopes.update(
+            caching.USER.format(username=username) for username in usernames
+        )
+        scopes.update(
+            caching.POST.format(
+                post_id=self.post_ids.get(row['post'], row['post'])
+            )
+            for row in batch['comment']
+        )
+        return scopes
+
+    def import_batch(self, rows):
+        """Загружает пакет строк (model, row) в одной транзакции."""
+        batch = {model: [] for model in FIELDS}
+        for model, row in rows:
+            if model not in batch:
+                raise TransferError(f'Неизвестная модель: {model}')
+            for field in DATE_FIELDS:
+                if field in row:
+                    row[field] = parse_datetime(row[field])
+            batch[model].append(row)
+        with transaction.atomic(), explicit_dates():
+            for model, model_rows in batch.items():
+                if model_rows:
+                    getattr(self, f'_import_{model}s')(model_rows)
+                    self.counts[model] += len(model_rows)
+        caching.bump(*self._scopes(batch))
+
+    def finish(self):
+        """Пересчитывает то, что при записи ведут сигналы,
+        и сдвигает последовательности id после явных id."""
+        counters.recount()
+        timeline.rebuild()
+        trending.rebuild()
+        group_stats.rebuild()
+        caching.bump(caching.GROUPS)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Post, Comment]
+            ):
+                cursor.execute(sql)
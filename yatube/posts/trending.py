@@ -0,0 +1,263 @@
+"""Рейтинг популярных записей и групп (страница /trending/).
+
+Оценка записи — сумма весов событий, каждый из которых затухает
+вдвое за TRENDING_HALF_LIFE секунд:
+    публикация        TRENDING_POST_WEIGHT + TRENDING_FOLLOWER_WEIGHT
+                      на каждого подписчика автора;
+    комментарий       TRENDING_COMMENT_WEIGHT.
+Новый подписчик автора добавляет TRENDING_FOLLOWER_WEIGHT к записям
+автора с учетом их возраста, одним UPDATE для всех записей. Оценка
+группы — сумма оценок ее записей.
+
+PostScore и GroupScore хранят оценку на момент scored_at. Сигналы
+прибавляют к ней события одним UPDATE: старое значение сначала
+затухает до текущего момента. При удалении записи ее оценка
+вычитается из оценки группы одним UPDATE, каскадное удаление
+комментариев оценки не трогает. Перенос записи между группами
+сигналы не учитывают, это исправляет rebuild() (команда
+rank_trending): он заново считает все оценки по событиям за HORIZON
+последних периодов полураспада двумя запросами INSERT ... SELECT,
+без передачи строк в Python. Более старые события дают меньше 0,1%
+оценки.
+
+После rebuild() у всех строк один scored_at, поэтому порядок по
+индексу -score и есть рейтинг; строки, обновленные сигналами позже,
+отличаются от него не больше, чем на затухание с последнего rebuild().
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (F, FloatField, Func, OuterRef, Subquery, Sum,
+                              Value)
+from django.db.models.functions import Coalesce, Power
+
+from . import caching
+from .models import Comment, GroupScore, Post, PostScore, UserStats
+
+# Число периодов полураспада, за которые учитываются события.
+HORIZON = 10
+
+
+class Epoch(Func):
+    """Время в секундах unix."""
+    output_field = FloatField()
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context
+        )
+
+
+def decay(timestamp, now):
+    """Множитель затухания события в момент timestamp к моменту now."""
+    return 2 ** ((timestamp - now) / settings.TRENDING_HALF_LIFE)
+
+
+def _decay_expression(seconds, now):
+    return Power(
+        Value(2.0),
+        (seconds - Value(now)) / Value(float(settings.TRENDING_HALF_LIFE)),
+        output_field=FloatField()
+    )
+
+
+def horizon(now):
+    """Границы периода, события которого входят в оценку."""
+    start = now - HORIZON * settings.TRENDING_HALF_LIFE
+    return (
+        datetime.fromtimestamp(start, timezone.utc),
+        datetime.fromtimestamp(now, timezone.utc),
+    )
+
+
+def _add(model, field, pk, value, now):
+    """Прибавляет к оценке объекта value на момент now. Строка
+    создается только для положительной прибавки: отрицательные
+    приходят и при каскадном удалении самого объекта."""
+    updated = model.objects.filter(pk=pk).update(
+        score=F('score') * _decay_expression(F('scored_at'), now)
+        + Value(value),
+        scored_at=now
+    )
+    if not updated and value > 0:
+        model.objects.bulk_create(
+            [model(**{field: pk}, score=value, scored_at=now)],
+            ignore_conflicts=True
+        )
+
+
+def _add_scores(values, now):
+    """values — словарь {(pk записи, pk группы): прибавка}."""
+    groups = defaultdict(float)
+    for (post_id, group_id), value in values.items():
+        _add(PostScore, 'post_id', post_id, value, now)
+        if group_id is not None:
+            groups[group_id] += value
+    for group_id, value in groups.items():
+        _add(GroupScore, 'group_id', group_id, value, now)
+
+
+def post_weight(followers):
+    return (
+        settings.TRENDING_POST_WEIGHT
+        + settings.TRENDING_FOLLOWER_WEIGHT * followers
+    )
+
+
+def record_post(post):
+    now = time.time()
+    followers = UserStats.objects.filter(
+        user_id=post.author_id
+    ).values_list('followers_count', flat=True).first() or 0
+    _add_scores({(post.pk, post.group_id): post_weight(followers)}, now)
+
+
+def record_comment(comment, sign=1):
+    now = time.time()
+    value = sign * settings.TRENDING_COMMENT_WEIGHT * decay(
+        comment.created.timestamp(), now
+    )
+    _add_scores({(comment.post_id, comment.post.group_id): value}, now)
+
+
+def record_post_deleted(post):
+    """Вычитает оценку удаляемой записи из оценки ее группы.
+    Вызывается до удаления, пока строка PostScore еще есть."""
+    if post.group_id is None:
+        return
+    now = time.time()
+    post_score = PostScore.objects.filter(post=post.pk).annotate(
+        value=F('score') * _decay_expression(F('scored_at'), now)
+    ).values('value')
+    GroupScore.objects.filter(group=post.group_id).update(
+        score=F('score') * _decay_expression(F('scored_at'), now)
+        - Coalesce(Subquery(post_score), 0.0),
+        scored_at=now
+    )
+
+
+def record_follow(author_id, sign=1):
+    """Подписка на автора или отписка меняет оценки его записей
+    за период оценки."""
+    record_follows([author_id], sign)
+
+
+def record_follows(author_ids, sign=1):
+    """Меняет оценки записей авторов за период оценки и их групп
+    двумя UPDATE, без выборки записей в Python. Записи без строки
+    PostScore пропускаются, их учтет rebuild()."""
+    now = time.time()
+    start, _ = horizon(now)
+    posts = Post.objects.filter(
+        author_id__in=author_ids, pub_date__gte=start
+    ).order_by()
+    value = Value(sign * settings.TRENDING_FOLLOWER_WEIGHT) * (
+        _decay_expression(Epoch('pub_date'), now)
+    )
+    decayed = F('score') * _decay_expression(F('scored_at'), now)
+    PostScore.objects.filter(post__in=posts).update(
+        score=decayed + Subquery(
+            Post.objects.filter(pk=OuterRef('post')).annotate(
+                value=value
+            ).values('value')
+        ),
+        scored_at=now
+    )
+    group_posts = posts.filter(group__isnull=False)
+    GroupScore.objects.filter(group__in=group_posts.values('group')).update(
+        score=decayed + Subquery(
+            group_posts.filter(group=OuterRef('group')).values(
+                'group'
+            ).annotate(total=Sum(value)).values('total')
+        ),
+        scored_at=now
+    )
+
+
+def _events(start, end, now):
+    """SQL и параметры событий за период: столбцы target (pk записи)
+    и value (вклад события на момент now)."""
+    publications = Post.objects.filter(
+        pub_date__gte=start, pub_date__lte=end
+    ).order_by().annotate(
+        target=F('pk'),
+        value=(
+            Value(settings.TRENDING_POST_WEIGHT)
+            + Value(settings.TRENDING_FOLLOWER_WEIGHT)
+            * Coalesce(F('author__stats__followers_count'), 0)
+        ) * _decay_expression(Epoch('pub_date'), now)
+    ).values_list('target', 'value')
+    comments = Comment.objects.filter(
+        created__gte=start, created__lte=end
+    ).order_by().annotate(
+        target=F('post_id'),
+        value=Value(settings.TRENDING_COMMENT_WEIGHT)
+        * _decay_expression(Epoch('created'), now)
+    ).values_list('target', 'value')
+    publications_sql, publications_params = (
+        publications.query.sql_with_params()
+    )
+    comments_sql, comments_params = comments.query.sql_with_params()
+    return (
+        f'{publications_sql} UNION ALL {comments_sql}',
+        (*publications_params, *comments_params),
+    )
+
+
+def rebuild(now=None):
+    """Пересчитывает все оценки на момент now и возвращает число
+    оцененных записей и групп."""
+    now = time.time() if now is None else now
+    events_sql, events_params = _events(*horizon(now), now)
+    qn = connection.ops.quote_name
+    post_scores = qn(PostScore._meta.db_table)
+    group_scores = qn(GroupScore._meta.db_table)
+    posts = qn(Post._meta.db_table)
+    score_post = qn(PostScore._meta.get_field('post').column)
+    score_group = qn(GroupScore._meta.get_field('group').column)
+    post_pk = qn(Post._meta.pk.column)
+    post_group = qn(Post._meta.get_field('group').column)
+    score, scored_at = qn('score'), qn('scored_at')
+    with transaction.atomic(), connection.cursor() as cursor:
+        PostScore.objects.all().delete()
+        GroupScore.objects.all().delete()
+        cursor.execute(
+            f'INSERT INTO {post_scores} ({score_post}, {score}, {scored_at}) '
+            f'SELECT events.target, SUM(events.value), %s '
+            f'FROM ({events_sql}) events GROUP BY events.target',
+            (now, *events_params)
+        )
+        post_count = cursor.rowcount
+        cursor.execute(
+            f'INSERT INTO {group_scores} '
+            f'({score_group}, {score}, {scored_at}) '
+            f'SELECT {posts}.{post_group}, SUM({post_scores}.{score}), %s '
+            f'FROM {post_scores} INNER JOIN {posts} '
+            f'ON {posts}.{post_pk} = {post_scores}.{score_post} '
+            f'WHERE {posts}.{post_group} IS NOT NULL '
+            f'GROUP BY {posts}.{post_group}',
+            (now,)
+        )
+        group_count = cursor.rowcount
+    caching.bump(caching.TRENDING)
+    return post_count, group_count
+
+
+def top_posts(limit):
+    scores = PostScore.objects.filter(score__gt=0).select_related(
+        'post__author', 'post__group'
+    ).order_by('-score')[:limit]
+    return [score.post for score in scores]
+
+
+def top_groups(limit):
+    scores = GroupScore.objects.filter(score__gt=0).select_related(
+        'group'
+    ).order_by('-score')[:limit]
+    return [score.group for score in scores]
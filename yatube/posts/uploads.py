@@ -0,0 +1,105 @@
+"""Ограничения на загружаемые изображения записей.
+
+LimitedUploadHandler перестает принимать файл, как только он
+превысил POST_IMAGE_MAX_BYTES, поэтому большой файл не попадает
+ни в память, ни на диск целиком. sanitize_image() проверяет формат
+и размеры по заголовку до декодирования пикселей, уменьшает
+изображение до POST_IMAGE_MAX_SIDE и сохраняет его заново без
+метаданных.
+"""
+import io
+import os
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+
+
+class OversizedUploadedFile(UploadedFile):
+    """Файл, прием которого остановлен из-за размера.
+    Содержимого нет, известен только принятый объем."""
+
+    def __init__(self, name, content_type, size, charset):
+        super().__init__(io.BytesIO(), name, content_type, size, charset)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Первый обработчик в FILE_UPLOAD_HANDLERS: отрезает файлы
+    больше POST_IMAGE_MAX_BYTES от остальных обработчиков."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            self.oversized = True
+        if self.oversized:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.oversized:
+            return None
+        return OversizedUploadedFile(
+            self.file_name, self.content_type, self.received, self.charset
+        )
+
+
+def sanitize_image(uploaded):
+    """Проверяет загруженное изображение и возвращает его
+    уменьшенную копию без метаданных."""
+    max_bytes = settings.POST_IMAGE_MAX_BYTES
+    oversized = isinstance(uploaded, OversizedUploadedFile)
+    if oversized or uploaded.size > max_bytes:
+        raise forms.ValidationError(
+            'Размер файла не должен превышать '
+            + filesizeformat(max_bytes),
+            code='file_too_large'
+        )
+    uploaded.seek(0)
+    try:
+        image = Image.open(uploaded)
+    except Exception:
+        raise forms.ValidationError(
+            'Загрузите правильное изображение', code='invalid_image'
+        )
+    if image.format not in ALLOWED_FORMATS:
+        raise forms.ValidationError(
+            'Допустимые форматы: ' + ', '.join(ALLOWED_FORMATS),
+            code='invalid_format'
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise forms.ValidationError(
+            f'Изображение слишком большое: {width}x{height}',
+            code='too_many_pixels'
+        )
+    image_format = image.format
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    # Для JPEG draft() декодирует сразу в уменьшенном масштабе.
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.info = {}
+    output = io.BytesIO()
+    # Изображение сохраняется заново без exif и прочих метаданных.
+    image.save(output, format=image_format)
+    name = os.path.basename(uploaded.name)
+    return SimpleUploadedFile(
+        name, output.getvalue(), ALLOWED_FORMATS[image_format]
+    )
@@ -1,13 +1,63 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, async_views, views
+
+# Страницы с асинхронной версией: под ASGI подключается она.
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('group/<slug:slug>/', views.group_posts, name='group_posts'),
+    path('', read_views.index, name='index'),
+    path('groups/', views.group_list, name='group_list'),
+    path('group/<slug:slug>/', read_views.group_posts, name='group_posts'),
+    path(
+        'group/<slug:slug>/follow/',
+        views.group_follow,
+        name='group_follow'
+    ),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow,
+        name='group_unfollow'
+    ),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
-    path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
+    # api/v1/events/ обслуживает posts.sse под ASGI (yatube/asgi.py).
+    path('api/v1/posts/', api.post_list, name='api_posts'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path(
+        'api/v1/posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='api_post_comments'
+    ),
+    path('api/v1/groups/<slug:slug>/', api.group_detail, name='api_group'),
+    path(
+        'api/v1/groups/<slug:slug>/posts/',
+        api.group_posts,
+        name='api_group_posts'
+    ),
+    path(
+        'api/v1/users/<str:username>/',
+        api.profile_detail,
+        name='api_profile'
+    ),
+    path(
+        'api/v1/users/<str:username>/posts/',
+        api.profile_posts,
+        name='api_profile_posts'
+    ),
+    path(
+        '<str:username>/<int:post_id>/',
+        read_views.post_view,
+        name='post'
+    ),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         '<str:username>/<int:post_id>/comment/',
         views.add_comment,
@@ -28,5 +78,15 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
-    path('<str:username>/', views.profile, name='profile'),
+    path(
+        '<str:username>/followers/',
+        views.followers,
+        name='followers'
+    ),
+    path(
+        '<str:username>/following/',
+        views.following,
+        name='following'
+    ),
+    path('<str:username>/', read_views.profile, name='profile'),
 ]
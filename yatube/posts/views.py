@@ -3,33 +3,57 @@ from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
+from .caching import (FEED, GROUP, GROUPS, POST, TRENDING, USER, cached_page,
+                      conditional_page)
+from .follows import follow_many, suggestions, unfollow_many
+from .forms import CommentForm, PostForm, SearchForm
 from .models import Follow, Group, Post
-from yatube.settings import POSTS_PER_PAGE
+from .paginators import CursorPaginator, cursor_state
+from .search import (SEARCH_KEYS, freeze_weights, no_results, query_terms,
+                     search_posts, term_weights, thaw_weights)
+from .timeline import TIMELINE_KEYS, timeline_posts
+from .trending import top_groups, top_posts
+from yatube.settings import (COMMENTS_PER_PAGE, GROUPS_PER_PAGE,
+                             POSTS_PER_PAGE, TRENDING_SIZE, USERS_PER_PAGE)
 
 User = get_user_model()
 
 
-def posts_paginator(request, posts):
+def posts_paginator(request, posts, keys=('pub_date', 'pk')):
     """Вспомогательная функция паджинатор формирует page
-    для передачи в context в используемых view."""
-    paginator = Paginator(posts, POSTS_PER_PAGE)
+    для передачи в context в используемых view.
+    По умолчанию листание идет курсором по (pub_date, id),
+    старые ссылки вида ?page=N обслуживаются постраничным Paginator."""
     page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return page
+    if page_number is not None:
+        return Paginator(posts, POSTS_PER_PAGE).get_page(page_number)
+    paginator = CursorPaginator(posts, POSTS_PER_PAGE, keys=keys)
+    return paginator.get_page(request.GET.get('cursor'))
 
 
-def index(request):
-    posts = Post.objects.select_related('author', 'group').prefetch_related(
-        'comments'
+def comments_paginator(request, comments):
+    """Страница комментариев записи: курсором по (created, id),
+    авторы выбираются тем же запросом."""
+    paginator = CursorPaginator(
+        comments.select_related('author'), COMMENTS_PER_PAGE,
+        keys=('created', 'pk')
     )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@conditional_page(FEED, per_user=True)
+@cached_page(FEED)
+def index(request):
+    posts = Post.objects.select_related('author', 'group')
     page = posts_paginator(request, posts)
     return render(request, 'posts/index.html', {'page': page})
 
 
+@conditional_page(GROUP, per_user=True)
+@cached_page(GROUP)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author').prefetch_related('comments')
+    posts = group.posts.select_related('author')
     page = posts_paginator(request, posts)
     return render(
         request,
@@ -38,6 +62,67 @@ def group_posts(request, slug):
     )
 
 
+@conditional_page(GROUPS, per_user=True)
+@cached_page(GROUPS)
+def group_list(request):
+    """Каталог групп со статистикой из GroupStats."""
+    groups = Group.objects.select_related('stats').order_by('title', 'pk')
+    page = Paginator(groups, GROUPS_PER_PAGE).get_page(
+        request.GET.get('page')
+    )
+    return render(request, 'posts/group_list.html', {'page': page})
+
+
+@conditional_page(FEED, TRENDING, per_user=True)
+@cached_page(FEED, TRENDING)
+def trending(request):
+    """Записи и группы с наибольшей оценкой активности
+    из предрассчитанного рейтинга."""
+    return render(
+        request,
+        'posts/trending.html',
+        {'page': top_posts(TRENDING_SIZE),
+         'groups': top_groups(TRENDING_SIZE)}
+    )
+
+
+def search(request):
+    form = SearchForm(request.GET or None)
+    page = None
+    if form.is_valid():
+        # Веса слов замораживаются в курсоре, чтобы новые записи
+        # не меняли ранги между страницами.
+        token = request.GET.get('cursor')
+        terms = query_terms(form.cleaned_data['q'])
+        weights = (
+            thaw_weights(cursor_state(token), terms) or term_weights(terms)
+        )
+        if weights:
+            posts = search_posts(form.cleaned_data['q'], weights)
+        else:
+            posts = no_results()
+        group = form.cleaned_data['group']
+        if group is not None:
+            posts = posts.filter(group=group)
+        author = form.cleaned_data['author']
+        if author:
+            posts = posts.filter(author__username=author)
+        paginator = CursorPaginator(
+            posts.select_related('author', 'group'), POSTS_PER_PAGE,
+            keys=SEARCH_KEYS, parse_key=int,
+            state=freeze_weights(weights) if weights else ''
+        )
+        page = paginator.get_page(token)
+    # Ссылки паджинатора сохраняют запрос и фильтры.
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    return render(
+        request,
+        'posts/search.html',
+        {'form': form, 'page': page, 'query_string': query.urlencode()}
+    )
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -62,9 +147,13 @@ def is_following(user, author):
     return following
 
 
+@conditional_page(USER, per_user=True)
+@cached_page(USER)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group').prefetch_related('comments')
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.select_related('group')
     page = posts_paginator(request, posts)
     following = is_following(request.user, author)
     return render(
@@ -75,19 +164,77 @@ def profile(request, username):
     )
 
 
+def follow_list(request, username, relation):
+    """Страница подписчиков или подписок пользователя: курсором
+    по id подписки, новые сверху. relation — 'followers' или
+    'following'."""
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    if relation == 'followers':
+        follows, field = Follow.objects.filter(author=author), 'user'
+    else:
+        follows, field = Follow.objects.filter(user=author), 'author'
+    paginator = CursorPaginator(
+        follows.select_related(f'{field}__stats').order_by('-pk'),
+        USERS_PER_PAGE,
+        keys=('pk',), parse_key=int
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return render(
+        request,
+        'posts/follow_list.html',
+        {'author': author, 'page': page, 'relation': relation,
+         'people': [getattr(follow, field) for follow in page],
+         'following': is_following(request.user, author)}
+    )
+
+
+@conditional_page(USER, per_user=True)
+@cached_page(USER)
+def followers(request, username):
+    return follow_list(request, username, 'followers')
+
+
+@conditional_page(USER, per_user=True)
+@cached_page(USER)
+def following(request, username):
+    return follow_list(request, username, 'following')
+
+
+@conditional_page(POST, USER, per_user=True)
+@cached_page(POST, USER)
 def post_view(request, username, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group').prefetch_related(
-            'comments'),
+        Post.objects.select_related('author__stats', 'group'),
         author__username=username, id=post_id
     )
     form = CommentForm()
     comments = post.comments.all()
+    comments_page = comments_paginator(request, comments)
     return render(
         request,
         'posts/post.html',
         {'author': post.author, 'post': post, 'comments': comments,
-         'form': form},
+         'comments_page': comments_page, 'form': form},
+    )
+
+
+@conditional_page(POST)
+@cached_page(POST)
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев записи HTML-фрагментом
+    для подгрузки на странице записи."""
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        author__username=username, id=post_id
+    )
+    comments_page = comments_paginator(request, post.comments.all())
+    return render(
+        request,
+        'includes/comment_list.html',
+        {'author': post.author, 'post': post,
+         'comments_page': comments_page},
     )
 
 
@@ -137,11 +284,13 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group').prefetch_related('comments')
-    page = posts_paginator(request, posts)
-    return render(request, 'posts/follow.html', {'page': page})
+    posts = timeline_posts(request.user).select_related('author', 'group')
+    page = posts_paginator(request, posts, keys=TIMELINE_KEYS)
+    return render(
+        request,
+        'posts/follow.html',
+        {'page': page, 'suggestions': suggestions(request.user)}
+    )
 
 
 @login_required
@@ -157,3 +306,24 @@ def profile_unfollow(request, username):
     user = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=user).delete()
     return redirect('profile', username)
+
+
+@login_required
+def group_follow(request, slug):
+    """Подписка на всех авторов группы, самые активные первыми."""
+    group = get_object_or_404(Group, slug=slug)
+    if request.method == 'POST':
+        authors = User.objects.filter(
+            group_stats__group=group
+        ).order_by('-group_stats__posts_count')
+        follow_many(request.user, authors)
+    return redirect('group_posts', slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    if request.method == 'POST':
+        authors = User.objects.filter(group_stats__group=group)
+        unfollow_many(request.user, authors)
+    return redirect('group_posts', slug)
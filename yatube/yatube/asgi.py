@@ -0,0 +1,31 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Requests under EVENTS_URL are served by the Server-Sent Events application
+in posts.sse, everything else by Django with the async read views enabled.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+os.environ.setdefault('YATUBE_ASYNC_VIEWS', '1')
+os.environ.setdefault('YATUBE_EVENTS', '1')
+
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from posts import sse  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if (scope['type'] == 'http'
+            and scope['path'].startswith(settings.EVENTS_URL)):
+        await sse.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,152 @@
+"""Настройка кеша из окружения и двухуровневый кеш.
+
+YATUBE_CACHE_URL выбирает общий бэкенд:
+    locmem://[имя]              память процесса (по умолчанию)
+    file:///путь/к/каталогу     файлы, общие для всех воркеров
+YATUBE_CACHE_LOCAL_TIMEOUT > 0 включает перед общим бэкендом
+локальный уровень в памяти воркера с этим таймаутом в секундах.
+
+Страницы кешируются надолго и сбрасываются увеличением версий
+в кеше. Кеш в памяти процесса годится только для одного воркера:
+увеличение версии в одном воркере не видно остальным, и они отдают
+устаревшие страницы до истечения таймаута. Поэтому при числе
+воркеров WEB_CONCURRENCY (его читают gunicorn и uvicorn) больше
+одного кеш в памяти процесса не запускается.
+"""
+from urllib.parse import urlsplit
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+SHARED_ALIAS = 'shared'
+LOCAL_PREFIXES = ('posts:page:',)
+
+
+def parse_cache_url(url):
+    """Возвращает словарь настроек одного кеша по его URL."""
+    parts = urlsplit(url)
+    if parts.scheme == 'locmem':
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': parts.netloc,
+        }
+    if parts.scheme == 'file':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': parts.path,
+        }
+    raise ValueError(f'Неизвестная схема кеша: {url}')
+
+
+def cache_settings(environ):
+    """Собирает settings.CACHES из переменных окружения."""
+    shared = parse_cache_url(environ.get('YATUBE_CACHE_URL', 'locmem://'))
+    workers = int(environ.get('WEB_CONCURRENCY', 1))
+    if workers > 1 and shared['BACKEND'].endswith('.LocMemCache'):
+        raise ImproperlyConfigured(
+            f'Воркеров {workers}, а кеш в памяти процесса: задайте общий '
+            f'кеш в YATUBE_CACHE_URL, например file:///var/cache/yatube'
+        )
+    local_timeout = int(environ.get('YATUBE_CACHE_LOCAL_TIMEOUT', 0))
+    if not local_timeout:
+        return {'default': shared}
+    return {
+        'default': {
+            'BACKEND': 'yatube.caches.TwoTierCache',
+            'OPTIONS': {
+                'SHARED': SHARED_ALIAS,
+                'LOCAL_TIMEOUT': local_timeout,
+            },
+        },
+        SHARED_ALIAS: shared,
+    }
+
+
+class TwoTierCache(BaseCache):
+    """Локальный кеш воркера перед общим бэкендом.
+
+    Локально хранятся только ключи с префиксами из LOCAL_PREFIXES.
+    Такие ключи неизменяемы (версии данных входят в сам ключ),
+    поэтому локальная копия не может устареть. Счетчики версий и
+    остальные ключи всегда читаются из общего бэкенда, так что
+    инвалидация в одном воркере сразу видна во всех.
+    """
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', SHARED_ALIAS)
+        self._local_prefixes = tuple(
+            options.get('LOCAL_PREFIXES', LOCAL_PREFIXES)
+        )
+        super().__init__({**params, 'OPTIONS': {}})
+        self.local = LocMemCache(
+            f'two-tier-{location}',
+            {
+                'TIMEOUT': options.get('LOCAL_TIMEOUT', 5),
+                'OPTIONS': {
+                    'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+                },
+            }
+        )
+
+    @property
+    def shared(self):
+        from django.core.cache import caches
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return key.startswith(self._local_prefixes)
+
+    def get(self, key, default=None, version=None):
+        if not self._is_local(key):
+            return self.shared.get(key, default, version=version)
+        missing = object()
+        value = self.local.get(key, missing, version=version)
+        if value is missing:
+            value = self.shared.get(key, missing, version=version)
+            if value is missing:
+                return default
+            self.local.set(key, value, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self._is_local(key):
+            self.local.set(key, value, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        return self.shared.get_many(keys, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.set_many(data, timeout, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.local.delete_many(keys, version=version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.shared.decr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
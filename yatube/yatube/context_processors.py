@@ -1,6 +1,15 @@
 import datetime as dt
 
+from django.conf import settings
+
 
 def year(request):
     year = dt.date.today().year
     return {'year': year}
+
+
+def events_url(request):
+    """Адрес потоков новых записей, если приложение SSE подключено."""
+    if not settings.EVENTS_ENABLED:
+        return {'events_url': ''}
+    return {'events_url': settings.EVENTS_URL}
@@ -0,0 +1,281 @@
+"""Метрики запросов для продакшена: число и время SQL-запросов,
+время отрисовки шаблонов и попадания в кеш страниц по именам URL.
+
+MetricsMiddleware заводит на время запроса RequestStats в contextvar.
+Обертка выполнения SQL ставится на каждое соединение при его создании
+и видит запросы из потоков sync_to_async, куда contextvar копируется.
+Время каждого запроса, в том числе вне HTTP-запросов, передается
+также в журнал медленных запросов yatube/querylog.py. Время
+отрисовки шаблонов измеряет бэкенд шаблонов DjangoTemplates из этого
+модуля, подключенный в TEMPLATES вместо стандартного.
+
+Повторы одного и того же SQL (параметры передаются отдельно, так что
+запросы в цикле по объектам дают одинаковый текст) считаются
+признаком N+1: если текст встретился METRICS_N_PLUS_ONE_THRESHOLD
+раз, запрос отмечается и в журнал пишется предупреждение.
+
+Агрегаты живут в памяти процесса и отдаются metrics_view в текстовом
+формате Prometheus; каждый воркер нужно опрашивать отдельно. За
+обратным прокси адрес клиента не отличить от локального, поэтому
+в продакшене доступ к /metrics/ закрывается токеном METRICS_TOKEN.
+"""
+import hmac
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template.backends import django as django_backend
+
+from yatube import querylog
+
+logger = logging.getLogger(__name__)
+
+current = ContextVar('metrics_request', default=None)
+
+# Имя view для запросов до разрешения URL и вне HTTP-запросов.
+UNRESOLVED = '<unresolved>'
+NO_REQUEST = '<no request>'
+
+METRICS = (
+    ('requests_total', 'Обработано запросов'),
+    ('request_seconds_total', 'Время обработки запросов, с'),
+    ('db_queries_total', 'SQL-запросов'),
+    ('db_seconds_total', 'Время SQL-запросов, с'),
+    ('template_seconds_total', 'Время отрисовки шаблонов, с'),
+    ('cache_hits_total', 'Страниц отдано из кеша'),
+    ('cache_misses_total', 'Страниц не нашлось в кеше'),
+    ('n_plus_one_total', 'Запросов с признаками N+1'),
+)
+
+
+class RequestStats:
+    """Счетчики одного запроса. Запросы к БД могут идти из нескольких
+    потоков сразу, поэтому они учитываются под блокировкой."""
+
+    def __init__(self, request):
+        self.request = request
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.shapes = Counter()
+
+    def add_query(self, sql, seconds):
+        with self.lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            self.shapes[sql] += 1
+
+    def add_template(self, seconds):
+        with self.lock:
+            self.template_seconds += seconds
+
+    def add_cache(self, hit):
+        with self.lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def view_name(self):
+        return _view_name(self.request)
+
+    def repeated_query(self):
+        """Самый частый SQL запроса, если он повторялся подозрительно
+        часто, и число его повторов."""
+        if not self.shapes:
+            return None, 0
+        sql, count = self.shapes.most_common(1)[0]
+        if count < settings.METRICS_N_PLUS_ONE_THRESHOLD:
+            return None, 0
+        return sql, count
+
+
+class Registry:
+    """Накопленные значения METRICS по именам URL."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(Counter)
+
+    def record(self, view, seconds, stats, n_plus_one):
+        with self.lock:
+            values = self.values[view]
+            values['requests_total'] += 1
+            values['request_seconds_total'] += seconds
+            values['db_queries_total'] += stats.queries
+            values['db_seconds_total'] += stats.db_seconds
+            values['template_seconds_total'] += stats.template_seconds
+            values['cache_hits_total'] += stats.cache_hits
+            values['cache_misses_total'] += stats.cache_misses
+            values['n_plus_one_total'] += n_plus_one
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self):
+        with self.lock:
+            values = {
+                view: dict(counts) for view, counts in self.values.items()
+            }
+        lines = []
+        for name, help_text in METRICS:
+            lines.append(f'# HELP yatube_{name} {help_text}')
+            lines.append(f'# TYPE yatube_{name} counter')
+            for view in sorted(values):
+                label = _escape(view)
+                value = values[view].get(name, 0)
+                lines.append(f'yatube_{name}{{view="{label}"}} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def _execute(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        stats = current.get()
+        if stats is not None:
+            stats.add_query(sql, seconds)
+        querylog.record(
+            sql, seconds, NO_REQUEST if stats is None else stats.view_name()
+        )
+
+
+def install(connection):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+def _connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_connection_created)
+
+
+class Template(django_backend.Template):
+    """Шаблон бэкенда Django, учитывающий время отрисовки."""
+
+    def render(self, context=None, request=None):
+        stats = current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            # Вложенные шаблоны отрисовываются движком внутри этого
+            # вызова, минуя бэкенд, поэтому время не задваивается.
+            stats.add_template(time.perf_counter() - started)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Бэкенд шаблонов Django, отдающий шаблоны с учетом времени
+    отрисовки. Через него проходит render() всех view."""
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+
+def record_cache(hit):
+    """Учитывает попадание или промах кеша страниц."""
+    stats = current.get()
+    if stats is not None:
+        stats.add_cache(hit)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Соединения, открытые до загрузки middleware.
+        for connection in connections.all():
+            install(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        stats = RequestStats(request)
+        return stats, current.set(stats), time.perf_counter()
+
+    def _finish(self, request, stats, token, started):
+        seconds = time.perf_counter() - started
+        current.reset(token)
+        view = _view_name(request)
+        sql, count = stats.repeated_query()
+        if sql is not None:
+            logger.warning(
+                'Возможный N+1 в %s: %d одинаковых запросов %s',
+                view, count, sql
+            )
+        registry.record(view, seconds, stats, sql is not None)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self._start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(request, stats, token, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self._start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(request, stats, token, started)
+
+
+def _metrics_allowed(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return False
+    if not settings.METRICS_TOKEN:
+        return settings.DEBUG
+    return hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}'
+    )
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus. Доступны только
+    с адресов METRICS_ALLOWED_IPS и с токеном METRICS_TOKEN (без него
+    только при DEBUG), для остальных адрес не существует."""
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
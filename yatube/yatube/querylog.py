@@ -0,0 +1,241 @@
+"""Журнал медленных SQL-запросов и гистограммы по отпечаткам SQL.
+
+Отпечаток — текст запроса без значений: числа и строки заменяются
+на ?, списки IN (...) любой длины сводятся к одному. Для каждого
+отпечатка копится гистограмма времени за скользящее окно
+QUERYLOG_WINDOW секунд (текущее и предыдущее окно) и счетчик view,
+из которых он выполнялся.
+
+Запросы дольше SLOW_QUERY_MS пишутся в журнал yatube.querylog вместе
+с именем view и первым кадром стека из кода проекта. Не чаще раза
+в QUERYLOG_FLUSH секунд процесс сохраняет гистограммы в файл
+в QUERYLOG_DIR по сигналу request_finished, уже после ответа, а не
+в обертке SQL-запроса; команда slow_queries сводит файлы всех
+процессов.
+
+Время запросов измеряет обертка из yatube/metrics.py.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_finished
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы, мс; последняя — без границы.
+BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, float('inf'))
+# Больше отпечатков не хранится, остальные запросы сводятся в OTHER.
+MAX_FINGERPRINTS = 1000
+OTHER = 'other'
+
+LITERAL_RE = re.compile(
+    r"'(?:[^']|'')*'"          # строки
+    r'|\b\d+(?:\.\d+)?\b'      # числа
+)
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+_fingerprints = {}
+
+
+def normalize(sql):
+    """SQL без значений параметров и литералов."""
+    sql = sql.replace('%s', '?')
+    sql = LITERAL_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """Отпечаток и нормализованный текст SQL. Django повторяет одни
+    и те же тексты запросов, поэтому результат запоминается."""
+    result = _fingerprints.get(sql)
+    if result is None:
+        if len(_fingerprints) >= 10 * MAX_FINGERPRINTS:
+            _fingerprints.clear()
+        text = normalize(sql)
+        result = hashlib.md5(text.encode()).hexdigest()[:12], text
+        _fingerprints[sql] = result
+    return result
+
+
+def _entry(text):
+    return {'sql': text, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'buckets': [0] * len(BUCKETS), 'views': Counter()}
+
+
+def _add(entry, ms, view):
+    entry['count'] += 1
+    entry['total_ms'] += ms
+    entry['max_ms'] = max(entry['max_ms'], ms)
+    for index, bound in enumerate(BUCKETS):
+        if ms <= bound:
+            entry['buckets'][index] += 1
+            break
+    entry['views'][view] += 1
+
+
+def merge(entries):
+    """Сводит записи одного отпечатка из разных окон и процессов."""
+    merged = None
+    for entry in entries:
+        if merged is None:
+            merged = _entry(entry['sql'])
+        merged['count'] += entry['count']
+        merged['total_ms'] += entry['total_ms']
+        merged['max_ms'] = max(merged['max_ms'], entry['max_ms'])
+        merged['buckets'] = [
+            a + b for a, b in zip(merged['buckets'], entry['buckets'])
+        ]
+        merged['views'].update(entry['views'])
+    return merged
+
+
+def percentile(entry, fraction):
+    """Оценка перцентиля сверху: граница корзины, в которую он попал."""
+    rank = fraction * entry['count']
+    seen = 0
+    for bound, count in zip(BUCKETS, entry['buckets']):
+        seen += count
+        if count and seen >= rank:
+            return bound if bound != float('inf') else entry['max_ms']
+    return entry['max_ms']
+
+
+class QueryLog:
+    """Гистограммы отпечатков процесса за два последних окна."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.current = {}
+        self.previous = {}
+        self.flushed = time.time()
+
+    def _rotate(self, now):
+        if now - self.window_start >= settings.QUERYLOG_WINDOW:
+            self.previous = self.current
+            self.current = {}
+            self.window_start = now
+
+    def add(self, sql, ms, view):
+        key, text = fingerprint(sql)
+        now = time.time()
+        with self.lock:
+            self._rotate(now)
+            if key not in self.current:
+                if len(self.current) >= MAX_FINGERPRINTS:
+                    key, text = OTHER, OTHER
+                if key not in self.current:
+                    self.current[key] = _entry(text)
+            _add(self.current[key], ms, view)
+        return key
+
+    def snapshot(self):
+        with self.lock:
+            windows = (self.previous, self.current)
+            keys = set().union(*windows)
+            return {
+                key: merge(
+                    window[key] for window in windows if key in window
+                )
+                for key in keys
+            }
+
+    def flush_due(self):
+        """Сохраняет гистограммы, если с прошлого сохранения прошло
+        QUERYLOG_FLUSH секунд."""
+        if not settings.QUERYLOG_DIR:
+            return
+        now = time.time()
+        with self.lock:
+            if now - self.flushed < settings.QUERYLOG_FLUSH:
+                return
+            self.flushed = now
+        self.flush()
+
+    def flush(self):
+        """Сохраняет гистограммы процесса для команды slow_queries."""
+        directory = settings.QUERYLOG_DIR
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        data = {'updated': time.time(), 'queries': self.snapshot()}
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as stream:
+                json.dump(data, stream)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            logger.exception('Не удалось сохранить гистограммы запросов')
+
+    def clear(self):
+        with self.lock:
+            self.current = {}
+            self.previous = {}
+
+
+querylog = QueryLog()
+
+
+def _request_finished(sender, **kwargs):
+    querylog.flush_due()
+
+
+request_finished.connect(_request_finished)
+
+
+def app_frame():
+    """Первый с конца стека кадр кода проекта, кроме этого модуля
+    и обертки метрик, в виде «путь:строка в функции»."""
+    skip = (__file__, os.path.join(os.path.dirname(__file__), 'metrics.py'))
+    for frame in reversed(traceback.extract_stack()):
+        if (
+            frame.filename.startswith(settings.BASE_DIR)
+            and 'site-packages' not in frame.filename
+            and frame.filename not in skip
+        ):
+            path = os.path.relpath(frame.filename, settings.BASE_DIR)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def record(sql, seconds, view):
+    """Учитывает выполненный запрос; медленный пишет в журнал."""
+    ms = seconds * 1000
+    key = querylog.add(sql, ms, view)
+    if ms >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            'Медленный запрос %.1f мс [%s] view=%s at %s: %s',
+            ms, key, view, app_frame(), sql
+        )
+
+
+def load_snapshots(directory, max_age):
+    """Гистограммы из файлов процессов, обновленных за max_age секунд."""
+    now = time.time()
+    entries = {}
+    if not os.path.isdir(directory):
+        return {}
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name),
+                      encoding='utf-8') as stream:
+                data = json.load(stream)
+        except (OSError, ValueError):
+            continue
+        if now - data['updated'] > max_age:
+            continue
+        for key, entry in data['queries'].items():
+            entries.setdefault(key, []).append(entry)
+    return {key: merge(items) for key, items in entries.items()}
@@ -0,0 +1,135 @@
+"""Чтение с реплики базы данных с гарантией «читаю свои записи».
+
+Если в DATABASES есть псевдоним REPLICA (YATUBE_REPLICA_DB, см.
+settings.py), ReplicaRouter отправляет на реплику чтения, сделанные
+во время HTTP-запросов; запись всегда идет в default. Реплика
+отстает от основной базы, поэтому после записи клиент на
+REPLICA_LAG_SECONDS секунд получает cookie PIN_COOKIE, и все его
+чтения идут в default, как и чтения до конца запроса, в котором
+была запись, и чтения внутри транзакций default.
+
+Вне HTTP-запросов (команды, сигналы в тестах, фоновые задачи)
+маршрутизатор ничего не меняет: там только что записанные данные
+читаются тут же, и отставание реплики их бы потеряло.
+
+Состояние запроса хранится в contextvar. Это изменяемый объект,
+поэтому запись, сделанная в потоке sync_to_async, видна и в
+исходном контексте запроса.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+PIN_COOKIE = 'yatube_primary'
+
+current = ContextVar('replica_request', default=None)
+
+
+class ReadState:
+    """Откуда читает текущий запрос. pinned — клиент недавно писал,
+    wrote — запись была в этом запросе."""
+
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_enabled():
+    return REPLICA in connections.databases
+
+
+@contextmanager
+def primary_only():
+    """Отключает реплику: нужно командам, которые работают
+    с тестовой базой default, у реплики которой ее нет."""
+    settings_dict = connections.databases.pop(REPLICA, None)
+    try:
+        yield
+    finally:
+        if settings_dict is not None:
+            connections.databases[REPLICA] = settings_dict
+
+
+def reads_from_replica():
+    """Идут ли чтения текущего запроса на реплику."""
+    state = current.get()
+    return (
+        state is not None
+        and not (state.pinned or state.wrote)
+        and replica_enabled()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class ReplicaRouter:
+    """Чтения в запросах без недавней записи — на реплику,
+    все остальное — в default."""
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if reads_from_replica() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На реплике те же данные, что и в default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплики приходит вместе с данными из default.
+        return db != REPLICA
+
+
+class ReplicaMiddleware:
+    """Заводит ReadState на время запроса и после записи выдает
+    клиенту cookie, по которой его чтения идут в default."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        state = ReadState(pinned=PIN_COOKIE in request.COOKIES)
+        return state, current.set(state)
+
+    def _finish(self, response, state, token):
+        current.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_LAG_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            current.reset(token)
+            raise
+        return self._finish(response, state, token)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            current.reset(token)
+            raise
+        return self._finish(response, state, token)
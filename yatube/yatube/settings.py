@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from yatube.caches import cache_settings
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -23,7 +25,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '75l_#8mr(qwn2+$a3y(1kcx1t+n6ky5x@@e57rg(&5u&(%1buj'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('YATUBE_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     "localhost",
@@ -45,11 +47,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.staticfiles',
     'django.contrib.messages',
-    'debug_toolbar',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,9 +60,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    # Панель инструментов подменяет отрисовку каждого шаблона,
+    # поэтому в продакшене она не подключается совсем.
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
@@ -67,18 +75,30 @@ INTERNAL_IPS = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # В продакшене (YATUBE_DEBUG=0) шаблоны компилируются один раз
+    # на процесс; при разработке читаются заново при каждой отрисовке.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Бэкенд Django, учитывающий время отрисовки в метриках.
+        'BACKEND': 'yatube.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'yatube.context_processors.year',
+                'yatube.context_processors.events_url',
             ],
         },
     },
@@ -97,6 +117,35 @@ DATABASES = {
     }
 }
 
+# YATUBE_REPLICA_DB — путь к копии базы, которую обновляет репликация.
+# С ней чтения во время HTTP-запросов идут на реплику, см.
+# yatube/replicas.py. В тестах реплика совпадает с default.
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+
+# Профиль SQLite для продакшена (yatube/sqlite.py): прагмы для каждого
+# соединения и постоянные соединения. Включен при YATUBE_DEBUG=0,
+# YATUBE_SQLITE_PRODUCTION=0/1 переопределяет это.
+SQLITE_PRODUCTION = os.environ.get(
+    'YATUBE_SQLITE_PRODUCTION', '0' if DEBUG else '1'
+) == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 10000,
+}
+if SQLITE_PRODUCTION:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = int(
+            os.environ.get('YATUBE_CONN_MAX_AGE', 600)
+        )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -147,9 +196,107 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+# Кеш настраивается переменными окружения YATUBE_CACHE_URL
+# и YATUBE_CACHE_LOCAL_TIMEOUT, см. yatube/caches.py. По умолчанию
+# кеш в памяти процесса; при нескольких воркерах (WEB_CONCURRENCY)
+# нужен общий кеш, например file:///var/cache/yatube.
+CACHES = cache_settings(os.environ)
+
+# Лента подписок: посты авторов, у которых подписчиков не больше
+# TIMELINE_FANOUT_LIMIT, раскладываются по лентам при публикации;
+# посты более популярных авторов подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_LENGTH = 1000
+
+# Страницы лент и записей кешируются до изменения данных,
+# таймаут только ограничивает время жизни неиспользуемых ключей.
+POSTS_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры изображений строятся пулом из THUMBNAIL_WORKERS потоков
+# после фиксации транзакции, вне обработки запроса. При 0, а также
+# на базе SQLite в памяти (тестовой) они строятся синхронно в том же
+# запросе, см. posts/thumbnails.py.
+THUMBNAIL_WORKERS = int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Ограничения на изображения записей, см. posts/uploads.py.
+POST_IMAGE_MAX_BYTES = 5 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 25_000_000
+POST_IMAGE_MAX_SIDE = 1920
+
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-}
+# Потоки Server-Sent Events о новых записях (posts/sse.py) доступны
+# только при запуске через ASGI: uvicorn yatube.asgi:application,
+# который включает EVENTS_ENABLED. Без него страницы не выводят
+# плашку новых записей и не открывают поток. Префикс лежит внутри
+# api/v1/, занятого адресами API, поэтому не перекрывает профили.
+EVENTS_ENABLED = os.environ.get('YATUBE_EVENTS') == '1'
+EVENTS_URL = '/api/v1/events/'
+EVENTS_HEARTBEAT = 15
+EVENTS_RETRY_MS = 5000
+
+# Асинхронные версии страниц из posts/async_views.py. Включаются
+# при запуске через ASGI (yatube/asgi.py), под WSGI остаются
+# синхронные view.
+ASYNC_VIEWS = os.environ.get('YATUBE_ASYNC_VIEWS') == '1'
+
+# Метрики запросов (yatube/metrics.py) отдаются по адресу /metrics/
+# адресам METRICS_ALLOWED_IPS. Адрес берется из REMOTE_ADDR: за
+# обратным прокси на той же машине все клиенты приходят с 127.0.0.1,
+# поэтому одной проверки адреса мало. Если задан METRICS_TOKEN,
+# запрос должен передать заголовок "Authorization: Bearer <токен>";
+# без токена метрики отдаются только при DEBUG. Столько одинаковых
+# SQL-запросов за один запрос считаются признаком N+1.
+METRICS_ALLOWED_IPS = os.environ.get(
+    'YATUBE_METRICS_ALLOWED_IPS', '127.0.0.1'
+).split(',')
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_N_PLUS_ONE_THRESHOLD = 10
+
+# Журнал медленных запросов (yatube/querylog.py): запросы дольше
+# SLOW_QUERY_MS пишутся в журнал yatube.querylog, гистограммы
+# по отпечаткам SQL за окно QUERYLOG_WINDOW секунд раз в QUERYLOG_FLUSH
+# секунд сохраняются в QUERYLOG_DIR для команды slow_queries. Пустой
+# QUERYLOG_DIR (по умолчанию, в том числе в тестах) отключает сохранение.
+SLOW_QUERY_MS = int(os.environ.get('YATUBE_SLOW_QUERY_MS', 100))
+QUERYLOG_WINDOW = 60 * 60
+QUERYLOG_FLUSH = 60
+QUERYLOG_DIR = os.environ.get('YATUBE_QUERYLOG_DIR', '')
+
+# Наибольшее ожидаемое отставание реплики, с. Столько после записи
+# чтения клиента идут в default, а страницы, данные которых
+# изменились, не кешируются, если собраны по данным реплики.
+REPLICA_LAG_SECONDS = int(os.environ.get('YATUBE_REPLICA_LAG', 5))
+
+# Рейтинг популярного (posts/trending.py): вес события затухает вдвое
+# за TRENDING_HALF_LIFE секунд. Страница /trending/ показывает
+# TRENDING_SIZE записей и групп.
+TRENDING_HALF_LIFE = 24 * 60 * 60
+TRENDING_POST_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_FOLLOWER_WEIGHT = 0.1
+TRENDING_SIZE = 20
+
+# Каталог групп /groups/ (posts/group_stats.py): GROUPS_PER_PAGE групп
+# на странице, у каждой GROUP_TOP_AUTHORS самых активных авторов.
+GROUPS_PER_PAGE = 20
+GROUP_TOP_AUTHORS = 3
+
+# Подписки списком (posts/follows.py): USERS_PER_PAGE пользователей
+# на странице подписчиков и подписок, не больше BULK_FOLLOW_LIMIT
+# авторов за одну массовую подписку. Рекомендации «кого читать»:
+# SUGGESTIONS_SIZE авторов по SUGGESTIONS_SAMPLE последним подпискам
+# пользователя и не больше чем SUGGESTIONS_SCAN подпискам этих авторов,
+# кешируются на SUGGESTIONS_CACHE_TIMEOUT секунд.
+USERS_PER_PAGE = 20
+BULK_FOLLOW_LIMIT = 100
+SUGGESTIONS_SIZE = 5
+SUGGESTIONS_SAMPLE = 100
+SUGGESTIONS_SCAN = 5000
+SUGGESTIONS_CACHE_TIMEOUT = 10 * 60
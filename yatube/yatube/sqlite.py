@@ -0,0 +1,37 @@
+"""Профиль SQLite для продакшена.
+
+При SQLITE_PRODUCTION каждое новое соединение с SQLite получает
+SQLITE_PRAGMAS из settings.py:
+    journal_mode=WAL  читатели не мешают писателю и наоборот;
+    synchronous=NORMAL  fsync только при контрольной точке WAL,
+        после сбоя питания теряются лишь последние транзакции;
+    mmap_size  чтение страниц базы через отображение в память;
+    busy_timeout  писатель ждет освободившуюся блокировку вместо
+        немедленной ошибки database is locked.
+Соединения при этом живут CONN_MAX_AGE секунд и не открываются
+заново в каждом запросе.
+
+Нагрузочная проверка — команда stress_sqlite.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def configure(connection):
+    """Выставляет прагмы SQLITE_PRAGMAS соединению connection."""
+    # Курсор драйвера, а не Django: прагмы не попадают в метрики
+    # и журнал запросов.
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def _connection_created(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite' and settings.SQLITE_PRODUCTION:
+        configure(connection)
+
+
+connection_created.connect(_connection_created)
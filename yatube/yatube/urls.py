@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from yatube.metrics import metrics_view
+
 handler404 = 'posts.views.page_not_found'
 handler500 = 'posts.views.server_error'
 urlpatterns = [
@@ -26,6 +28,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include('posts.urls')),
 ]
 if settings.DEBUG: